@@ -11,6 +11,8 @@ class Settings:
     
     # Database
     database_url: str = os.getenv("DATABASE_URL", "sqlite:///./immobilier.db")
+    # Serve the property and auth routes through the async engine
+    async_routes: bool = os.getenv("ASYNC_ROUTES", "False").lower() == "true"
     
     # CORS
     allowed_origins: list = [
@@ -28,5 +30,31 @@ class Settings:
     secret_key: str = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
+    
+    # Bulk import
+    bulk_batch_size: int = int(os.getenv("BULK_BATCH_SIZE", "1000"))
+    bulk_max_reported_rows: int = int(os.getenv("BULK_MAX_REPORTED_ROWS", "1000"))  # per list of the report
+    
+    # Near-duplicate detection
+    # Default handling of duplicates on ingest: "allow" (no check), "flag" or "reject"
+    dedup_on_duplicate: str = os.getenv("DEDUP_ON_DUPLICATE", "allow")
+    dedup_threshold: float = float(os.getenv("DEDUP_THRESHOLD", "0.5"))  # estimated Jaccard similarity
+    dedup_price_tolerance: float = float(os.getenv("DEDUP_PRICE_TOLERANCE", "0.05"))  # relative, also for area
+    
+    # Simulations
+    # Worker processes for large Monte Carlo runs (1 runs them in the request thread);
+    # each API worker starts its own pool, so keep it small
+    monte_carlo_workers: int = int(os.getenv("MONTE_CARLO_WORKERS", str(min(2, os.cpu_count() or 1))))
+    
+    # Caches
+    # Cache store: "memory" (per process) or "sqlite" (shared by the workers of a host)
+    cache_backend: str = os.getenv("CACHE_BACKEND", "memory")
+    cache_path: str = os.getenv("CACHE_PATH", "./cache.db")
+    cache_max_bytes: int = int(os.getenv("CACHE_MAX_BYTES", str(64 * 1024 * 1024)))  # sqlite backend
+    response_cache_entries: int = int(os.getenv("RESPONSE_CACHE_ENTRIES", "1024"))  # memory backend
+    response_cache_ttl: float = float(os.getenv("RESPONSE_CACHE_TTL", "30"))  # seconds, 0 disables
+    token_cache_ttl: float = float(os.getenv("TOKEN_CACHE_TTL", "300"))  # seconds, 0 disables
+    http_cache_max_age: int = int(os.getenv("HTTP_CACHE_MAX_AGE", "0"))  # seconds, Cache-Control max-age
+    cluster_cache_tiles: int = int(os.getenv("CLUSTER_CACHE_TILES", "4096"))
 
 settings = Settings()
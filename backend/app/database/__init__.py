@@ -1,4 +1,5 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 from app.config import settings
 
@@ -17,3 +18,57 @@ def get_db():
         yield db
     finally:
         db.close()
+
+# Async drivers for the sync URLs (aiosqlite locally)
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "mysql": "mysql+aiomysql",
+}
+
+def async_database_url(url: str) -> str:
+    """Same database as ``url`` through its async driver"""
+    scheme, rest = url.split("://", 1)
+    return f"{ASYNC_DRIVERS.get(scheme.split('+')[0], scheme)}://{rest}"
+
+_async_session_factory = None
+
+def get_async_sessionmaker() -> async_sessionmaker:
+    """
+    Async session factory, with its engine created on first use: only the
+    async routes (``ASYNC_ROUTES=true``) need the async driver installed.
+    """
+    global _async_session_factory
+    if _async_session_factory is None:
+        async_engine = create_async_engine(async_database_url(settings.database_url))
+        _async_session_factory = async_sessionmaker(async_engine, autoflush=False)
+    return _async_session_factory
+
+async def get_async_db():
+    """Get async database session (async route variants)"""
+    async with get_async_sessionmaker()() as db:
+        yield db
+
+def upgrade_schema(bind=engine):
+    """
+    Add columns and indexes declared on the models but missing from tables
+    that already exist (``create_all`` only creates whole tables).
+
+    Only nullable columns can be added this way, which is all we need for
+    the optional fields added to existing models.
+    """
+    inspector = inspect(bind)
+    with bind.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing or not column.nullable:
+                    continue
+                column_type = column.type.compile(dialect=bind.dialect)
+                connection.execute(
+                    text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}")
+                )
+            for index in table.indexes:
+                index.create(connection, checkfirst=True)
@@ -8,6 +8,8 @@ from starlette.datastructures import MutableHeaders
 
 logger = logging.getLogger("api")
 
+STREAMED_CONTENT_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl", "text/csv")
+
 class LoggingMiddleware(BaseHTTPMiddleware):
     """Middleware for logging all HTTP requests with full error details"""
     
@@ -24,8 +26,10 @@ class LoggingMiddleware(BaseHTTPMiddleware):
         if query_params:
             logger.debug(f"[{request_id}] Query params: {query_params}")
         
-        # Log request body for POST/PUT/PATCH
-        if method in ["POST", "PUT", "PATCH"]:
+        # Log request body for POST/PUT/PATCH (streamed bulk uploads are
+        # left alone: reading them here would buffer the whole body)
+        content_type = request.headers.get("content-type", "")
+        if method in ["POST", "PUT", "PATCH"] and not content_type.startswith(STREAMED_CONTENT_TYPES):
             try:
                 body = await request.body()
                 if body:
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, BigInteger, Float, String, DateTime, Boolean, LargeBinary, ForeignKey, Index, DDL, event
 from datetime import datetime
 from app.database import Base
 
@@ -32,10 +32,172 @@ class Property(Base):
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(200), nullable=False)
     description = Column(String(1000))
-    price = Column(Integer, nullable=False)
+    price = Column(Integer, nullable=False, index=True)
     location = Column(String(200), nullable=False)
     rooms = Column(Integer)
     bathrooms = Column(Integer)
     area = Column(Integer)  # in m²
-    created_at = Column(DateTime, default=datetime.utcnow)
+    latitude = Column(Float)
+    longitude = Column(Float)
+    geo_cell = Column(Integer)  # fixed-grid cell, see app.services.geo
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # Composite indexes matching the search filters: an equality/IN column
+    # first, then price so that the usual price range is a range scan too.
+    __table_args__ = (
+        Index("ix_properties_location_price", "location", "price"),
+        Index("ix_properties_rooms_price", "rooms", "price"),
+        Index("ix_properties_bathrooms_price", "bathrooms", "price"),
+        Index("ix_properties_area_price", "area", "price"),
+        # Covering index for radius search: cell pruning and the exact
+        # distance check never touch the table rows.
+        Index("ix_properties_geo", "geo_cell", "latitude", "longitude"),
+        # Covering index for bounding-box reads (map clusters)
+        Index("ix_properties_lat_lon_price", "latitude", "longitude", "price"),
+    )
+
+class PropertyFacetRollup(Base):
+    """
+    Property counts per (location, price bucket, rooms bucket, area bucket).
+
+    Maintained incrementally by the property write routes and used to answer
+    facet counts without a GROUP BY over ``properties``. Bucket -1 means
+    the value is unknown (NULL).
+    """
+    __tablename__ = "property_facet_rollups"
+    
+    location = Column(String(200), primary_key=True)
+    price_bucket = Column(Integer, primary_key=True)
+    rooms_bucket = Column(Integer, primary_key=True)
+    area_bucket = Column(Integer, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+class PropertyPriceHistory(Base):
+    """
+    Asking price of a property from ``changed_at`` on.
+
+    One row when the property is created and one per price change, written
+    by the property write routes in the same transaction as the property.
+    """
+    __tablename__ = "property_price_history"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    property_id = Column(Integer, ForeignKey("properties.id"), nullable=False)
+    price = Column(Integer, nullable=False)
+    changed_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    
+    # Series reads are one range scan per property, already in time order
+    __table_args__ = (
+        Index("ix_property_price_history_property_changed", "property_id", "changed_at"),
+    )
+
+class PropertySignature(Base):
+    """
+    MinHash signature of a property (see ``app.services.dedup``), with the
+    price and area checked when two signatures match.
+    """
+    __tablename__ = "property_signatures"
+    
+    property_id = Column(Integer, ForeignKey("properties.id"), primary_key=True)
+    signature = Column(LargeBinary, nullable=False)
+    price = Column(Integer)
+    area = Column(Integer)
+
+class PropertyLshBucket(Base):
+    """
+    LSH bucket membership: one row per (band hash, property).
+
+    The primary key orders rows by bucket, so looking up a bucket and
+    scanning all buckets in order both use it.
+    """
+    __tablename__ = "property_lsh_buckets"
+    
+    bucket = Column(BigInteger, primary_key=True, autoincrement=False)
+    property_id = Column(Integer, primary_key=True, autoincrement=False)
+
+class PropertyPriceM2Bin(Base):
+    """
+    Price per m² quantile sketch: property counts per (location, log bin).
+
+    Bin ``i`` holds prices per m² in ``(gamma ** (i - 1), gamma ** i]`` (see
+    ``app.services.market_stats``). Maintained incrementally by the
+    property write routes, like the facet rollups; the primary key orders
+    the bins of a location for the quantile scan.
+    """
+    __tablename__ = "property_price_m2_bins"
+    
+    location = Column(String(200), primary_key=True)
+    bin = Column(Integer, primary_key=True, autoincrement=False)
+    count = Column(Integer, nullable=False, default=0)
+
+class PropertyDealScore(Base):
+    """
+    Precomputed deal score of a property (see ``app.services.deal_scores``):
+    gross margin of buying it at its asking price and reselling it at the
+    median price per m² of its location, under the default profile.
+
+    Maintained by the property write routes; ``sale_price_m2`` is the
+    median the score used, so a location is rescored when it moves.
+    Properties without area have no score.
+    """
+    __tablename__ = "property_deal_scores"
+    
+    property_id = Column(Integer, ForeignKey("properties.id"), primary_key=True)
+    location = Column(String(200), nullable=False)
+    sale_price_m2 = Column(Float, nullable=False)
+    score = Column(Float, nullable=False)  # gross margin, %
+    gross_margin_euro = Column(Float, nullable=False)
+    
+    # Top deals are an index scan, overall or within a location
+    __table_args__ = (
+        Index("ix_property_deal_scores_score", "score"),
+        Index("ix_property_deal_scores_location_score", "location", "score"),
+    )
+
+class TableVersion(Base):
+    """
+    Write counter per table.
+
+    Bumped in the same transaction as every write to the table; used to
+    derive ETags for collection responses (listings, facets, clusters).
+    """
+    __tablename__ = "table_versions"
+    
+    name = Column(String(100), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+# Full-text index over property title/description (SQLite FTS5 only).
+# External-content table: the text lives in ``properties`` and the triggers
+# keep the index in sync on every insert, update and delete.
+PROPERTY_FTS_TABLE = "properties_fts"
+PROPERTY_FTS_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS properties_fts USING fts5(
+        title, description,
+        content='properties', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS properties_fts_ai AFTER INSERT ON properties BEGIN
+        INSERT INTO properties_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS properties_fts_ad AFTER DELETE ON properties BEGIN
+        INSERT INTO properties_fts(properties_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS properties_fts_au AFTER UPDATE OF title, description ON properties BEGIN
+        INSERT INTO properties_fts(properties_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO properties_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END""",
+]
+
+for _statement in PROPERTY_FTS_DDL:
+    event.listen(Property.__table__, "after_create", DDL(_statement).execute_if(dialect="sqlite"))
+event.listen(
+    Property.__table__,
+    "after_drop",
+    DDL(f"DROP TABLE IF EXISTS {PROPERTY_FTS_TABLE}").execute_if(dialect="sqlite")
+)
@@ -1,4 +1,5 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Header, Request
+from fastapi import APIRouter, Depends, HTTPException, status, Header, Request, Response
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 from datetime import timedelta
 from typing import Optional
@@ -8,11 +9,15 @@ from app.database import get_db
 from app.models import User
 from app.schemas import LoginRequest, TokenResponse, UserCreate, UserResponse
 from app.services.auth import auth_service
+from app.services.fast_json import RowEncoder
 from app.services.password import password_history_service
 
 logger = logging.getLogger("auth")
 router = APIRouter(prefix="/api/auth", tags=["auth"])
 
+# Encodes User rows to UserResponse JSON without a validation pass
+user_encoder = RowEncoder.for_model(UserResponse)
+
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
 def register(user_in: UserCreate, request: Request, db: Session = Depends(get_db)):
     """Register a new user"""
@@ -31,16 +36,13 @@ def register(user_in: UserCreate, request: Request, db: Session = Depends(get_db
                 detail="Username or email already registered"
             )
         
-        # Create new user
+        # Create new user (INSERT ... RETURNING: no refresh query); it is
+        # committed together with its password history entry
         hashed_password = auth_service.hash_password(user_in.password)
-        db_user = User(
-            username=user_in.username,
-            email=user_in.email,
-            hashed_password=hashed_password
-        )
-        db.add(db_user)
-        db.commit()
-        db.refresh(db_user)
+        db_user = db.execute(
+            insert(User).returning(*[getattr(User, name) for name in user_encoder.fields]),
+            {"username": user_in.username, "email": user_in.email, "hashed_password": hashed_password}
+        ).one()
         
         # Record password change in history
         client_ip = request.client.host if request.client else "unknown"
@@ -53,7 +55,11 @@ def register(user_in: UserCreate, request: Request, db: Session = Depends(get_db
         )
         
         logger.info(f"User registered successfully: {user_in.username} (id: {db_user.id})")
-        return db_user
+        return Response(
+            user_encoder.dumps(db_user),
+            status_code=status.HTTP_201_CREATED,
+            media_type="application/json"
+        )
     except HTTPException:
         raise
     except Exception as e:
@@ -192,7 +198,7 @@ def get_me(current_user: User = Depends(get_current_user)):
     """Get current authenticated user"""
     try:
         logger.debug(f"Fetching current user info: {current_user.username}")
-        return current_user
+        return Response(user_encoder.dumps(current_user), media_type="application/json")
     except Exception as e:
         # Log l'exception avec stack trace détaillé
         import traceback
@@ -0,0 +1,149 @@
+"""
+Async variants of the auth routes (``ASYNC_ROUTES=true``)
+
+Same paths and responses as ``app.routes.auth``. Queries are awaited on
+the async engine; bcrypt hashing and checking, which are CPU-bound, run in
+the threadpool so they never block the event loop.
+"""
+from datetime import timedelta
+from typing import Optional
+import logging
+
+from fastapi import APIRouter, Depends, HTTPException, status, Header, Request, Response
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from app.database import get_async_db
+from app.models import User
+from app.routes.auth import user_encoder
+from app.schemas import LoginRequest, TokenResponse, UserCreate, UserResponse
+from app.services.auth import auth_service
+from app.services.password import password_history_service
+
+logger = logging.getLogger("auth")
+router = APIRouter(prefix="/api/auth", tags=["auth"])
+
+async def _find_user(db: AsyncSession, username: str) -> Optional[User]:
+    return (await db.execute(select(User).where(User.username == username))).scalars().first()
+
+@router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
+async def register_async(user_in: UserCreate, request: Request, db: AsyncSession = Depends(get_async_db)):
+    """Register a new user"""
+    try:
+        logger.info(f"Register attempt for username: {user_in.username}, email: {user_in.email}")
+
+        existing_user = (await db.execute(
+            select(User.id).where((User.username == user_in.username) | (User.email == user_in.email))
+        )).first()
+        if existing_user:
+            logger.warning(f"Registration failed: Username or email already exists - {user_in.username}")
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Username or email already registered"
+            )
+
+        hashed_password = await run_in_threadpool(auth_service.hash_password, user_in.password)
+        db_user = (await db.execute(
+            insert(User).returning(*[getattr(User, name) for name in user_encoder.fields]),
+            {"username": user_in.username, "email": user_in.email, "hashed_password": hashed_password}
+        )).one()
+
+        client_ip = request.client.host if request.client else "unknown"
+        await db.run_sync(lambda session: password_history_service.record_password_change(
+            db=session,
+            user_id=db_user.id,
+            hashed_password=hashed_password,
+            reason="registration",
+            ip_address=client_ip
+        ))
+
+        logger.info(f"User registered successfully: {user_in.username} (id: {db_user.id})")
+        return Response(
+            user_encoder.dumps(db_user),
+            status_code=status.HTTP_201_CREATED,
+            media_type="application/json"
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"REGISTRATION ERROR - Type: {type(e).__name__}\nMessage: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Registration error: {str(e)}"
+        )
+
+@router.post("/login", response_model=TokenResponse)
+async def login_async(login_data: LoginRequest, db: AsyncSession = Depends(get_async_db)):
+    """Login and get JWT token"""
+    try:
+        logger.info(f"Login attempt for username: {login_data.username}")
+
+        user = await _find_user(db, login_data.username)
+        valid = user is not None and await run_in_threadpool(
+            auth_service.verify_password, login_data.password, user.hashed_password
+        )
+        if not valid:
+            logger.warning(f"Login failed: Invalid credentials for username: {login_data.username}")
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid username or password",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+
+        access_token = auth_service.create_access_token(
+            data={"sub": user.username},
+            expires_delta=timedelta(minutes=30)
+        )
+
+        logger.info(f"User logged in successfully: {user.username}")
+        return {
+            "access_token": access_token,
+            "token_type": "bearer",
+            "user": user
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"LOGIN ERROR - Type: {type(e).__name__}\nMessage: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Login error: {str(e)}"
+        )
+
+async def get_current_user_async(
+    authorization: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db)
+) -> User:
+    """Get current authenticated user from Authorization header"""
+    parts = authorization.split() if authorization else []
+    if len(parts) != 2 or parts[0].lower() != "bearer":
+        logger.warning("Missing or invalid authorization header")
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Missing authorization header" if not authorization else "Invalid authorization header format",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    payload = auth_service.verify_token(parts[1])
+    username = payload.get("sub") if payload else None
+    user = await _find_user(db, username) if username else None
+    if user is None:
+        if payload is None:
+            detail = "Invalid or expired token"
+        elif username is None:
+            detail = "Invalid token"
+        else:
+            detail = "User not found"
+        logger.warning(f"Authentication failed: {detail}")
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=detail,
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return user
+
+@router.get("/me", response_model=UserResponse)
+async def get_me_async(current_user: User = Depends(get_current_user_async)):
+    """Get current authenticated user"""
+    return Response(user_encoder.dumps(current_user), media_type="application/json")
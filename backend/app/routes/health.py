@@ -1,4 +1,5 @@
 from fastapi import APIRouter
+from app.services.response_cache import response_cache
 
 router = APIRouter(tags=["health"])
 
@@ -10,6 +11,11 @@ def health_check():
         "message": "API is running successfully"
     }
 
+@router.get("/health/cache")
+def cache_stats():
+    """Response cache statistics (hits, misses, evictions, invalidations)"""
+    return response_cache.stats()
+
 @router.get("/")
 def root():
     """Root endpoint"""
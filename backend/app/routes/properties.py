@@ -1,70 +1,654 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import datetime
+from typing import List, Optional, Union
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from pydantic_core import to_json
+from sqlalchemy import delete, insert, select, update
 from sqlalchemy.orm import Session
+from app.config import settings
 from app.database import get_db
 from app.models import Property
-from app.schemas import PropertyCreate, PropertyResponse, PropertyUpdate
+from app.schemas import (
+    BulkImportReport, DuplicateClusters, PriceHistoryResponse, PropertyBatchRequest, PropertyClusterResponse, PropertyCreate, PropertyFacets, PropertyPage, PropertyResponse,
+    PropertyUpdate, TopDeal
+)
+from app.services import bulk_import, clusters, dedup, export, full_text, geo, http_cache, price_history, projection
+from app.services.deal_scores import deal_score_service
+from app.services.dedup import dedup_service
+from app.services.facets import facet_service
+from app.services.market_stats import market_stats_service
+from app.services.price_history import price_history_service
+from app.services.pagination import order_query, paginate_keyset, parse_sort
+from app.services.property_events import SNAPSHOT_FIELDS, property_events, snapshot
+from app.services.property_search import PropertyFilters, check_ids, load_in_order, parse_ids
+from app.services.response_cache import LISTING, PROPERTY, response_cache
+from app.services.similar import similar_index
 
 router = APIRouter(prefix="/api/properties", tags=["properties"])
 
-@router.get("/", response_model=list[PropertyResponse])
-def list_properties(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    """Get all properties"""
-    properties = db.query(Property).offset(skip).limit(limit).all()
-    return properties
+# Upper bound on ids resolved by one batch lookup
+MAX_BATCH_IDS = 1000
+
+def _cached_response(request: Request, cached) -> Response:
+    """Answer from a response cache entry (304 when the client's copy is current)"""
+    if http_cache.matches(request, cached.headers["ETag"]):
+        return http_cache.not_modified(cached.headers)
+    return Response(cached.body, media_type="application/json", headers=cached.headers)
+
+def _list_response(query, fields: list) -> bytes:
+    """
+    Run a listing query. Only the response columns are selected and the
+    rows are encoded in one step, skipping entity hydration and per-item
+    ``PropertyResponse`` validation.
+    """
+    return projection.dump_rows(projection.project(query, fields).all(), fields)
+
+def _batch_response(db: Session, ids: list, fields: list) -> bytes:
+    """Properties for ``ids`` in request order, null for missing ids"""
+    rows = load_in_order(projection.project(db.query(Property), dict.fromkeys([*fields, "id"])), ids, keep_missing=True)
+    return projection.dump_rows(rows, fields)
+
+@router.get("/", response_model=Union[list[Optional[PropertyResponse]], PropertyPage])
+def list_properties(
+    request: Request,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    sort: Optional[str] = None,
+    q: Optional[str] = None,
+    near: Optional[str] = None,
+    radius_km: Optional[float] = None,
+    fields: Optional[str] = None,
+    ids: Optional[str] = None,
+    filters: PropertyFilters = Depends(),
+    db: Session = Depends(get_db)
+):
+    """
+    Get all properties
+
+    Without ``cursor`` this is the legacy offset mode and returns a plain list.
+    Passing ``cursor`` (empty for the first page) switches to keyset
+    pagination and returns ``{"items": [...], "next_cursor": ...}``.
+    ``sort`` is one of ``id``, ``price``, ``created_at``, prefixed with ``-``
+    for descending order. See ``PropertyFilters`` for the search filters.
+    ``q`` is a keyword search over title and description; without an
+    explicit ``sort`` its results are ranked by relevance (offset mode only).
+    ``near=lat,lon&radius_km=`` keeps properties within the radius, nearest
+    first (offset mode only). ``fields=id,title,price`` returns only those
+    keys for each property. ``ids=1,2,3`` is a batch lookup: one entry per
+    requested id, in request order, ``null`` for missing ids (filters and
+    pagination do not apply).
+
+    The ETag follows the table write counter: a matching ``If-None-Match``
+    gets a 304 without querying the properties. Serialized responses are
+    kept in the response cache until a property write.
+    """
+    key = response_cache.key(LISTING, request)
+    cached = response_cache.get(key)
+    if cached is not None:
+        return _cached_response(request, cached)
+
+    headers = http_cache.collection_headers(db, request)
+    if http_cache.matches(request, headers["ETag"]):
+        return http_cache.not_modified(headers)
+    body = _list_properties(db, skip, limit, cursor, sort, q, near, radius_km, fields, ids, filters)
+    response_cache.put(key, body, headers)
+    return Response(body, media_type="application/json", headers=headers)
+
+def _list_properties(db: Session, skip, limit, cursor, sort, q, near, radius_km, fields, ids, filters) -> bytes:
+    """Listing modes of ``list_properties``, as JSON bytes"""
+    try:
+        field_list = projection.parse_fields(fields) if fields is not None else list(projection.PROPERTY_FIELDS)
+        if ids is not None:
+            return _batch_response(db, parse_ids(ids, MAX_BATCH_IDS), field_list)
+        query = filters.apply(db.query(Property))
+        filtered = not filters.is_empty()
+        if q is not None:
+            dialect_name = db.get_bind().dialect.name
+            query = full_text.apply_text_search(query, q, dialect_name)
+            filtered = True
+            if sort is None and near is None:
+                if cursor is not None:
+                    raise ValueError("Cursor pagination requires an explicit sort when searching with q")
+                ranked = full_text.order_by_rank(query, dialect_name).offset(skip).limit(limit)
+                return _list_response(ranked, field_list)
+
+        if near is not None:
+            lat, lon = geo.parse_point(near)
+            if radius_km is None or not 0 < radius_km <= geo.MAX_RADIUS_KM:
+                raise ValueError(f"radius_km must be a positive number up to {geo.MAX_RADIUS_KM} when near is given")
+            if cursor is not None:
+                raise ValueError("Cursor pagination is not supported with near")
+            matches = geo.nearest_ids(query, lat, lon, radius_km)
+            page = [property_id for property_id, _ in matches[skip:skip + limit]]
+            rows = load_in_order(projection.project(db.query(Property), dict.fromkeys([*field_list, "id"])), page)
+            return projection.dump_rows(rows, field_list)
+
+        sort = sort or "id"
+        sort_key, _ = parse_sort(sort)
+        if cursor is not None:
+            # The cursor needs the id and sort key even if they were not requested
+            projected = projection.project(query, dict.fromkeys([*field_list, "id", sort_key]))
+            rows, next_cursor = paginate_keyset(projected, sort, cursor, limit, filtered)
+            return projection.dump_page(rows, field_list, next_cursor)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+    return _list_response(order_query(query, sort, filtered).offset(skip).limit(limit), field_list)
+
+@router.get("/clusters", response_model=PropertyClusterResponse)
+def get_clusters(
+    request: Request,
+    response: Response,
+    bbox: str,
+    zoom: int = Query(..., ge=0, le=clusters.MAX_ZOOM),
+    db: Session = Depends(get_db)
+):
+    """
+    Get map clusters inside ``bbox`` (``west,south,east,north``) at ``zoom``
+
+    Each cluster carries a count, a centroid and price min/median/max.
+    Clusters are cached per (tile, zoom) and dropped on property writes.
+    """
+    headers = http_cache.collection_headers(db, request)
+    if http_cache.matches(request, headers["ETag"]):
+        return http_cache.not_modified(headers)
+    response.headers.update(headers)
+    try:
+        bounds = clusters.parse_bbox(bbox)
+        return {"zoom": zoom, "clusters": clusters.get_clusters(db, bounds, zoom)}
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+@router.get("/facets", response_model=PropertyFacets)
+def get_facets(
+    request: Request,
+    response: Response,
+    q: Optional[str] = None,
+    filters: PropertyFilters = Depends(),
+    db: Session = Depends(get_db)
+):
+    """
+    Get facet counts (location, price, rooms and area buckets)
+
+    Accepts the same filters as the listing. When they line up with the
+    bucket boundaries the counts come from the rollup tables; otherwise
+    (bathrooms, ``q``, ranges cutting through a bucket) they are computed
+    live on the filtered properties.
+    """
+    headers = http_cache.collection_headers(db, request)
+    if http_cache.matches(request, headers["ETag"]):
+        return http_cache.not_modified(headers)
+    response.headers.update(headers)
+
+    if q is None:
+        facets = facet_service.from_rollups(db, filters)
+        if facets is not None:
+            return facets
+
+    query = filters.apply(db.query(Property))
+    if q is not None:
+        query = full_text.apply_text_search(query, q, db.get_bind().dialect.name)
+    return facet_service.from_properties(query)
+
+@router.get("/price-history", response_model=PriceHistoryResponse)
+def get_price_history(
+    request: Request,
+    response: Response,
+    ids: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    interval: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Get asking price series for ``ids=1,2,3`` between ``start`` and ``end``
+
+    Every point is a price change (the first one is the listing price). A
+    series starting before ``start`` begins with the price in effect at
+    ``start``. For long ranges, ``interval`` (``hour``, ``day``, ``week``
+    or ``month``) returns per-bucket min/max/average instead of points.
+    Properties without history are omitted.
+    """
+    try:
+        property_ids = parse_ids(ids, MAX_BATCH_IDS)
+        if start is not None and end is not None and start > end:
+            raise ValueError("start must be before end")
+        if interval is not None and interval not in price_history.INTERVALS:
+            raise ValueError(f"interval must be one of: {', '.join(price_history.INTERVALS)}")
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+    headers = http_cache.collection_headers(db, request)
+    if http_cache.matches(request, headers["ETag"]):
+        return http_cache.not_modified(headers)
+    response.headers.update(headers)
+
+    if interval is None:
+        points = price_history_service.series(db, property_ids, start, end)
+        series = [{"property_id": i, "points": points[i]} for i in dict.fromkeys(property_ids) if i in points]
+    else:
+        buckets = price_history_service.buckets(db, property_ids, interval, start, end)
+        series = [{"property_id": i, "buckets": buckets[i]} for i in dict.fromkeys(property_ids) if i in buckets]
+    return {"interval": interval, "series": series}
+
+@router.get("/export")
+def export_properties(
+    format: str = "ndjson",
+    fields: Optional[str] = None,
+    q: Optional[str] = None,
+    filters: PropertyFilters = Depends(),
+    db: Session = Depends(get_db)
+):
+    """
+    Export the whole (filtered) catalog as NDJSON or CSV
+
+    Rows are streamed from a server-side cursor straight into the response,
+    in id order, so memory use does not grow with the catalog.
+    """
+    try:
+        if format not in export.EXPORT_FORMATS:
+            raise ValueError(f"Unsupported export format: {format}")
+        field_list = projection.parse_fields(fields) if fields is not None else list(projection.PROPERTY_FIELDS)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+    query = filters.apply(db.query(Property))
+    if q is not None:
+        query = full_text.apply_text_search(query, q, db.get_bind().dialect.name)
+
+    stream = export.stream_csv if format == "csv" else export.stream_ndjson
+    return StreamingResponse(
+        stream(query, field_list),
+        media_type=export.EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="properties.{format}"'}
+    )
+
+@router.get("/duplicates", response_model=DuplicateClusters)
+def get_duplicates(
+    threshold: Optional[float] = Query(None, gt=0, le=1),
+    min_size: int = Query(2, ge=2),
+    db: Session = Depends(get_db)
+):
+    """
+    Cluster the whole catalog into groups of near-duplicate listings
+
+    Only listings sharing an LSH bucket are compared, so the cost follows
+    the number of candidate pairs rather than all pairs. ``threshold``
+    overrides ``DEDUP_THRESHOLD`` (estimated Jaccard similarity of the
+    listing text and features).
+    """
+    return dedup_service.clusters(db, threshold, min_size)
+
+@router.get("/top-deals", response_model=list[TopDeal])
+def get_top_deals(
+    request: Request,
+    limit: int = Query(20, ge=1, le=100),
+    location: Optional[List[str]] = Query(None),
+    fields: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Get the properties with the best expected margin, best first
+
+    Each property is scored as a deal bought at its asking price and
+    resold at the median price per m² of its location, with the
+    simulator's default fees, works and holding costs. Scores are
+    precomputed on every property write (a location is rescored when its
+    median moves, once per bulk import), so this is an index scan; repeat ``location`` to
+    restrict the ranking. Properties without area are not ranked.
+    """
+    try:
+        field_list = projection.parse_fields(fields) if fields is not None else list(projection.PROPERTY_FIELDS)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    headers = http_cache.collection_headers(db, request)
+    if http_cache.matches(request, headers["ETag"]):
+        return http_cache.not_modified(headers)
+
+    scores = deal_score_service.top(db, limit, location)
+    rows = load_in_order(
+        projection.project(db.query(Property), dict.fromkeys([*field_list, "id"])),
+        [score.property_id for score in scores],
+        keep_missing=True
+    )
+    deals = [
+        {"property": row, "gross_margin_percent": round(score.score, 4),
+         "gross_margin_euro": round(score.gross_margin_euro, 2), "sale_price_per_m2": score.sale_price_m2}
+        for score, row in zip(scores, projection.encoder(tuple(field_list)).rows(rows)) if row is not None
+    ]
+    return Response(to_json(deals), media_type="application/json", headers=headers)
 
 @router.get("/{property_id}", response_model=PropertyResponse)
-def get_property(property_id: int, db: Session = Depends(get_db)):
-    """Get property by ID"""
-    property_obj = db.query(Property).filter(Property.id == property_id).first()
-    if not property_obj:
+def get_property(
+    property_id: int,
+    request: Request,
+    db: Session = Depends(get_db)
+):
+    """
+    Get property by ID
+
+    The ETag is derived from ``id`` and ``updated_at``, read on their own
+    first so that a matching ``If-None-Match`` gets a 304 without loading
+    the row. Serialized responses are kept in the response cache until the
+    property is written.
+    """
+    key = response_cache.key(PROPERTY, request, property_id)
+    cached = response_cache.get(key)
+    if cached is not None:
+        return _cached_response(request, cached)
+
+    stamp = db.query(Property.updated_at).filter(Property.id == property_id).first()
+    if not stamp:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Property not found"
+        )
+    headers = http_cache.cache_headers(http_cache.property_etag(property_id, stamp.updated_at), stamp.updated_at)
+    if http_cache.matches(request, headers["ETag"]):
+        return http_cache.not_modified(headers)
+
+    row = projection.project(db.query(Property).filter(Property.id == property_id), projection.PROPERTY_FIELDS).first()
+    if not row:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Property not found"
         )
-    return property_obj
+    body = projection.dump_row(row, list(projection.PROPERTY_FIELDS))
+    response_cache.put(key, body, headers)
+    return Response(body, media_type="application/json", headers=headers)
+
+@router.get("/{property_id}/similar", response_model=list[PropertyResponse])
+def get_similar_properties(
+    property_id: int,
+    limit: int = Query(10, ge=1, le=100),
+    fields: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Get the properties most similar to one (price, area, rooms, bathrooms
+    and location), nearest first
+
+    Scored in memory by ``similar_index`` (one vectorized pass over every
+    property); only the ``limit`` results are then read from the database.
+    """
+    try:
+        field_list = projection.parse_fields(fields) if fields is not None else list(projection.PROPERTY_FIELDS)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    similar_index.ensure_loaded(db)
+    try:
+        ids = similar_index.similar(property_id, limit)
+    except KeyError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Property not found"
+        )
+    rows = load_in_order(projection.project(db.query(Property), dict.fromkeys([*field_list, "id"])), ids)
+    return Response(projection.dump_rows(rows, field_list), media_type="application/json")
 
 @router.post("/", response_model=PropertyResponse, status_code=status.HTTP_201_CREATED)
-def create_property(property_in: PropertyCreate, db: Session = Depends(get_db)):
-    """Create new property"""
-    db_property = Property(**property_in.dict())
-    db.add(db_property)
+def create_property(
+    property_in: PropertyCreate,
+    on_duplicate: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Create new property
+
+    A single ``INSERT ... RETURNING`` gives back the stored row, so no
+    refresh query follows the commit.
+
+    ``on_duplicate`` (default ``DEDUP_ON_DUPLICATE``) checks the listing
+    against the duplicate index first: ``flag`` lists the matching ids in
+    the ``X-Duplicate-Of`` header, ``reject`` answers 409 instead of
+    creating it, ``allow`` skips the check.
+    """
+    values = geo.with_geo_cell(property_in.model_dump())
+    fingerprint = dedup.fingerprint(values)
+    headers = {}
+    try:
+        action = dedup.on_duplicate_action(on_duplicate)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    if action != "allow":
+        duplicate_of, _ = dedup_service.find_duplicates(db, [fingerprint])[0]
+        if duplicate_of:
+            headers["X-Duplicate-Of"] = ",".join(map(str, duplicate_of))
+            if action == "reject":
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail=f"Listing duplicates existing properties: {', '.join(map(str, duplicate_of))}",
+                    headers=headers
+                )
+
+    row = db.execute(insert(Property).returning(*projection.PROPERTY_FIELDS.values()), values).one()
+    new = snapshot(row)
+    facet_service.record_change(db, None, new)
+    market_stats_service.record_change(db, None, new)
+    deal_score_service.record_change(db, None, new)
+    price_history_service.record_change(db, None, new)
+    dedup_service.index(db, [row.id], [fingerprint])
+    version = http_cache.bump_version(db)
     db.commit()
-    db.refresh(db_property)
-    return db_property
+    property_events.publish(None, new, version)
+    return Response(
+        projection.dump_row(row, list(projection.PROPERTY_FIELDS)),
+        status_code=status.HTTP_201_CREATED,
+        media_type="application/json",
+        headers=headers
+    )
+
+@router.post("/batch", response_model=list[Optional[PropertyResponse]])
+def batch_get_properties(
+    batch: PropertyBatchRequest,
+    fields: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Get many properties by id (POST variant of ``GET /?ids=`` for long lists)
+
+    Resolved with a single IN query; results follow the request order with
+    ``null`` for missing ids.
+    """
+    try:
+        check_ids(batch.ids, MAX_BATCH_IDS)
+        field_list = projection.parse_fields(fields) if fields is not None else list(projection.PROPERTY_FIELDS)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    return Response(_batch_response(db, batch.ids, field_list), media_type="application/json")
+
+@router.post("/bulk", response_model=BulkImportReport)
+async def bulk_import_properties(
+    request: Request,
+    batch_size: Optional[int] = Query(None, ge=1, le=10000),
+    on_duplicate: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Bulk create properties from a streamed NDJSON or CSV body
+
+    The format comes from ``Content-Type`` (``application/x-ndjson`` or
+    ``text/csv``). Rows are validated as they arrive and written in batches
+    of ``batch_size`` (default ``BULK_BATCH_SIZE``), one transaction per
+    batch. The response reports every rejected row; good batches are kept
+    even when others fail. ``on_duplicate`` works as for a single creation
+    (duplicates are checked against the catalog and earlier rows): flagged
+    rows are listed under ``duplicates``, rejected ones under ``errors``.
+    Rows that are not valid UTF-8 are rejected like malformed ones; a CSV
+    header that is not is a 400.
+    """
+    try:
+        action = dedup.on_duplicate_action(on_duplicate)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    try:
+        fmt = bulk_import.body_format(request.headers.get("content-type"))
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=str(e)
+        )
+    try:
+        return await bulk_import.import_stream(
+            db, request.stream(), fmt, batch_size or settings.bulk_batch_size, action
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+def _previous_values(property_id: int):
+    """Snapshot columns of a property, locked until the update commits"""
+    return select(*[getattr(Property, name) for name in SNAPSHOT_FIELDS])\
+        .where(Property.id == property_id).with_for_update()
+
+def _update_returning_previous(property_id: int, values: dict):
+    """
+    ``UPDATE ... FROM (SELECT ... FOR UPDATE) RETURNING``: one statement
+    returns the new row and, as ``old_<name>``, the locked previous
+    snapshot values. PostgreSQL only; SQLite reads the subquery after the
+    update.
+    """
+    previous = _previous_values(property_id).subquery("old")
+    return (
+        update(Property)
+        .where(Property.id == previous.c.id)
+        .values(**values)
+        .returning(
+            *projection.PROPERTY_FIELDS.values(),
+            *[previous.c[name].label(f"old_{name}") for name in SNAPSHOT_FIELDS]
+        )
+    )
 
 @router.put("/{property_id}", response_model=PropertyResponse)
+@router.patch("/{property_id}", response_model=PropertyResponse)
 def update_property(
     property_id: int,
     property_in: PropertyUpdate,
     db: Session = Depends(get_db)
 ):
-    """Update property"""
-    db_property = db.query(Property).filter(Property.id == property_id).first()
-    if not db_property:
+    """
+    Update property (PUT and PATCH both apply only the fields sent)
+
+    The row is changed and read back with one ``UPDATE ... RETURNING``.
+    The previous values are only needed when the update touches a column
+    the rollups and write listeners key on (``SNAPSHOT_FIELDS``); otherwise
+    they are the same as the new ones. PostgreSQL returns them from the
+    same statement; elsewhere, and when a single coordinate moves (the
+    grid cell needs the other one), they are read first with
+    ``SELECT ... FOR UPDATE``.
+    """
+    update_data = property_in.model_dump(exclude_unset=True)
+    fields = list(projection.PROPERTY_FIELDS)
+    if not update_data:
+        row = projection.project(db.query(Property).filter(Property.id == property_id), fields).first()
+        if not row:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Property not found"
+            )
+        return Response(projection.dump_row(row, fields), media_type="application/json")
+
+    old = None
+    keyed = bool(update_data.keys() & set(SNAPSHOT_FIELDS))
+    moved = update_data.keys() & {"latitude", "longitude"}
+    returns_previous = keyed and len(moved) != 1 and db.get_bind().dialect.name == "postgresql"
+    if keyed and not returns_previous:
+        old_row = db.execute(_previous_values(property_id)).first()
+        if not old_row:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Property not found"
+            )
+        old = snapshot(old_row)
+    if moved:
+        position = {**(old or {}), **update_data}
+        update_data["geo_cell"] = geo.geo_cell(position["latitude"], position["longitude"])
+
+    if returns_previous:
+        row = db.execute(_update_returning_previous(property_id, update_data)).first()
+        if row:
+            old = {name: row._mapping[f"old_{name}"] for name in SNAPSHOT_FIELDS}
+    else:
+        row = db.execute(
+            update(Property)
+            .where(Property.id == property_id)
+            .values(**update_data)
+            .returning(*projection.PROPERTY_FIELDS.values())
+        ).first()
+    if not row:
+        db.rollback()
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Property not found"
         )
-    
-    update_data = property_in.dict(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(db_property, field, value)
-    
-    db.add(db_property)
+
+    new = snapshot(row)
+    old = old if old is not None else new
+    facet_service.record_change(db, old, new)
+    market_stats_service.record_change(db, old, new)
+    deal_score_service.record_change(db, old, new)
+    price_history_service.record_change(db, old, new)
+    if update_data.keys() & set(dedup.DEDUP_FIELDS):
+        dedup_service.record_change(db, property_id, row._mapping)
+    version = http_cache.bump_version(db)
     db.commit()
-    db.refresh(db_property)
-    return db_property
+    property_events.publish(old, new, version)
+    return Response(projection.dump_row(row, fields), media_type="application/json")
 
 @router.delete("/{property_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_property(property_id: int, db: Session = Depends(get_db)):
-    """Delete property"""
-    db_property = db.query(Property).filter(Property.id == property_id).first()
-    if not db_property:
+    """Delete property with a single ``DELETE ... RETURNING``"""
+    # Rows referencing the property go first: foreign keys are enforced
+    # on PostgreSQL (and on SQLite with PRAGMA foreign_keys=ON)
+    price_history_service.forget(db, property_id)
+    dedup_service.remove(db, property_id)
+    deal_score_service.forget(db, property_id)
+    row = db.execute(
+        delete(Property)
+        .where(Property.id == property_id)
+        .returning(*[getattr(Property, name) for name in SNAPSHOT_FIELDS])
+    ).first()
+    if not row:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Property not found"
         )
-    
-    db.delete(db_property)
+
+    old = snapshot(row)
+    facet_service.record_change(db, old, None)
+    market_stats_service.record_change(db, old, None)
+    deal_score_service.record_change(db, old, None)
+    version = http_cache.bump_version(db)
     db.commit()
+    property_events.publish(old, None, version)
     return None
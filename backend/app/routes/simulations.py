@@ -0,0 +1,141 @@
+import itertools
+import secrets
+from typing import Iterator
+
+import numpy as np
+from fastapi import APIRouter, HTTPException, Response, status
+from fastapi.responses import StreamingResponse
+from pydantic_core import to_json
+from app.config import settings
+from app.schemas import (
+    MonteCarloRequest, MonteCarloResult, ProfitabilityBatchRequest, ProfitabilityParams, ProfitabilityResult,
+    ProfitabilitySweep, ProfitabilitySweepRequest
+)
+from app.services import profitability
+
+router = APIRouter(prefix="/api/simulations", tags=["simulations"])
+
+# Upper bound on deals evaluated by one batch request
+MAX_BATCH_ITEMS = 10000
+
+# Streamed sweep bodies are sent in pieces of about this many bytes
+SWEEP_RESPONSE_CHUNK = 1 << 16
+
+def _nested(values: np.ndarray, decimals: int) -> Iterator[bytes]:
+    """
+    JSON nested lists of rounded values (null for NaN and infinities),
+    encoded one innermost row at a time so that only a row is ever held
+    as Python floats
+    """
+    if values.ndim > 1:
+        yield b"["
+        for position, row in enumerate(values):
+            if position:
+                yield b","
+            yield from _nested(row, decimals)
+        yield b"]"
+        return
+    rounded = np.round(values, decimals)
+    finite = np.isfinite(rounded)
+    yield to_json(rounded.tolist() if finite.all() else np.where(finite, rounded, None).tolist())
+
+def _sweep_body(result: dict) -> Iterator[bytes]:
+    """Sweep response JSON in pieces of about ``SWEEP_RESPONSE_CHUNK`` bytes"""
+    axes = [{"name": axis["name"], "values": axis["values"].tolist()} for axis in result["axes"]]
+    parts = itertools.chain(
+        [b'{"axes":', to_json(axes), b',"gross_margin_percent":'],
+        _nested(result["gross_margin_percent"], 4),
+        [b',"gross_margin_euro":'],
+        _nested(result["gross_margin_euro"], 2),
+        [b',"break_even":{"axis":', to_json(result["break_even"]["axis"]), b',"values":'],
+        _nested(result["break_even"]["values"], 4),
+        [b"}}"],
+    )
+    pending, size = [], 0
+    for part in parts:
+        pending.append(part)
+        size += len(part)
+        if size >= SWEEP_RESPONSE_CHUNK:
+            yield b"".join(pending)
+            pending, size = [], 0
+    if pending:
+        yield b"".join(pending)
+
+@router.post("/profitability", response_model=ProfitabilityResult)
+def simulate_profitability(params: ProfitabilityParams):
+    """
+    Evaluate one buy-renovate-resell deal (same formulas as the frontend
+    simulator): acquisition, works and holding costs, net sale price,
+    gross margin, break-even price and whether the target margin is met
+    """
+    return Response(to_json(profitability.simulate_records([params.model_dump()])[0]), media_type="application/json")
+
+@router.post("/profitability/batch", response_model=list[ProfitabilityResult])
+def simulate_profitability_batch(request: ProfitabilityBatchRequest):
+    """
+    Evaluate many deals in request order
+
+    All deals go through one pass of NumPy array arithmetic, and the
+    results are encoded to JSON without per-item validation.
+    """
+    if len(request.items) > MAX_BATCH_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {MAX_BATCH_ITEMS} items per request"
+        )
+    results = profitability.simulate_records([item.model_dump() for item in request.items])
+    return Response(to_json(results), media_type="application/json")
+
+@router.post("/profitability/sweep", response_model=ProfitabilitySweep)
+def sweep_profitability(request: ProfitabilitySweepRequest):
+    """
+    Sensitivity grid: evaluate every combination of the ``axes`` values
+    (any deal parameters) around the ``base`` deal
+
+    Returns the gross margin surfaces (% and €, nested in axis order) and
+    the break-even frontier: for each combination of the other axes, the
+    ``frontier_axis`` value (default: the last axis) at which the margin
+    turns zero. The grid is computed by NumPy broadcasting, in chunks so
+    that memory stays bounded (at most 1000 values per axis and 1,000,000
+    points), and the body is streamed from the arrays row by row.
+    """
+    try:
+        axes = {name: profitability.axis_values(name, **axis.model_dump()) for name, axis in request.axes.items()}
+        result = profitability.sweep(request.base.model_dump(), axes, request.frontier_axis)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    return StreamingResponse(_sweep_body(result), media_type="application/json")
+
+@router.post("/profitability/monte-carlo", response_model=MonteCarloResult)
+def monte_carlo_profitability(request: MonteCarloRequest):
+    """
+    Margin risk: draw ``scenarios`` deals with the ``distributions``
+    parameters random (triangular, normal or uniform) and the others from
+    ``base``
+
+    Returns the mean, standard deviation and ``percentiles`` of the gross
+    margin (% and €), the probability of missing the target margin and of
+    a loss. Runs are reproducible: the response carries the ``seed`` used
+    (random when not given). Large runs are split into chunks evaluated in
+    a pool of ``MONTE_CARLO_WORKERS`` processes; the result does not
+    depend on the number of workers. Percentiles are within 0.1%.
+    """
+    seed = request.seed if request.seed is not None else secrets.randbits(63)
+    try:
+        result = profitability.monte_carlo(
+            request.base.model_dump(),
+            {name: spec.model_dump() for name, spec in request.distributions.items()},
+            request.scenarios,
+            seed,
+            request.percentiles,
+            workers=settings.monte_carlo_workers,
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    return Response(to_json(result), media_type="application/json")
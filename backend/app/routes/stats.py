@@ -0,0 +1,36 @@
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Query, Request, Response
+from sqlalchemy.orm import Session
+from app.database import get_db
+from app.schemas import PricePerM2Response
+from app.services import http_cache
+from app.services.market_stats import RELATIVE_ACCURACY, market_stats_service
+
+router = APIRouter(prefix="/api/stats", tags=["stats"])
+
+@router.get("/price-per-m2", response_model=PricePerM2Response)
+def get_price_per_m2(
+    request: Request,
+    response: Response,
+    location: Optional[List[str]] = Query(None),
+    db: Session = Depends(get_db)
+):
+    """
+    Get p10, median and p90 price per m² by location
+
+    Repeat ``location`` for several locations (in request order); without
+    it every location is listed, plus ``overall`` for the whole catalog.
+    Read from per-location quantile sketches maintained on every property
+    write, so the cost does not depend on the number of properties.
+    Quantiles are within ``relative_accuracy`` of the exact values.
+    """
+    headers = http_cache.collection_headers(db, request)
+    if http_cache.matches(request, headers["ETag"]):
+        return http_cache.not_modified(headers)
+    response.headers.update(headers)
+
+    return {
+        "relative_accuracy": RELATIVE_ACCURACY,
+        "overall": market_stats_service.overall_price_per_m2(db) if not location else None,
+        "locations": market_stats_service.price_per_m2(db, location),
+    }
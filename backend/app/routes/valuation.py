@@ -0,0 +1,70 @@
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+from app.database import get_db
+from app.schemas import Valuation, ValuationBatchRequest, ValuationRequest
+from app.services.valuation import valuation_model
+
+router = APIRouter(prefix="/api/valuation", tags=["valuation"])
+
+# Upper bound on items valued by one batch request
+MAX_BATCH_ITEMS = 1000
+
+def _value(db: Session, items: List[dict]) -> List[Optional[dict]]:
+    try:
+        return valuation_model.value(db, items)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except LookupError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
+
+@router.post("/", response_model=Valuation)
+def value_features(
+    request: ValuationRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    Estimate the market value of a property described by its features
+    (``area`` required), or of a listing given ``property_id``
+
+    The estimate comes from a hedonic model of the price per m² with
+    location effects, corrected by the nearest comparable listings, whose
+    spread gives the 80% interval (``price_low``/``price_high``).
+    """
+    valuation = _value(db, [request.model_dump()])[0]
+    if valuation is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Property not found"
+        )
+    return valuation
+
+@router.post("/batch", response_model=list[Optional[Valuation]])
+def value_batch(
+    request: ValuationBatchRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    Value several properties at once (same items as ``POST /``), in request
+    order, with ``null`` for items naming a missing listing
+    """
+    if len(request.items) > MAX_BATCH_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {MAX_BATCH_ITEMS} items per request"
+        )
+    return _value(db, [item.model_dump() for item in request.items])
+
+@router.get("/{property_id}", response_model=Valuation)
+def value_property(
+    property_id: int,
+    db: Session = Depends(get_db)
+):
+    """Estimate the market value of a listing from its stored features"""
+    return value_features(ValuationRequest(property_id=property_id), db)
@@ -1,6 +1,6 @@
-from pydantic import BaseModel, EmailStr, field_validator, ConfigDict
+from pydantic import BaseModel, EmailStr, Field, field_validator, ConfigDict
 from datetime import datetime
-from typing import Optional, List
+from typing import Any, Dict, Optional, List
 
 # ==================== Auth Schemas ====================
 
@@ -74,6 +74,8 @@ class PropertyBase(BaseModel):
     rooms: Optional[int] = None
     bathrooms: Optional[int] = None
     area: Optional[int] = None
+    latitude: Optional[float] = Field(None, ge=-90, le=90)
+    longitude: Optional[float] = Field(None, ge=-180, le=180)
 
 class PropertyCreate(PropertyBase):
     """Property creation schema"""
@@ -88,6 +90,8 @@ class PropertyUpdate(BaseModel):
     rooms: Optional[int] = None
     bathrooms: Optional[int] = None
     area: Optional[int] = None
+    latitude: Optional[float] = Field(None, ge=-90, le=90)
+    longitude: Optional[float] = Field(None, ge=-180, le=180)
 
 class PropertyResponse(PropertyBase):
     """Property response schema"""
@@ -97,3 +101,262 @@ class PropertyResponse(PropertyBase):
     
     model_config = ConfigDict(from_attributes=True)
 
+
+class PropertyBatchRequest(BaseModel):
+    """Batch lookup of properties by id"""
+    ids: List[int]
+
+class PropertyPage(BaseModel):
+    """Cursor-paginated page of properties"""
+    items: List[PropertyResponse]
+    next_cursor: Optional[str] = None
+
+# ==================== Map Cluster Schemas ====================
+
+class PropertyCluster(BaseModel):
+    """Grid-cell cluster of properties"""
+    count: int
+    latitude: float
+    longitude: float
+    price_min: float
+    price_median: float
+    price_max: float
+
+class PropertyClusterResponse(BaseModel):
+    """Clusters inside a bounding box at a zoom level"""
+    zoom: int
+    clusters: List[PropertyCluster]
+
+# ==================== Facet Schemas ====================
+
+class FacetCount(BaseModel):
+    """Count of properties for one facet value or bucket"""
+    value: str
+    count: int
+
+class PropertyFacets(BaseModel):
+    """Facet counts for the properties matching the listing filters"""
+    source: str
+    total: int
+    location: List[FacetCount]
+    price: List[FacetCount]
+    rooms: List[FacetCount]
+    area: List[FacetCount]
+
+# ==================== Market Statistics Schemas ====================
+
+class PricePerM2Stats(BaseModel):
+    """Price per m² quantiles over the priced properties with an area"""
+    location: Optional[str] = None
+    count: int
+    p10: Optional[float] = None
+    median: Optional[float] = None
+    p90: Optional[float] = None
+
+class PricePerM2Response(BaseModel):
+    """Price per m² quantiles per location (``overall`` without a location filter)"""
+    relative_accuracy: float
+    overall: Optional[PricePerM2Stats] = None
+    locations: List[PricePerM2Stats]
+
+# ==================== Deal Screener Schemas ====================
+
+class TopDeal(BaseModel):
+    """Property with its deal score (resale at the location's median price per m², default profile)"""
+    property: PropertyResponse
+    gross_margin_percent: float
+    gross_margin_euro: float
+    sale_price_per_m2: float
+
+# ==================== Price History Schemas ====================
+
+class PricePoint(BaseModel):
+    """Asking price from ``changed_at`` on"""
+    changed_at: datetime
+    price: int
+
+class PriceBucket(BaseModel):
+    """Price points aggregated over one time bucket"""
+    start: datetime
+    count: int
+    min: int
+    max: int
+    avg: float
+
+class PriceSeries(BaseModel):
+    """Price history of one property (``points`` or, when downsampled, ``buckets``)"""
+    property_id: int
+    points: Optional[List[PricePoint]] = None
+    buckets: Optional[List[PriceBucket]] = None
+
+class PriceHistoryResponse(BaseModel):
+    """Price series for the requested properties"""
+    interval: Optional[str] = None
+    series: List[PriceSeries]
+
+# ==================== Bulk Import Schemas ====================
+
+class BulkRowError(BaseModel):
+    """Errors for one rejected row of a bulk import"""
+    row: int
+    errors: List[str]
+
+class BulkDuplicate(BaseModel):
+    """Imported row flagged as a near-duplicate of existing properties"""
+    row: int
+    duplicate_of: List[int]
+
+class BulkImportReport(BaseModel):
+    """Outcome of a bulk import"""
+    inserted: int
+    failed: int
+    batches: int
+    errors: List[BulkRowError]
+    duplicates: List[BulkDuplicate] = []
+    errors_omitted: int = 0  # rows left out of ``errors`` past the report limit
+    duplicates_omitted: int = 0
+
+# ==================== Duplicate Detection Schemas ====================
+
+class DuplicateCluster(BaseModel):
+    """Properties detected as the same listing"""
+    ids: List[int]
+
+class DuplicateClusters(BaseModel):
+    """Near-duplicate clusters of the catalog"""
+    candidate_pairs: int
+    clusters: List[DuplicateCluster]
+
+# ==================== Valuation Schemas ====================
+
+class ValuationRequest(BaseModel):
+    """Features to value, or ``property_id`` to value a listing as stored"""
+    property_id: Optional[int] = None
+    area: Optional[int] = Field(None, gt=0)
+    rooms: Optional[int] = None
+    bathrooms: Optional[int] = None
+    location: Optional[str] = None
+
+class ValuationBatchRequest(BaseModel):
+    """Several valuations in one request"""
+    items: List[ValuationRequest]
+
+class Valuation(BaseModel):
+    """Estimated market value with its confidence interval"""
+    property_id: Optional[int] = None
+    area: int
+    rooms: Optional[int] = None
+    bathrooms: Optional[int] = None
+    location: Optional[str] = None
+    price_per_m2: float
+    estimated_price: int
+    price_low: int
+    price_high: int
+    confidence: float
+    comparables: List[int]
+
+# ==================== Simulation Schemas ====================
+
+class ProfitabilityParams(BaseModel):
+    """Buy-renovate-resell deal (defaults are the simulator's)"""
+    # A. Purchase
+    list_price: float = 300000
+    purchase_negotiation: float = 0.05
+    notary_fees: float = 0.08
+    buyer_agency_fees: float = 0.05
+    # B. Works
+    surface: float = 100
+    renovation_cost_per_m2: float = 500
+    contingency_margin: float = 0.1
+    # C. Holding
+    holding_duration_months: float = 6
+    monthly_interest: float = 500
+    monthly_condo_charges: float = 100
+    monthly_property_tax: float = 50
+    # D. Resale
+    target_sale_price_per_m2: float = 4500
+    seller_agency_fees: float = 0.05
+    sale_negotiation: float = 0.02
+    min_profit_margin_percent: float = 20
+    
+    model_config = ConfigDict(extra="forbid")
+
+class ProfitabilityBatchRequest(BaseModel):
+    """Several deals evaluated in one vectorized pass"""
+    items: List[ProfitabilityParams]
+
+class ProfitabilityResult(BaseModel):
+    """Deal outcome (null where the frontend would show NaN or Infinity)"""
+    net_acquisition_cost: Optional[float] = None
+    adjusted_works_cost: Optional[float] = None
+    total_holding_costs: Optional[float] = None
+    total_cost_of_return: Optional[float] = None
+    target_sale_price: Optional[float] = None
+    seller_agency_fees_amount: Optional[float] = None
+    net_sale_price: Optional[float] = None
+    gross_margin_euro: Optional[float] = None
+    gross_margin_percent: Optional[float] = None
+    break_even_price: Optional[float] = None
+    target_met: bool
+
+class SweepAxis(BaseModel):
+    """Values of one swept parameter: ``values``, or ``steps`` points from ``start`` to ``stop``"""
+    values: Optional[List[float]] = None
+    start: Optional[float] = None
+    stop: Optional[float] = None
+    steps: Optional[int] = None
+
+class ProfitabilitySweepRequest(BaseModel):
+    """Grid of deals: ``base`` parameters with some of them swept over ``axes`` (grid axis order)"""
+    base: ProfitabilityParams = ProfitabilityParams()
+    axes: Dict[str, SweepAxis]
+    frontier_axis: Optional[str] = None
+
+class SweepAxisValues(BaseModel):
+    """Values taken by one grid axis"""
+    name: str
+    values: List[float]
+
+class BreakEvenFrontier(BaseModel):
+    """Value of ``axis`` where the margin turns zero, over the other axes (null if it never does)"""
+    axis: str
+    values: Any
+
+class ProfitabilitySweep(BaseModel):
+    """Margin surfaces over the grid, nested in axis order"""
+    axes: List[SweepAxisValues]
+    gross_margin_percent: Any
+    gross_margin_euro: Any
+    break_even: BreakEvenFrontier
+
+class ParameterDistribution(BaseModel):
+    """Distribution of an uncertain deal parameter: triangular, normal (optionally clipped) or uniform"""
+    distribution: str
+    low: Optional[float] = None
+    mode: Optional[float] = None
+    high: Optional[float] = None
+    mean: Optional[float] = None
+    std: Optional[float] = None
+
+class MonteCarloRequest(BaseModel):
+    """Random deals: ``base`` parameters, the ``distributions`` ones drawn per scenario"""
+    base: ProfitabilityParams = ProfitabilityParams()
+    distributions: Dict[str, ParameterDistribution]
+    scenarios: int = 10000
+    seed: Optional[int] = None
+    percentiles: List[float] = [5, 10, 25, 50, 75, 90, 95]
+
+class MarginSummary(BaseModel):
+    """Distribution of a margin over the scenarios (null if no scenario has a finite margin)"""
+    mean: Optional[float] = None
+    std: Optional[float] = None
+    percentiles: Dict[str, Optional[float]]
+
+class MonteCarloResult(BaseModel):
+    """Margin risk over the drawn scenarios; ``seed`` replays the same run"""
+    scenarios: int
+    seed: int
+    gross_margin_percent: MarginSummary
+    gross_margin_euro: MarginSummary
+    probability_below_target: float
+    probability_of_loss: float
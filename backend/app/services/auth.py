@@ -1,8 +1,13 @@
 from datetime import datetime, timedelta
 from typing import Optional
+import hashlib
+import hmac
+import json
+import time
 import bcrypt
 from jose import JWTError, jwt
 from app.config import settings
+from app.services.cache_backends import cache_backend
 import logging
 
 logger = logging.getLogger("auth")
@@ -27,6 +32,14 @@ def _truncate_password(password: str, max_bytes: int = 72) -> str:
     
     return ""  # Fallback (should never happen with valid UTF-8)
 
+def _token_cache_key(token: str) -> str:
+    """
+    Cache key for a verified token: an HMAC with the signing secret, so raw
+    tokens are never stored and rotating the secret invalidates every entry.
+    """
+    digest = hmac.new(settings.secret_key.encode("utf-8"), token.encode("utf-8"), hashlib.sha256)
+    return f"token:{digest.hexdigest()}"
+
 class AuthService:
     """Service for authentication operations"""
     
@@ -90,7 +103,20 @@ class AuthService:
     
     @staticmethod
     def verify_token(token: str) -> Optional[dict]:
-        """Verify and decode JWT token"""
+        """
+        Verify and decode JWT token
+
+        Successful verifications are cached (shared between workers with the
+        sqlite cache backend) until ``TOKEN_CACHE_TTL`` or the token's own
+        expiry, whichever comes first.
+        """
+        key = _token_cache_key(token)
+        if settings.token_cache_ttl > 0:
+            cached = cache_backend.get(key)
+            if cached is not None:
+                payload = json.loads(cached)
+                if payload.get("exp") is None or payload["exp"] > time.time():
+                    return payload
         try:
             payload = jwt.decode(
                 token,
@@ -98,6 +124,11 @@ class AuthService:
                 algorithms=[settings.algorithm]
             )
             logger.debug(f"Token verified for user: {payload.get('sub')}")
+            ttl = settings.token_cache_ttl
+            if payload.get("exp") is not None:
+                ttl = min(ttl, payload["exp"] - time.time())
+            if ttl > 0:
+                cache_backend.set(key, json.dumps(payload).encode("utf-8"), ttl)
             return payload
         except JWTError as e:
             import traceback
@@ -0,0 +1,311 @@
+"""Key/value backends for the response and token caches"""
+import abc
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from app.config import settings
+
+
+class CacheBackend(abc.ABC):
+    """
+    Minimal key/value store used by the caches.
+
+    Values are bytes with a TTL; counters are integers that serve as
+    namespace versions (invalidation bumps a counter instead of deleting
+    keys). A counter never goes back: a missing counter reads as the
+    backend's floor, which deleting a counter raises above its value, so
+    entries stored under an old version stay unreachable. The operations
+    map onto Redis commands (GET, SET PX, DEL, INCR; ``delete_counter`` is
+    a GETDEL plus a floor update in one script) so a Redis backend can
+    implement them directly.
+    """
+
+    @abc.abstractmethod
+    def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def set(self, key: str, value: bytes, ttl_seconds: float) -> None:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def counter(self, key: str) -> int:
+        """Current value of a counter (the floor if it was never incremented)"""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def incr(self, key: str) -> int:
+        """Increment a counter and return its new value"""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def delete_counter(self, key: str) -> None:
+        """Drop a counter that will not be used again; raises the floor past its value"""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def clear(self) -> None:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def stats(self) -> dict:
+        raise NotImplementedError
+
+
+class MemoryBackend(CacheBackend):
+    """Per-process LRU store bounded by entry count"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[bytes, float]]" = OrderedDict()
+        self._counters = {}
+        self._floor = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.evictions += 1
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes, ttl_seconds: float) -> None:
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def counter(self, key: str) -> int:
+        with self._lock:
+            return self._counters.get(key, self._floor)
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            self._counters[key] = self._counters.get(key, self._floor) + 1
+            return self._counters[key]
+
+    def delete_counter(self, key: str) -> None:
+        with self._lock:
+            self._floor = max(self._floor, self._counters.pop(key, self._floor) + 1)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._counters.clear()
+            self._floor = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "backend": "memory",
+                "entries": len(self._entries),
+                "counters": len(self._counters),
+                "max_entries": self.max_entries,
+                "evictions": self.evictions,
+            }
+
+
+class SQLiteBackend(CacheBackend):
+    """
+    Store shared by every worker process on a host, in a local SQLite file.
+
+    WAL mode lets readers proceed while one process writes. Eviction is
+    least-recently-used and bounded by the total size of the stored values;
+    the running total lives in the counters table so that it is shared and
+    updated in the same transaction as the entries.
+    """
+
+    SCHEMA = [
+        """CREATE TABLE IF NOT EXISTS cache_entries (
+            key TEXT PRIMARY KEY,
+            value BLOB NOT NULL,
+            size INTEGER NOT NULL,
+            expires_at REAL NOT NULL,
+            accessed_at REAL NOT NULL
+        )""",
+        "CREATE INDEX IF NOT EXISTS ix_cache_entries_accessed_at ON cache_entries (accessed_at)",
+        "CREATE TABLE IF NOT EXISTS cache_counters (key TEXT PRIMARY KEY, value INTEGER NOT NULL)",
+    ]
+    # Counter holding the size of all stored values
+    BYTES_KEY = "__bytes__"
+    # Counter holding the value read for missing counters
+    FLOOR_KEY = "__floor__"
+    # Hits refresh accessed_at at most this often, to keep reads from writing
+    TOUCH_INTERVAL = 1.0
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self.evictions = 0
+        with self._connect() as connection:
+            for statement in self.SCHEMA:
+                connection.execute(statement)
+
+    def _connect(self) -> sqlite3.Connection:
+        """Connection for the current thread (and process, after a fork)"""
+        connection = getattr(self._local, "connection", None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def get(self, key: str) -> Optional[bytes]:
+        connection = self._connect()
+        row = connection.execute(
+            "SELECT value, expires_at, accessed_at FROM cache_entries WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        value, expires_at, accessed_at = row
+        now = time.time()
+        if expires_at <= now:
+            self.delete(key)
+            return None
+        if accessed_at < now - self.TOUCH_INTERVAL:
+            connection.execute("UPDATE cache_entries SET accessed_at = ? WHERE key = ?", (now, key))
+        return value
+
+    def set(self, key: str, value: bytes, ttl_seconds: float) -> None:
+        connection = self._connect()
+        now = time.time()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            old = connection.execute("SELECT size FROM cache_entries WHERE key = ?", (key,)).fetchone()
+            connection.execute(
+                "INSERT OR REPLACE INTO cache_entries (key, value, size, expires_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, value, len(value), now + ttl_seconds, now)
+            )
+            total = self._add_bytes(connection, len(value) - (old[0] if old else 0))
+            if total > self.max_bytes:
+                self._evict(connection, total, now)
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+
+    def _add_bytes(self, connection: sqlite3.Connection, delta: int) -> int:
+        return connection.execute(
+            "INSERT INTO cache_counters (key, value) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = value + excluded.value RETURNING value",
+            (self.BYTES_KEY, delta)
+        ).fetchone()[0]
+
+    def _evict(self, connection: sqlite3.Connection, total: int, now: float) -> None:
+        """Drop expired entries, then least recently used ones, until under ``max_bytes``"""
+        freed = connection.execute(
+            "DELETE FROM cache_entries WHERE expires_at <= ? RETURNING size", (now,)
+        ).fetchall()
+        freed_bytes = sum(size for size, in freed)
+        victims = []
+        if total - freed_bytes > self.max_bytes:
+            rows = connection.execute("SELECT key, size FROM cache_entries ORDER BY accessed_at")
+            for key, size in rows:
+                victims.append((key,))
+                freed_bytes += size
+                if total - freed_bytes <= self.max_bytes:
+                    break
+            rows.close()
+            connection.executemany("DELETE FROM cache_entries WHERE key = ?", victims)
+        self._add_bytes(connection, -freed_bytes)
+        self.evictions += len(freed) + len(victims)
+
+    def delete(self, key: str) -> None:
+        connection = self._connect()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            freed = connection.execute("DELETE FROM cache_entries WHERE key = ? RETURNING size", (key,)).fetchall()
+            if freed:
+                self._add_bytes(connection, -freed[0][0])
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+
+    def counter(self, key: str) -> int:
+        return self._connect().execute(
+            "SELECT COALESCE((SELECT value FROM cache_counters WHERE key = ?), "
+            "(SELECT value FROM cache_counters WHERE key = ?), 0)",
+            (key, self.FLOOR_KEY)
+        ).fetchone()[0]
+
+    def incr(self, key: str) -> int:
+        return self._connect().execute(
+            "INSERT INTO cache_counters (key, value) "
+            "VALUES (?, COALESCE((SELECT value FROM cache_counters WHERE key = ?), 0) + 1) "
+            "ON CONFLICT(key) DO UPDATE SET value = value + 1 RETURNING value",
+            (key, self.FLOOR_KEY)
+        ).fetchone()[0]
+
+    def delete_counter(self, key: str) -> None:
+        connection = self._connect()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            value = self.counter(key)
+            connection.execute("DELETE FROM cache_counters WHERE key = ?", (key,))
+            connection.execute(
+                "INSERT INTO cache_counters (key, value) VALUES (?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = MAX(value, excluded.value)",
+                (self.FLOOR_KEY, value + 1)
+            )
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+
+    def clear(self) -> None:
+        connection = self._connect()
+        connection.execute("BEGIN IMMEDIATE")
+        connection.execute("DELETE FROM cache_entries")
+        connection.execute("DELETE FROM cache_counters")
+        connection.execute("COMMIT")
+
+    def stats(self) -> dict:
+        entries, = self._connect().execute("SELECT COUNT(*) FROM cache_entries").fetchone()
+        counters, = self._connect().execute("SELECT COUNT(*) FROM cache_counters").fetchone()
+        return {
+            "backend": "sqlite",
+            "path": self.path,
+            "entries": entries,
+            "counters": counters,
+            "bytes": self.counter(self.BYTES_KEY),
+            "max_bytes": self.max_bytes,
+            "evictions": self.evictions,
+        }
+
+
+def create_backend() -> CacheBackend:
+    """Backend selected by ``CACHE_BACKEND`` (``memory`` or ``sqlite``)"""
+    if settings.cache_backend == "sqlite":
+        return SQLiteBackend(settings.cache_path, settings.cache_max_bytes)
+    if settings.cache_backend != "memory":
+        raise ValueError(f"Unknown cache backend: {settings.cache_backend}")
+    return MemoryBackend(settings.response_cache_entries)
+
+
+cache_backend = create_backend()
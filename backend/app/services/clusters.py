@@ -0,0 +1,215 @@
+"""Server-side map clustering over (tile, zoom) grids"""
+import math
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models import Property
+from app.services import http_cache
+from app.services.property_events import Change, next_version, property_events
+
+MAX_ZOOM = 20
+# Each tile is split into CELLS_PER_TILE x CELLS_PER_TILE cluster cells
+CELLS_PER_TILE = 8
+# Upper bound on tiles per request so a zoomed-in client cannot ask for the world
+MAX_TILES = 256
+
+TileKey = Tuple[int, int, int]  # (zoom, tile_x, tile_y)
+
+
+def parse_bbox(value: str) -> Tuple[float, float, float, float]:
+    """Parse ``"west,south,east,north"`` in degrees"""
+    try:
+        west, south, east, north = (float(part) for part in value.split(","))
+    except ValueError as e:
+        raise ValueError("bbox must be 'west,south,east,north'") from e
+    if not (-180 <= west < east <= 180 and -90 <= south < north <= 90):
+        raise ValueError("bbox is out of range or inverted")
+    return west, south, east, north
+
+
+def tile_degrees(zoom: int) -> float:
+    """Side of a square tile in degrees at ``zoom``"""
+    return 360.0 / (2 ** zoom)
+
+
+def _tile_range(low: float, high: float, origin: float, size: float, count: int) -> range:
+    first = min(max(int(math.floor((low - origin) / size)), 0), count - 1)
+    last = min(max(int(math.floor((high - origin) / size)), 0), count - 1)
+    return range(first, last + 1)
+
+
+def tiles_for_bbox(bbox: Tuple[float, float, float, float], zoom: int) -> List[TileKey]:
+    """Tiles at ``zoom`` that intersect the bbox"""
+    west, south, east, north = bbox
+    size = tile_degrees(zoom)
+    columns = 2 ** zoom
+    rows = int(math.ceil(180.0 / size))
+    xs = _tile_range(west, east, -180.0, size, columns)
+    ys = _tile_range(south, north, -90.0, size, rows)
+    if len(xs) * len(ys) > MAX_TILES:
+        raise ValueError("bbox is too large for this zoom level")
+    return [(zoom, x, y) for x in xs for y in ys]
+
+
+def tile_for_point(lat: float, lon: float, zoom: int) -> TileKey:
+    size = tile_degrees(zoom)
+    return (zoom, int(math.floor((lon + 180.0) / size)), int(math.floor((lat + 90.0) / size)))
+
+
+def build_clusters(lats: np.ndarray, lons: np.ndarray, prices: np.ndarray, zoom: int) -> Dict[TileKey, list]:
+    """
+    Group points into grid-cell clusters in one vectorized pass.
+
+    Points are sorted once by (cell, price): cell boundaries then give the
+    counts, ``reduceat`` gives coordinate sums for the centroids, and the
+    first/middle/last price of each run give min/median/max.
+    """
+    if len(lats) == 0:
+        return {}
+
+    cell_size = tile_degrees(zoom) / CELLS_PER_TILE
+    cell_x = np.floor((lons + 180.0) / cell_size).astype(np.int64)
+    cell_y = np.floor((lats + 90.0) / cell_size).astype(np.int64)
+    cell = cell_y * (CELLS_PER_TILE * 2 ** zoom) + cell_x
+
+    order = np.lexsort((prices, cell))
+    cell, cell_x, cell_y = cell[order], cell_x[order], cell_y[order]
+    lats, lons, prices = lats[order], lons[order], prices[order]
+
+    starts = np.flatnonzero(np.r_[True, cell[1:] != cell[:-1]])
+    counts = np.diff(np.r_[starts, len(cell)])
+    centroid_lat = np.add.reduceat(lats, starts) / counts
+    centroid_lon = np.add.reduceat(lons, starts) / counts
+    price_min = prices[starts]
+    price_max = prices[starts + counts - 1]
+    price_median = (prices[starts + (counts - 1) // 2] + prices[starts + counts // 2]) / 2.0
+    tile_x = cell_x[starts] // CELLS_PER_TILE
+    tile_y = cell_y[starts] // CELLS_PER_TILE
+
+    tiles: Dict[TileKey, list] = {}
+    for i in range(len(starts)):
+        tiles.setdefault((zoom, int(tile_x[i]), int(tile_y[i])), []).append({
+            "count": int(counts[i]),
+            "latitude": float(centroid_lat[i]),
+            "longitude": float(centroid_lon[i]),
+            "price_min": float(price_min[i]),
+            "price_median": float(price_median[i]),
+            "price_max": float(price_max[i]),
+        })
+    return tiles
+
+
+class ClusterCache:
+    """
+    Bounded LRU cache of clusters per (zoom, tile_x, tile_y).
+
+    Writes drop the tiles containing the old and new position of the
+    property at every zoom level. A generation counter keeps a computation
+    that raced with a write from storing stale clusters. ``version`` is
+    the table version the tiles reflect: when the database is ahead of it
+    (a write from another worker process) the whole cache is dropped.
+    """
+
+    def __init__(self, max_tiles: int):
+        self.max_tiles = max_tiles
+        self._tiles: "OrderedDict[TileKey, list]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.generation = 0
+        self.version: Optional[int] = None
+
+    def get(self, key: TileKey) -> Optional[list]:
+        with self._lock:
+            clusters = self._tiles.get(key)
+            if clusters is not None:
+                self._tiles.move_to_end(key)
+            return clusters
+
+    def put(self, key: TileKey, clusters: list, generation: int) -> None:
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._tiles[key] = clusters
+            self._tiles.move_to_end(key)
+            while len(self._tiles) > self.max_tiles:
+                self._tiles.popitem(last=False)
+
+    def invalidate_point(self, lat: Optional[float], lon: Optional[float]) -> None:
+        with self._lock:
+            self.generation += 1
+            if lat is None or lon is None:
+                return
+            for zoom in range(MAX_ZOOM + 1):
+                self._tiles.pop(tile_for_point(lat, lon, zoom), None)
+
+    def advance(self, version: Optional[int]) -> None:
+        """Record that the writes of ``version`` were applied"""
+        with self._lock:
+            self.version = next_version(self.version, version)
+
+    def sync(self, version: int) -> None:
+        """Drop every tile unless they reflect ``version``, the one in the database"""
+        with self._lock:
+            if version != self.version:
+                self.generation += 1
+                self._tiles.clear()
+                self.version = version
+
+    def clear(self) -> None:
+        with self._lock:
+            self.generation += 1
+            self._tiles.clear()
+            self.version = None
+
+
+cluster_cache = ClusterCache(settings.cluster_cache_tiles)
+
+
+@property_events.subscribe_batch
+def invalidate_clusters(changes: List[Change], version: Optional[int]) -> None:
+    """Drop cached tiles touched by a committed write or batch"""
+    for old, new in changes:
+        for state in (old, new):
+            if state is not None:
+                cluster_cache.invalidate_point(state["latitude"], state["longitude"])
+    cluster_cache.advance(version)
+
+
+def get_clusters(db: Session, bbox: Tuple[float, float, float, float], zoom: int) -> list:
+    """Clusters for every tile intersecting ``bbox``, computing missing tiles in one query"""
+    tiles = tiles_for_bbox(bbox, zoom)
+    cluster_cache.sync(http_cache.current_version(db)[0])
+    found = {key: cluster_cache.get(key) for key in tiles}
+    missing = [key for key, clusters in found.items() if clusters is None]
+
+    if missing:
+        generation = cluster_cache.generation
+        size = tile_degrees(zoom)
+        min_x = min(x for _, x, _ in missing)
+        max_x = max(x for _, x, _ in missing)
+        min_y = min(y for _, _, y in missing)
+        max_y = max(y for _, _, y in missing)
+        rows = db.query(Property.latitude, Property.longitude, Property.price).filter(
+            Property.latitude >= -90.0 + min_y * size,
+            Property.latitude < -90.0 + (max_y + 1) * size,
+            Property.longitude >= -180.0 + min_x * size,
+            Property.longitude < -180.0 + (max_x + 1) * size,
+        ).all()
+
+        data = np.array(rows, dtype=np.float64).reshape(-1, 3)
+        computed = build_clusters(data[:, 0], data[:, 1], data[:, 2], zoom)
+        for key in missing:
+            found[key] = computed.get(key, [])
+            cluster_cache.put(key, found[key], generation)
+
+    west, south, east, north = bbox
+    return [
+        cluster
+        for key in tiles
+        for cluster in found[key]
+        if west <= cluster["longitude"] <= east and south <= cluster["latitude"] <= north
+    ]
@@ -0,0 +1,194 @@
+"""Deal screener: precomputed profitability score of every property"""
+import logging
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+
+from app.models import Property, PropertyDealScore
+from app.services import http_cache, profitability
+from app.services.market_stats import market_stats_service, price_m2_bin
+from app.services.property_events import property_events
+
+logger = logging.getLogger("api")
+
+# Default deal profile: the simulator defaults for fees, works, holding and
+# resale costs. Each property brings its asking price and surface, and its
+# location the resale price per m² (median of the location's sketch).
+PROFILE = {
+    name: value for name, value in profitability.DEFAULTS.items()
+    if name not in ("list_price", "surface", "target_sale_price_per_m2")
+}
+SCORED_FIELDS = ("location", "price", "area")
+REBUILD_CHUNK = 50_000
+
+
+def score_rows(rows: Iterable[tuple], medians: Dict[str, float]) -> List[dict]:
+    """
+    Score rows for ``(id, location, price, area)`` tuples in one vectorized
+    simulation; properties without a price per m² are left out.
+    """
+    rows = [row for row in rows if price_m2_bin(row[2], row[3]) is not None and row[1] in medians]
+    if not rows:
+        return []
+    ids, locations, prices, areas = zip(*rows)
+    results = profitability.simulate({
+        **PROFILE,
+        "list_price": np.array(prices, dtype=float),
+        "surface": np.array(areas, dtype=float),
+        "target_sale_price_per_m2": np.array([medians[location] for location in locations]),
+    })
+    return [
+        {"property_id": property_id, "location": location, "sale_price_m2": medians[location],
+         "score": score, "gross_margin_euro": margin}
+        for property_id, location, score, margin in zip(
+            ids, locations, results["gross_margin_percent"].tolist(), results["gross_margin_euro"].tolist()
+        )
+    ]
+
+
+class DealScoreService:
+    """Service maintaining and reading the deal scores"""
+
+    @staticmethod
+    def _insert(db: Session, rows: Iterable[tuple], medians: Dict[str, float]) -> int:
+        scores = score_rows(rows, medians)
+        if scores:
+            db.execute(insert(PropertyDealScore.__table__), scores)
+        return len(scores)
+
+    @staticmethod
+    def _stale(db: Session, locations: Iterable[str], medians: Dict[str, Optional[float]]) -> Dict[str, Optional[float]]:
+        """
+        Median each location's stored scores were computed with (None
+        when it has no scores), for the ``locations`` where it no longer
+        matches ``medians``; one index lookup per location.
+        """
+        stored = {
+            location: db.execute(
+                select(PropertyDealScore.sale_price_m2).where(PropertyDealScore.location == location).limit(1)
+            ).scalar()
+            for location in locations
+        }
+        return {location: median for location, median in stored.items() if median != medians.get(location)}
+
+    @classmethod
+    def _rescore(cls, db: Session, locations: List[str], medians: Dict[str, float]) -> None:
+        db.execute(delete(PropertyDealScore).where(PropertyDealScore.location.in_(locations)))
+        cls._insert(db, db.execute(
+            select(Property.id, Property.location, Property.price, Property.area)
+            .where(Property.location.in_(locations))
+        ), medians)
+
+    @classmethod
+    def _refresh(cls, db: Session, locations: set, new: List[dict]) -> None:
+        """
+        Score the ``new`` property states. A location whose median price
+        per m² no longer matches its stored scores is rescored as a whole
+        (which covers its new properties); the median is a sketch bin, so
+        it only moves when it crosses a 1% bin.
+        """
+        medians = market_stats_service.medians(db, list(locations))
+        stale = list(cls._stale(db, locations, medians))
+        if stale:
+            cls._rescore(db, stale, medians)
+        cls._insert(db, [
+            (state["id"], state["location"], state["price"], state["area"])
+            for state in new if state["location"] not in stale
+        ], medians)
+
+    @classmethod
+    def record_change(cls, db: Session, old: Optional[dict], new: Optional[dict]) -> None:
+        """
+        Apply one property write to the scores.
+
+        Called by the write routes after the price per m² sketches are
+        updated and before ``commit``, in the same transaction. A deleted
+        property's score is already gone (``forget``).
+        """
+        if old is not None and new is not None and all(old[name] == new[name] for name in SCORED_FIELDS):
+            return
+        if new is not None:
+            cls.forget(db, new["id"])
+        locations = {changed["location"] for changed in (old, new) if changed is not None}
+        cls._refresh(db, locations, [new] if new is not None else [])
+
+    @staticmethod
+    def forget(db: Session, property_id: int) -> None:
+        """Drop the score of a property; called before deleting the property, as the score references it"""
+        db.execute(delete(PropertyDealScore).where(PropertyDealScore.property_id == property_id))
+
+    @classmethod
+    def record_inserts(cls, db: Session, states: List[dict]) -> None:
+        """
+        Score a batch of new properties (states with their ``id``).
+
+        New properties are scored at the median their location's scores
+        already use, so a location stays consistent and is never rescored
+        per batch; ``refresh`` brings the moved locations up to date once
+        the import is done.
+        """
+        locations = {state["location"] for state in states}
+        medians = market_stats_service.medians(db, list(locations))
+        stored = {location: median for location, median in cls._stale(db, locations, medians).items() if median}
+        cls._insert(db, [
+            (state["id"], state["location"], state["price"], state["area"]) for state in states
+        ], {**medians, **stored})
+
+    @classmethod
+    def refresh(cls, db: Session, locations: Iterable[str]) -> List[str]:
+        """
+        Rescore the locations whose median moved, in one transaction;
+        returns them. The version bump is published without changes so
+        in-memory structures keep following the table version.
+        """
+        locations = set(locations)
+        medians = market_stats_service.medians(db, list(locations))
+        stale = sorted(cls._stale(db, locations, medians))
+        if stale:
+            cls._rescore(db, stale, medians)
+            version = http_cache.bump_version(db)
+            db.commit()
+            property_events.publish_many([], version)
+        return stale
+
+    @classmethod
+    def rebuild(cls, db: Session) -> int:
+        """Recompute every score from ``properties`` and the sketches; returns the score count"""
+        medians = market_stats_service.medians(db)
+        db.query(PropertyDealScore).delete()
+        rows = db.execute(
+            select(Property.id, Property.location, Property.price, Property.area)
+            .where(Property.price > 0, Property.area > 0)
+            .execution_options(yield_per=REBUILD_CHUNK)
+        )
+        count = sum(cls._insert(db, chunk, medians) for chunk in rows.partitions())
+        db.commit()
+        logger.info(f"Deal scores rebuilt: {count} properties")
+        return count
+
+    @classmethod
+    def ensure_built(cls, db: Session) -> bool:
+        """Build the scores for a database that has properties but no scores yet"""
+        if db.query(PropertyDealScore).first() is None and db.query(Property).first() is not None:
+            cls.rebuild(db)
+            return True
+        return False
+
+    @staticmethod
+    def top(db: Session, limit: int, locations: Optional[List[str]] = None) -> list:
+        """
+        Best scores first, read from the score index: ``(property_id,
+        score, gross_margin_euro, sale_price_m2)`` rows.
+        """
+        query = db.query(
+            PropertyDealScore.property_id, PropertyDealScore.score,
+            PropertyDealScore.gross_margin_euro, PropertyDealScore.sale_price_m2
+        )
+        if locations:
+            query = query.filter(PropertyDealScore.location.in_(locations))
+        return query.order_by(PropertyDealScore.score.desc(), PropertyDealScore.property_id.desc()).limit(limit).all()
+
+
+deal_score_service = DealScoreService()
@@ -0,0 +1,405 @@
+"""
+Near-duplicate listing detection with MinHash and locality-sensitive hashing
+
+A listing is reduced to a set of tokens: character shingles of its title
+and description plus normalized location, price and area. The MinHash
+signature of that set estimates Jaccard similarity (the share of equal
+signature slots). Signatures are cut into bands; listings sharing any band
+hash land in the same LSH bucket, and only listings sharing a bucket are
+compared. Lookups and catalog clustering therefore cost time proportional
+to the bucket sizes instead of the number of listing pairs.
+"""
+import hashlib
+import logging
+import math
+import re
+import unicodedata
+import zlib
+from typing import List, Mapping, NamedTuple, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models import Property, PropertyLshBucket, PropertySignature
+
+logger = logging.getLogger("api")
+
+# What ingest does with a listing that matches an existing one
+ON_DUPLICATE = ("allow", "flag", "reject")
+# Columns the fingerprint is computed from
+DEDUP_FIELDS = ("title", "description", "location", "price", "area")
+
+SHINGLE_SIZE = 4  # bytes, so that a shingle is read as one 32-bit integer
+BANDS = 32
+ROWS = 4  # signature slots per band: candidates from about (1 / BANDS) ** (1 / ROWS) = 0.42 similarity
+NUM_PERM = BANDS * ROWS
+# Price and area are bucketed on a log scale with this step
+FEATURE_STEP = 0.05
+# Ids loaded per IN query
+CHUNK_SIZE = 1000
+# Tokens hashed per array operation when computing signatures
+TOKEN_CHUNK = 4096
+# Candidate pairs checked per array operation when clustering
+PAIR_CHUNK = 100_000
+# Buckets with at most this many members are paired exhaustively when
+# clustering; larger ones (shared boilerplate) only pair consecutive ids
+MAX_BUCKET_PAIRING = 64
+
+
+def _constants(name: str, count: int) -> np.ndarray:
+    """Fixed pseudo-random 64-bit constants, so that stored signatures stay valid across processes"""
+    return np.array([
+        int.from_bytes(hashlib.blake2b(f"{name}{i}".encode(), digest_size=8).digest(), "little")
+        for i in range(count)
+    ], dtype=np.uint64)
+
+
+# Multiply-shift hash family h(x) = (a * x + b) >> 32 (mod 2**64), one
+# (a, b) per signature slot; a is odd
+_MULTIPLIERS = _constants("a", NUM_PERM) | np.uint64(1)
+_OFFSETS = _constants("b", NUM_PERM)
+_SHIFT = np.uint64(32)
+# Band keys are a multiply-add of the band's slots
+_BAND_MULTIPLIERS = _constants("row", ROWS) | np.uint64(1)
+_BAND_SALTS = _constants("band", BANDS)
+_BYTE_SHIFTS = np.arange(0, 8 * SHINGLE_SIZE, 8, dtype=np.uint64)
+
+
+class Fingerprint(NamedTuple):
+    """MinHash signature of a listing, its LSH bucket keys and the numeric features checked on match"""
+    signature: np.ndarray
+    buckets: List[int]
+    price: Optional[int]
+    area: Optional[int]
+
+
+def normalize(text: Optional[str]) -> str:
+    """Lowercase ASCII, accents removed, punctuation and repeated spaces collapsed"""
+    if not text:
+        return ""
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii")
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", text.lower()).split())
+
+
+def _log_bucket(value: Optional[int]) -> Optional[int]:
+    if value is None or value <= 0:
+        return None
+    return round(math.log(value) / math.log1p(FEATURE_STEP))
+
+
+def token_hashes(values: Mapping) -> np.ndarray:
+    """
+    32-bit tokens of a listing: every ``SHINGLE_SIZE``-byte shingle of the
+    normalized title and description, plus location, price and area tokens
+    """
+    text = normalize(f"{values.get('title') or ''} {values.get('description') or ''}").encode().ljust(SHINGLE_SIZE)
+    windows = np.lib.stride_tricks.sliding_window_view(np.frombuffer(text, dtype=np.uint8), SHINGLE_SIZE)
+    shingles = (windows.astype(np.uint64) << _BYTE_SHIFTS).sum(axis=1)
+    features = [
+        zlib.crc32(f"location:{normalize(values.get('location'))}".encode()),
+        zlib.crc32(f"price:{_log_bucket(values.get('price'))}".encode()),
+        zlib.crc32(f"area:{_log_bucket(values.get('area'))}".encode()),
+    ]
+    return np.concatenate([np.unique(shingles), np.array(features, dtype=np.uint64)])
+
+
+def signatures(hashes: List[np.ndarray]) -> np.ndarray:
+    """
+    MinHash signatures, one row per token array. Listings are processed
+    together, ``TOKEN_CHUNK`` tokens at a time: every token is hashed by all
+    slots in one operation and ``minimum.reduceat`` takes each listing's
+    minimum.
+    """
+    result = np.empty((len(hashes), NUM_PERM), dtype="<u4")
+    start = 0
+    while start < len(hashes):
+        end, size = start + 1, len(hashes[start])
+        while end < len(hashes) and size + len(hashes[end]) <= TOKEN_CHUNK:
+            size += len(hashes[end])
+            end += 1
+        lengths = [len(h) for h in hashes[start:end]]
+        # Slots x tokens: each listing's tokens are contiguous along the fast axis
+        hashed = np.multiply.outer(_MULTIPLIERS, np.concatenate(hashes[start:end]))
+        hashed += _OFFSETS[:, None]
+        hashed >>= _SHIFT
+        result[start:end] = np.minimum.reduceat(hashed, np.cumsum([0] + lengths[:-1]), axis=1).T
+        start = end
+    return result
+
+
+def bucket_keys(signature_rows: np.ndarray) -> np.ndarray:
+    """Signed 64-bit key per listing and band (the band is part of the key)"""
+    bands = signature_rows.reshape(len(signature_rows), BANDS, ROWS).astype(np.uint64)
+    return ((bands * _BAND_MULTIPLIERS).sum(axis=2) + _BAND_SALTS).view(np.int64)
+
+
+def fingerprints(rows: List[Mapping]) -> List[Fingerprint]:
+    """Fingerprints of listings from their column values"""
+    if not rows:
+        return []
+    signature_rows = signatures([token_hashes(values) for values in rows])
+    keys = bucket_keys(signature_rows).tolist()
+    return [
+        Fingerprint(signature, buckets, values.get("price"), values.get("area"))
+        for signature, buckets, values in zip(signature_rows, keys, rows)
+    ]
+
+
+def fingerprint(values: Mapping) -> Fingerprint:
+    """Fingerprint of one listing"""
+    return fingerprints([values])[0]
+
+
+def on_duplicate_action(value: Optional[str]) -> str:
+    """Validated ``on_duplicate`` parameter (``DEDUP_ON_DUPLICATE`` when not given)"""
+    action = value or settings.dedup_on_duplicate
+    if action not in ON_DUPLICATE:
+        raise ValueError(f"on_duplicate must be one of: {', '.join(ON_DUPLICATE)}")
+    return action
+
+
+def _close(a: Optional[int], b: Optional[int]) -> bool:
+    """Whether two prices or areas agree within the tolerance (unknown agrees)"""
+    if a is None or b is None:
+        return True
+    return abs(a - b) <= settings.dedup_price_tolerance * max(abs(a), abs(b))
+
+
+def _close_array(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """``_close`` over arrays, NaN standing for unknown"""
+    with np.errstate(invalid="ignore"):
+        within = np.abs(a - b) <= settings.dedup_price_tolerance * np.maximum(np.abs(a), np.abs(b))
+    return np.isnan(a) | np.isnan(b) | within
+
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Jaccard similarity estimated from two signatures"""
+    return float(np.mean(a == b))
+
+
+def is_duplicate(a: Fingerprint, b: Fingerprint, threshold: Optional[float] = None) -> bool:
+    """Signature similarity above ``threshold`` with matching price and area"""
+    threshold = settings.dedup_threshold if threshold is None else threshold
+    return similarity(a.signature, b.signature) >= threshold and _close(a.price, b.price) and _close(a.area, b.area)
+
+
+class UnionFind:
+    """Disjoint sets over integer ids"""
+
+    def __init__(self):
+        self.parent = {}
+
+    def find(self, x: int) -> int:
+        self.parent.setdefault(x, x)
+        while self.parent[x] != x:
+            self.parent[x] = self.parent[self.parent[x]]
+            x = self.parent[x]
+        return x
+
+    def union(self, a: int, b: int) -> None:
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a != root_b:
+            self.parent[max(root_a, root_b)] = min(root_a, root_b)
+
+    def groups(self) -> List[List[int]]:
+        members = {}
+        for x in self.parent:
+            members.setdefault(self.find(x), []).append(x)
+        return [sorted(group) for group in members.values()]
+
+
+def bucket_pairs(rows: np.ndarray) -> np.ndarray:
+    """
+    Distinct candidate pairs (smaller id first) from ``(bucket,
+    property_id)`` rows sorted by bucket: every pair within buckets of up
+    to ``MAX_BUCKET_PAIRING`` members, consecutive members in larger ones.
+    """
+    if not len(rows):
+        return np.empty((0, 2), dtype=np.int64)
+    starts = np.flatnonzero(np.r_[True, rows[1:, 0] != rows[:-1, 0]])
+    sizes = np.diff(np.r_[starts, len(rows)])
+    members = rows[:, 1]
+    # Crowded buckets: each member with the next one of the same bucket
+    crowded = np.repeat(sizes > MAX_BUCKET_PAIRING, sizes)[:-1] & (rows[1:, 0] == rows[:-1, 0])
+    pairs = [np.column_stack([members[:-1][crowded], members[1:][crowded]])]
+    # Other buckets, one array operation per bucket size
+    for size in np.unique(sizes[sizes <= MAX_BUCKET_PAIRING]).tolist():
+        grouped = members[starts[sizes == size][:, None] + np.arange(size)]
+        first, second = np.triu_indices(size, 1)
+        pairs.append(np.column_stack([grouped[:, first].ravel(), grouped[:, second].ravel()]))
+    return np.unique(np.concatenate(pairs), axis=0)
+
+
+class DedupService:
+    """
+    LSH index of property fingerprints.
+
+    ``property_signatures`` keeps each signature (with price and area for
+    the match check) and ``property_lsh_buckets`` maps bucket keys to
+    properties. The write paths keep both in the same transaction as the
+    property, like the facet rollups.
+    """
+
+    @staticmethod
+    def index(db: Session, property_ids: List[int], fingerprints: List[Fingerprint]) -> None:
+        """Add new properties to the index (two executemany INSERTs)"""
+        if not property_ids:
+            return
+        db.execute(insert(PropertySignature.__table__), [
+            {"property_id": property_id, "signature": fp.signature.tobytes(), "price": fp.price, "area": fp.area}
+            for property_id, fp in zip(property_ids, fingerprints)
+        ])
+        db.execute(insert(PropertyLshBucket.__table__), [
+            {"bucket": bucket, "property_id": property_id}
+            for property_id, fp in zip(property_ids, fingerprints)
+            for bucket in dict.fromkeys(fp.buckets)
+        ])
+
+    @staticmethod
+    def remove(db: Session, property_id: int) -> None:
+        """Drop a property from the index; its bucket rows are found from the stored signature"""
+        stored = db.execute(
+            delete(PropertySignature)
+            .where(PropertySignature.property_id == property_id)
+            .returning(PropertySignature.signature)
+        ).scalar()
+        if stored is None:
+            return
+        db.execute(delete(PropertyLshBucket).where(
+            PropertyLshBucket.property_id == property_id,
+            PropertyLshBucket.bucket.in_(bucket_keys(np.frombuffer(stored, dtype="<u4")[None])[0].tolist())
+        ))
+
+    @classmethod
+    def record_change(cls, db: Session, property_id: int, values: Optional[Mapping]) -> None:
+        """
+        Re-index a property after an update (``values`` None: drop it; a
+        property about to be deleted is removed before its row goes, as the
+        signature references it)
+        """
+        cls.remove(db, property_id)
+        if values is not None:
+            cls.index(db, [property_id], [fingerprint(values)])
+
+    @staticmethod
+    def _load(db: Session, property_ids) -> dict:
+        """Stored fingerprints by property id, in chunks of ``CHUNK_SIZE`` ids"""
+        property_ids = list(property_ids)
+        loaded = {}
+        for start in range(0, len(property_ids), CHUNK_SIZE):
+            rows = db.connection().execute(
+                select(PropertySignature.property_id, PropertySignature.signature,
+                       PropertySignature.price, PropertySignature.area)
+                .where(PropertySignature.property_id.in_(property_ids[start:start + CHUNK_SIZE]))
+            )
+            for property_id, signature, price, area in rows:
+                loaded[property_id] = Fingerprint(np.frombuffer(signature, dtype="<u4"), [], price, area)
+        return loaded
+
+    @classmethod
+    def find_duplicates(cls, db: Session, fingerprints: List[Fingerprint]) -> List[Tuple[List[int], List[int]]]:
+        """
+        For each new listing, the ids of indexed properties it duplicates and
+        the positions of earlier listings of the same batch it duplicates.
+
+        One query fetches every bucket shared with the index, one more loads
+        the candidates' signatures; only candidates are compared.
+        """
+        keys = {bucket for fp in fingerprints for bucket in fp.buckets}
+        candidates = {}
+        for start in range(0, len(keys), CHUNK_SIZE):
+            chunk = list(keys)[start:start + CHUNK_SIZE]
+            rows = db.execute(
+                select(PropertyLshBucket.bucket, PropertyLshBucket.property_id)
+                .where(PropertyLshBucket.bucket.in_(chunk))
+            )
+            for bucket, property_id in rows:
+                candidates.setdefault(bucket, set()).add(property_id)
+        stored = cls._load(db, set().union(*candidates.values()))
+
+        results = []
+        batch_buckets = {}
+        for position, fp in enumerate(fingerprints):
+            existing = set().union(*(candidates.get(bucket, ()) for bucket in fp.buckets))
+            earlier = set().union(*(batch_buckets.get(bucket, ()) for bucket in fp.buckets))
+            results.append((
+                sorted(i for i in existing if i in stored and is_duplicate(fp, stored[i])),
+                sorted(j for j in earlier if is_duplicate(fp, fingerprints[j])),
+            ))
+            for bucket in fp.buckets:
+                batch_buckets.setdefault(bucket, set()).add(position)
+        return results
+
+    @classmethod
+    def clusters(cls, db: Session, threshold: Optional[float] = None, min_size: int = 2) -> dict:
+        """
+        Group the whole catalog into clusters of near-duplicates.
+
+        Candidate pairs come from one scan of the shared buckets in primary
+        key order: members of a bucket of up to ``MAX_BUCKET_PAIRING`` ids
+        are all paired with each other, so two duplicates are compared
+        whenever they share a bucket. In larger buckets only consecutive
+        ids are paired, which keeps the work linear there but can miss a
+        pair that no other bucket links (the union-find still joins members
+        reached through different buckets). Pairs are then checked with
+        array operations, ``PAIR_CHUNK`` at a time.
+        """
+        buckets = PropertyLshBucket.__table__
+        shared = select(buckets.c.bucket)\
+            .group_by(buckets.c.bucket)\
+            .having(func.count() > 1)\
+            .subquery()
+        rows = np.array(db.connection().execute(
+            select(buckets.c.bucket, buckets.c.property_id)
+            .join(shared, buckets.c.bucket == shared.c.bucket)
+            .order_by(buckets.c.bucket, buckets.c.property_id)
+        ).all(), dtype=np.int64).reshape(-1, 2)
+        pairs = bucket_pairs(rows)
+
+        stored = cls._load(db, np.unique(pairs).tolist())
+        ids = np.array(sorted(stored), dtype=np.int64)
+        candidates = np.searchsorted(ids, pairs[np.isin(pairs, ids).all(axis=1)])
+        sets = UnionFind()
+        if len(candidates):
+            signatures = np.stack([stored[i].signature for i in ids.tolist()])
+            prices = np.array([np.nan if stored[i].price is None else stored[i].price for i in ids.tolist()])
+            areas = np.array([np.nan if stored[i].area is None else stored[i].area for i in ids.tolist()])
+            threshold = settings.dedup_threshold if threshold is None else threshold
+            for start in range(0, len(candidates), PAIR_CHUNK):
+                chunk = candidates[start:start + PAIR_CHUNK]
+                a, b = chunk[:, 0], chunk[:, 1]
+                matches = (signatures[a] == signatures[b]).mean(axis=1) >= threshold
+                matches &= _close_array(prices[a], prices[b]) & _close_array(areas[a], areas[b])
+                for x, y in ids[chunk[matches]].tolist():
+                    sets.union(x, y)
+
+        clusters = sorted((group for group in sets.groups() if len(group) >= min_size), key=lambda group: group[0])
+        return {"candidate_pairs": len(pairs), "clusters": [{"ids": group} for group in clusters]}
+
+    @classmethod
+    def rebuild(cls, db: Session) -> int:
+        """Recompute the index from ``properties``; returns the number of properties indexed"""
+        db.execute(delete(PropertyLshBucket))
+        db.execute(delete(PropertySignature))
+        columns = [Property.id] + [getattr(Property, name) for name in DEDUP_FIELDS]
+        rows = db.execute(select(*columns).order_by(Property.id).execution_options(yield_per=CHUNK_SIZE))
+        count = 0
+        for chunk in rows.partitions():
+            cls.index(db, [row.id for row in chunk], fingerprints([row._mapping for row in chunk]))
+            count += len(chunk)
+        db.commit()
+        logger.info(f"Duplicate index rebuilt: {count} properties")
+        return count
+
+    @classmethod
+    def ensure_built(cls, db: Session) -> bool:
+        """Build the index for a database that has properties but no signatures yet"""
+        if db.query(PropertySignature.property_id).first() is None and db.query(Property.id).first() is not None:
+            cls.rebuild(db)
+            return True
+        return False
+
+
+dedup_service = DedupService()
@@ -0,0 +1,58 @@
+"""Streaming export of the property catalog (NDJSON / CSV)"""
+import csv
+import io
+import json
+from typing import Iterator, List
+
+from sqlalchemy.orm import Query
+
+from app.models import Property
+from app.services import projection
+
+# Rows fetched per round-trip from the server-side cursor, and per chunk sent
+EXPORT_BATCH_SIZE = 1000
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+def _rows(query: Query, fields: List[str]):
+    """
+    Iterate projected rows in id order through a server-side cursor.
+
+    ``yield_per`` streams results in batches instead of buffering the
+    whole result set, so memory stays constant whatever the catalog size.
+    """
+    projected = projection.project(query.order_by(Property.id), fields)
+    return projected.execution_options(yield_per=EXPORT_BATCH_SIZE, stream_results=True)
+
+
+def stream_ndjson(query: Query, fields: List[str]) -> Iterator[bytes]:
+    """One JSON object per line"""
+    lines = []
+    for row in _rows(query, fields):
+        lines.append(json.dumps(projection.serialize_row(row, fields), ensure_ascii=False))
+        if len(lines) >= EXPORT_BATCH_SIZE:
+            yield ("\n".join(lines) + "\n").encode("utf-8")
+            lines = []
+    if lines:
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def stream_csv(query: Query, fields: List[str]) -> Iterator[bytes]:
+    """CSV with a header row"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    count = 0
+    for row in _rows(query, fields):
+        writer.writerow([projection.encode_value(getattr(row, name)) for name in fields])
+        count += 1
+        if count % EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
@@ -0,0 +1,248 @@
+"""Facet counts (location, price, rooms, area) backed by rollup tables"""
+import bisect
+import logging
+from collections import Counter
+from typing import List, Optional
+
+from sqlalchemy import case, func, insert
+from sqlalchemy.orm import Query, Session
+
+from app.models import Property, PropertyFacetRollup
+from app.services.property_search import PropertyFilters
+
+logger = logging.getLogger("api")
+
+UNKNOWN = -1
+
+
+class Buckets:
+    """
+    Integer buckets defined by ascending edges.
+
+    Bucket ``i`` holds ``edges[i] <= value < edges[i + 1]``; the first bucket
+    also takes values below ``edges[0]`` and the last one is open-ended.
+    """
+
+    def __init__(self, edges: List[int]):
+        self.edges = edges
+
+    def index(self, value: Optional[int]) -> int:
+        if value is None:
+            return UNKNOWN
+        return max(bisect.bisect_right(self.edges, value) - 1, 0)
+
+    def sql(self, column):
+        """SQL expression computing ``index`` for a column"""
+        whens = [(column.is_(None), UNKNOWN)]
+        whens += [(column < edge, i - 1) for i, edge in enumerate(self.edges) if i > 0]
+        return case(*whens, else_=len(self.edges) - 1)
+
+    def label(self, i: int) -> str:
+        if i == UNKNOWN:
+            return "unknown"
+        if i == len(self.edges) - 1:
+            return f"{self.edges[i]}+"
+        if self.edges[i + 1] - self.edges[i] == 1:
+            return str(self.edges[i])
+        return f"{self.edges[i]}-{self.edges[i + 1]}"
+
+    def classify(self, i: int, low: Optional[int], high: Optional[int], values: Optional[List[int]]) -> Optional[bool]:
+        """
+        Whether every value of bucket ``i`` passes the filters (True), none
+        does (False), or only some do (None: the rollup cannot answer).
+        """
+        if low is None and high is None and not values:
+            return True
+        if i == UNKNOWN:
+            return False
+
+        first = self.edges[i] if i > 0 else None  # None: unbounded below
+        last = self.edges[i + 1] - 1 if i + 1 < len(self.edges) else None  # None: unbounded above
+        partial = False
+
+        if low is not None:
+            if last is not None and last < low:
+                return False
+            if first is None or first < low:
+                partial = True
+        if high is not None:
+            if first is not None and first > high:
+                return False
+            if last is None or last > high:
+                partial = True
+        if values:
+            if first is not None and first == last:
+                if first not in values:
+                    return False
+            elif any((first is None or v >= first) and (last is None or v <= last) for v in values):
+                partial = True
+            else:
+                return False
+        return None if partial else True
+
+
+PRICE_BUCKETS = Buckets([0, 100_000, 200_000, 300_000, 400_000, 500_000, 750_000, 1_000_000])
+ROOMS_BUCKETS = Buckets([0, 1, 2, 3, 4, 5])
+AREA_BUCKETS = Buckets([0, 25, 50, 75, 100, 150, 200])
+
+
+class FacetService:
+    """Service maintaining and reading the facet rollups"""
+
+    @staticmethod
+    def rollup_key(state: dict) -> tuple:
+        return (
+            state["location"],
+            PRICE_BUCKETS.index(state["price"]),
+            ROOMS_BUCKETS.index(state["rooms"]),
+            AREA_BUCKETS.index(state["area"]),
+        )
+
+    @staticmethod
+    def _add(db: Session, key: tuple, delta: int) -> None:
+        location, price_bucket, rooms_bucket, area_bucket = key
+        rollup = db.query(PropertyFacetRollup).filter(
+            PropertyFacetRollup.location == location,
+            PropertyFacetRollup.price_bucket == price_bucket,
+            PropertyFacetRollup.rooms_bucket == rooms_bucket,
+            PropertyFacetRollup.area_bucket == area_bucket,
+        )
+        updated = rollup.update(
+            {PropertyFacetRollup.count: PropertyFacetRollup.count + delta},
+            synchronize_session=False
+        )
+        if not updated and delta > 0:
+            db.add(PropertyFacetRollup(
+                location=location,
+                price_bucket=price_bucket,
+                rooms_bucket=rooms_bucket,
+                area_bucket=area_bucket,
+                count=delta
+            ))
+            # The session does not autoflush: make the row visible to the
+            # next UPDATE in this transaction
+            db.flush()
+        elif delta < 0:
+            rollup.filter(PropertyFacetRollup.count <= 0).delete(synchronize_session=False)
+
+    @classmethod
+    def record_change(cls, db: Session, old: Optional[dict], new: Optional[dict]) -> None:
+        """
+        Apply one property write to the rollups.
+
+        Called by the write routes before ``commit`` so that the rollups and
+        ``properties`` change in the same transaction.
+        """
+        old_key = cls.rollup_key(old) if old is not None else None
+        new_key = cls.rollup_key(new) if new is not None else None
+        if old_key == new_key:
+            return
+        if old_key is not None:
+            cls._add(db, old_key, -1)
+        if new_key is not None:
+            cls._add(db, new_key, 1)
+
+    @classmethod
+    def record_inserts(cls, db: Session, states: List[dict]) -> None:
+        """Apply a batch of new properties with one rollup update per distinct key"""
+        for key, delta in Counter(cls.rollup_key(state) for state in states).items():
+            cls._add(db, key, delta)
+
+    @staticmethod
+    def rebuild(db: Session) -> int:
+        """Recompute every rollup row from ``properties``; returns the row count"""
+        price = PRICE_BUCKETS.sql(Property.price)
+        rooms = ROOMS_BUCKETS.sql(Property.rooms)
+        area = AREA_BUCKETS.sql(Property.area)
+        grouped = db.query(Property.location, price, rooms, area, func.count(Property.id))\
+            .group_by(Property.location, price, rooms, area)
+
+        db.query(PropertyFacetRollup).delete()
+        db.execute(insert(PropertyFacetRollup).from_select(
+            ["location", "price_bucket", "rooms_bucket", "area_bucket", "count"],
+            grouped.statement
+        ))
+        db.commit()
+        rows = db.query(PropertyFacetRollup).count()
+        logger.info(f"Facet rollups rebuilt: {rows} rows")
+        return rows
+
+    @classmethod
+    def ensure_built(cls, db: Session) -> bool:
+        """Build the rollups for a database that has properties but no rollups yet"""
+        if db.query(PropertyFacetRollup).first() is None and db.query(Property).first() is not None:
+            cls.rebuild(db)
+            return True
+        return False
+
+    @staticmethod
+    def _passing_buckets(buckets: Buckets, low, high, values) -> Optional[List[int]]:
+        """Buckets passing the filters, or None if one only partially passes"""
+        passing = []
+        for i in [UNKNOWN] + list(range(len(buckets.edges))):
+            verdict = buckets.classify(i, low, high, values)
+            if verdict is None:
+                return None
+            if verdict:
+                passing.append(i)
+        return passing
+
+    @classmethod
+    def from_rollups(cls, db: Session, filters: PropertyFilters) -> Optional[dict]:
+        """
+        Facet counts from the rollups, or None when the filters do not line
+        up with bucket boundaries (or touch columns the rollups do not have).
+        """
+        if filters.bathrooms or filters.bathrooms_min is not None or filters.bathrooms_max is not None:
+            return None
+
+        dimensions = [
+            (PropertyFacetRollup.price_bucket, PRICE_BUCKETS, filters.price_min, filters.price_max, None),
+            (PropertyFacetRollup.rooms_bucket, ROOMS_BUCKETS, filters.rooms_min, filters.rooms_max, filters.rooms),
+            (PropertyFacetRollup.area_bucket, AREA_BUCKETS, filters.area_min, filters.area_max, None),
+        ]
+        query = db.query(PropertyFacetRollup)
+        if filters.location:
+            query = query.filter(PropertyFacetRollup.location.in_(filters.location))
+        for column, buckets, low, high, values in dimensions:
+            if low is None and high is None and not values:
+                continue
+            passing = cls._passing_buckets(buckets, low, high, values)
+            if passing is None:
+                return None
+            query = query.filter(column.in_(passing))
+
+        total = func.sum(PropertyFacetRollup.count)
+        return {
+            "source": "rollup",
+            "total": query.with_entities(total).scalar() or 0,
+            "location": cls._counts(query, PropertyFacetRollup.location, total),
+            "price": cls._counts(query, PropertyFacetRollup.price_bucket, total, PRICE_BUCKETS),
+            "rooms": cls._counts(query, PropertyFacetRollup.rooms_bucket, total, ROOMS_BUCKETS),
+            "area": cls._counts(query, PropertyFacetRollup.area_bucket, total, AREA_BUCKETS),
+        }
+
+    @classmethod
+    def from_properties(cls, query: Query) -> dict:
+        """Facet counts with a live GROUP BY over an already filtered properties query"""
+        total = func.count(Property.id)
+        return {
+            "source": "live",
+            "total": query.with_entities(total).scalar() or 0,
+            "location": cls._counts(query, Property.location, total),
+            "price": cls._counts(query, PRICE_BUCKETS.sql(Property.price), total, PRICE_BUCKETS),
+            "rooms": cls._counts(query, ROOMS_BUCKETS.sql(Property.rooms), total, ROOMS_BUCKETS),
+            "area": cls._counts(query, AREA_BUCKETS.sql(Property.area), total, AREA_BUCKETS),
+        }
+
+    @staticmethod
+    def _counts(query: Query, key, total, buckets: Optional[Buckets] = None) -> list:
+        rows = query.with_entities(key, total).group_by(key).order_by(key).all()
+        return [
+            {"value": buckets.label(value) if buckets else value, "count": int(count)}
+            for value, count in rows
+            if count
+        ]
+
+
+facet_service = FacetService()
@@ -0,0 +1,42 @@
+"""One-step JSON encoding of ORM entities and rows for hot read paths"""
+from operator import attrgetter
+from typing import Iterable, Optional, Sequence
+
+from pydantic import BaseModel
+from pydantic_core import to_json
+
+
+class RowEncoder:
+    """
+    Encode objects exposing ``fields`` as attributes (ORM entities or
+    projected rows) straight to JSON bytes.
+
+    Values are copied as they come from the database, without validating
+    each item against the response schema first: use it only for data
+    written through that schema. Encoding is pydantic-core's, so the bytes
+    match what FastAPI sends after validating through the schema.
+    """
+
+    def __init__(self, fields: Sequence[str]):
+        self.fields = tuple(fields)
+        getter = attrgetter(*self.fields)
+        self._values = getter if len(self.fields) > 1 else (lambda obj: (getter(obj),))
+
+    @classmethod
+    def for_model(cls, model: type[BaseModel]) -> "RowEncoder":
+        """Encoder for every field of a response schema"""
+        return cls(list(model.model_fields))
+
+    def row(self, obj) -> Optional[dict]:
+        return dict(zip(self.fields, self._values(obj))) if obj is not None else None
+
+    def rows(self, objs: Iterable) -> list:
+        """Plain dicts for ``objs`` (None entries stay None)"""
+        fields, values = self.fields, self._values
+        return [dict(zip(fields, values(obj))) if obj is not None else None for obj in objs]
+
+    def dumps(self, obj) -> bytes:
+        return to_json(self.row(obj))
+
+    def dumps_many(self, objs: Iterable) -> bytes:
+        return to_json(self.rows(objs))
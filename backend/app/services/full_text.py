@@ -0,0 +1,99 @@
+"""Full-text search over property title and description"""
+import logging
+import re
+
+from sqlalchemy import and_, column, false, func, inspect, literal_column, or_, table, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Query
+
+from app.models import Property, PROPERTY_FTS_DDL, PROPERTY_FTS_TABLE
+
+logger = logging.getLogger("api")
+
+_fts = table(PROPERTY_FTS_TABLE, column("rowid"))
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def search_terms(q: str) -> list:
+    """Split a user query into plain word tokens"""
+    return _TOKEN_RE.findall(q)
+
+
+def match_expression(q: str) -> str:
+    """
+    Build an FTS5 MATCH expression from free user input.
+
+    Every token is double-quoted so that FTS5 operators and punctuation in
+    the input cannot produce a syntax error; tokens are ANDed together.
+    """
+    return " ".join(f'"{term}"' for term in search_terms(q))
+
+
+def uses_fts(dialect_name: str) -> bool:
+    """FTS5 is only available on SQLite"""
+    return dialect_name == "sqlite"
+
+
+def apply_text_search(query: Query, q: str, dialect_name: str) -> Query:
+    """
+    Restrict ``query`` to properties matching ``q``.
+
+    On SQLite the FTS5 index is joined on rowid; elsewhere this falls back to
+    a case-insensitive LIKE on title/description per token.
+    """
+    terms = search_terms(q)
+    if not terms:
+        return query.filter(false())
+
+    if uses_fts(dialect_name):
+        return query.join(_fts, _fts.c.rowid == Property.id).filter(
+            text(f"{PROPERTY_FTS_TABLE} MATCH :fts_query").bindparams(
+                fts_query=match_expression(q)
+            )
+        )
+
+    return query.filter(and_(*[
+        or_(Property.title.ilike(f"%{term}%"), Property.description.ilike(f"%{term}%"))
+        for term in terms
+    ]))
+
+
+def order_by_rank(query: Query, dialect_name: str) -> Query:
+    """Order text-search results by relevance (bm25), then id"""
+    if uses_fts(dialect_name):
+        return query.order_by(func.bm25(literal_column(PROPERTY_FTS_TABLE)), Property.id)
+    return query.order_by(Property.id)
+
+
+def ensure_index(engine: Engine) -> bool:
+    """
+    Create the FTS5 table and triggers if they are missing.
+
+    ``Base.metadata.create_all`` only creates them together with a new
+    ``properties`` table, so databases created before the index existed are
+    upgraded here. Returns True when the index had to be built.
+    """
+    if not uses_fts(engine.dialect.name):
+        return False
+
+    with engine.begin() as connection:
+        if not inspect(connection).has_table("properties"):
+            return False
+        exists = connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {"name": PROPERTY_FTS_TABLE}
+        ).first()
+        if exists:
+            return False
+        rebuild_index(connection)
+        logger.info("Full-text index created for existing properties")
+        return True
+
+
+def rebuild_index(connection: Connection) -> None:
+    """Create the FTS5 structures if needed and repopulate them from ``properties``"""
+    for statement in PROPERTY_FTS_DDL:
+        connection.execute(text(statement))
+    connection.execute(
+        text(f"INSERT INTO {PROPERTY_FTS_TABLE}({PROPERTY_FTS_TABLE}) VALUES ('rebuild')")
+    )
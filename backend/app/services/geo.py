@@ -0,0 +1,157 @@
+"""Geospatial helpers: fixed-grid cell index and radius search"""
+import math
+from typing import List, Optional, Tuple
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Query
+
+from app.models import Property
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = 111.32
+
+# Size of one grid cell in degrees (~2.2 km of latitude). Cells are numbered
+# row-major from (-90, -180) so that one latitude row of cells is a
+# contiguous range of ``geo_cell`` values.
+CELL_DEGREES = 0.02
+GRID_COLUMNS = int(round(360 / CELL_DEGREES))
+GRID_ROWS = int(round(180 / CELL_DEGREES))
+
+# Largest search radius: candidates are loaded and measured in Python
+MAX_RADIUS_KM = 500
+# Beyond this many cell ranges, one OR term per range gets too deep for
+# SQLite's expression tree: the query scans the whole band of rows instead
+MAX_CELL_RANGES = 64
+
+
+def parse_point(value: str) -> Tuple[float, float]:
+    """Parse ``"lat,lon"`` into floats"""
+    try:
+        lat_text, lon_text = value.split(",")
+        lat, lon = float(lat_text), float(lon_text)
+    except ValueError as e:
+        raise ValueError("near must be 'lat,lon'") from e
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        raise ValueError("near is out of range")
+    return lat, lon
+
+
+def _row(lat: float) -> int:
+    return min(max(int(math.floor((lat + 90) / CELL_DEGREES)), 0), GRID_ROWS - 1)
+
+
+def _column(lon: float) -> int:
+    return int(math.floor((lon + 180) / CELL_DEGREES)) % GRID_COLUMNS
+
+
+def geo_cell(lat: Optional[float], lon: Optional[float]) -> Optional[int]:
+    """Grid cell number for a point, or None when the point is unknown"""
+    if lat is None or lon is None:
+        return None
+    return _row(lat) * GRID_COLUMNS + _column(lon)
+
+
+def with_geo_cell(data: dict) -> dict:
+    """Set ``geo_cell`` in a property payload from its latitude/longitude"""
+    data["geo_cell"] = geo_cell(data.get("latitude"), data.get("longitude"))
+    return data
+
+
+def _longitudes(lat: float, radius_km: float) -> Optional[Tuple[float, float]]:
+    """
+    West and east longitude offsets of the bounding box of a circle, or
+    None when the box spans every longitude (near a pole or very wide).
+    """
+    dlat = radius_km / KM_PER_DEGREE_LAT
+    cos_lat = math.cos(math.radians(max(abs(lat - dlat), abs(lat + dlat))))
+    if cos_lat <= 1e-9 or radius_km / (KM_PER_DEGREE_LAT * cos_lat) >= 180:
+        return None
+    dlon = radius_km / (KM_PER_DEGREE_LAT * cos_lat)
+    return -dlon, dlon
+
+
+def cell_ranges(lat: float, lon: float, radius_km: float) -> List[Tuple[int, int]]:
+    """
+    ``geo_cell`` ranges covering the bounding box of a circle.
+
+    One range per latitude row, split in two when the box crosses the
+    antimeridian; each range is a single index range scan.
+    """
+    dlat = radius_km / KM_PER_DEGREE_LAT
+    low_row, high_row = _row(lat - dlat), _row(lat + dlat)
+
+    offsets = _longitudes(lat, radius_km)
+    if offsets is None:
+        columns = [(0, GRID_COLUMNS - 1)]
+    else:
+        west, east = _column(lon + offsets[0]), _column(lon + offsets[1])
+        if west <= east:
+            columns = [(west, east)]
+        else:
+            columns = [(west, GRID_COLUMNS - 1), (0, east)]
+
+    ranges = []
+    for row in range(low_row, high_row + 1):
+        for west, east in columns:
+            ranges.append((row * GRID_COLUMNS + west, row * GRID_COLUMNS + east))
+    return ranges
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance in km"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _longitude_filter(lat: float, lon: float, radius_km: float):
+    """Longitude part of the circle's bounding box (None when it spans every longitude)"""
+    offsets = _longitudes(lat, radius_km)
+    if offsets is None:
+        return None
+    west, east = ((lon + offset + 180) % 360 - 180 for offset in offsets)
+    longitude = Property.longitude + 0
+    return longitude.between(west, east) if west <= east else or_(longitude >= west, longitude <= east)
+
+
+def candidate_query(query: Query, lat: float, lon: float, radius_km: float) -> Query:
+    """
+    Narrow ``query`` to ``(id, latitude, longitude)`` rows in the cells
+    around the circle.
+
+    Without other filters this is a set of index range scans on the covering
+    ``(geo_cell, latitude, longitude)`` index: no table rows are read. Past
+    ``MAX_CELL_RANGES`` it is a single range scan over the band of rows,
+    with the bounding box checked on the index entries.
+    """
+    ranges = cell_ranges(lat, lon, radius_km)
+    dlat = radius_km / KM_PER_DEGREE_LAT
+    # Residual checks on the index entries; "+ 0" keeps SQLite from
+    # picking the (latitude, longitude, price) index for them instead
+    conditions = [(Property.latitude + 0).between(lat - dlat, lat + dlat)]
+    if len(ranges) <= MAX_CELL_RANGES:
+        conditions.append(or_(*[Property.geo_cell.between(low, high) for low, high in ranges]))
+    else:
+        conditions.append(Property.geo_cell.between(min(low for low, _ in ranges), max(high for _, high in ranges)))
+        longitude = _longitude_filter(lat, lon, radius_km)
+        if longitude is not None:
+            conditions.append(longitude)
+    return query.with_entities(Property.id, Property.latitude, Property.longitude).filter(and_(*conditions))
+
+
+def nearest_ids(query: Query, lat: float, lon: float, radius_km: float) -> List[Tuple[int, float]]:
+    """
+    Return ``(id, distance_km)`` for rows of ``query`` within the radius,
+    nearest first. Exact distances are only computed for the candidates
+    that survive the cell pruning.
+    """
+    matches = []
+    for property_id, p_lat, p_lon in candidate_query(query, lat, lon, radius_km):
+        distance = haversine_km(lat, lon, p_lat, p_lon)
+        if distance <= radius_km:
+            matches.append((property_id, distance))
+    matches.sort(key=lambda m: (m[1], m[0]))
+    return matches
+
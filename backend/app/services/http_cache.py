@@ -0,0 +1,99 @@
+"""HTTP validators (ETag / Last-Modified) and conditional GET for properties"""
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import Dict, Optional, Tuple
+
+from fastapi import Request, Response
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models import Property, TableVersion
+
+PROPERTIES_TABLE = Property.__tablename__
+
+
+def bump_version(db: Session, table: str = PROPERTIES_TABLE) -> int:
+    """
+    Increment the write counter of ``table`` and return the new version.
+
+    Called by the write paths before ``commit`` so that the new version is
+    visible exactly when the write is.
+    """
+    version = db.execute(
+        update(TableVersion)
+        .where(TableVersion.name == table)
+        .values(version=TableVersion.version + 1, updated_at=datetime.utcnow())
+        .returning(TableVersion.version)
+        .execution_options(synchronize_session=False)
+    ).scalar()
+    if version is None:
+        db.add(TableVersion(name=table, version=1))
+        db.flush()
+        version = 1
+    return version
+
+
+def current_version(db: Session, table: str = PROPERTIES_TABLE) -> Tuple[int, Optional[datetime]]:
+    """``(version, updated_at)`` of ``table``; ``(0, None)`` before the first write"""
+    row = db.query(TableVersion.version, TableVersion.updated_at)\
+        .filter(TableVersion.name == table).first()
+    return (row.version, row.updated_at) if row else (0, None)
+
+
+def collection_etag(version: int, request: Request) -> str:
+    """Strong ETag for a collection response: table version + request path and query"""
+    query = sorted(request.query_params.multi_items())
+    digest = hashlib.sha1(f"{request.url.path}?{query}".encode("utf-8")).hexdigest()[:16]
+    return f'"v{version}-{digest}"'
+
+
+def collection_headers(db: Session, request: Request) -> Dict[str, str]:
+    """
+    Cache headers for a collection response over ``properties``.
+
+    Read before the data itself: a write landing in between leaves the
+    response with an older ETag, which only costs the client a refetch.
+    """
+    version, changed_at = current_version(db)
+    return cache_headers(collection_etag(version, request), changed_at)
+
+
+def property_etag(property_id: int, updated_at: Optional[datetime]) -> str:
+    """Strong ETag for one property"""
+    stamp = updated_at.strftime("%Y%m%d%H%M%S%f") if updated_at else "0"
+    return f'"p{property_id}-{stamp}"'
+
+
+def cache_headers(etag: str, last_modified: Optional[datetime]) -> Dict[str, str]:
+    """Validators and Cache-Control for a cacheable GET response"""
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={settings.http_cache_max_age}, must-revalidate",
+    }
+    if last_modified is not None:
+        # Stored timestamps are naive UTC
+        headers["Last-Modified"] = format_datetime(last_modified.replace(tzinfo=timezone.utc), usegmt=True)
+    return headers
+
+
+def matches(request: Request, etag: str) -> bool:
+    """
+    Whether ``If-None-Match`` matches ``etag``.
+
+    Uses the weak comparison RFC 9110 prescribes for If-None-Match, so a
+    ``W/`` prefix added by a proxy still matches.
+    """
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in header.split(","))
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def not_modified(headers: Dict[str, str]) -> Response:
+    return Response(status_code=304, headers=headers)
+
@@ -0,0 +1,168 @@
+"""Price per m² quantiles per location, from incrementally maintained sketches"""
+import bisect
+import logging
+import math
+from collections import Counter
+from itertools import accumulate
+from typing import Dict, List, Optional
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import Session
+
+from app.models import Property, PropertyPriceM2Bin
+
+logger = logging.getLogger("api")
+
+# Relative accuracy of the sketch: every quantile is within 1% of a price
+# per m² of the requested rank. Bins are logarithmic (DDSketch), so unlike
+# t-digest or KLL summaries a sketch is a plain per-bin count: removing a
+# property is exact, which updates and deletes need.
+RELATIVE_ACCURACY = 0.01
+GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+LOG_GAMMA = math.log(GAMMA)
+QUANTILES = {"p10": 0.1, "median": 0.5, "p90": 0.9}
+REBUILD_CHUNK = 50_000
+
+
+def price_m2_bin(price: Optional[int], area: Optional[int]) -> Optional[int]:
+    """Sketch bin of a property, None when it has no price per m²"""
+    if not price or not area or price <= 0 or area <= 0:
+        return None
+    return math.ceil(math.log(price / area) / LOG_GAMMA)
+
+
+def bin_value(index: int) -> float:
+    """Representative price per m² of a bin (within ``RELATIVE_ACCURACY`` of all its values)"""
+    return 2 * GAMMA ** index / (GAMMA + 1)
+
+
+def quantiles(bins: List[tuple], fractions: Dict[str, float]) -> dict:
+    """Quantiles over ``(bin, count)`` rows in bin order (lower rank convention)"""
+    cumulative = list(accumulate(int(count) for _, count in bins))
+    total = cumulative[-1] if cumulative else 0
+    if not total:
+        return {"count": 0, **{name: None for name in fractions}}
+    values = {"count": total}
+    for name, fraction in fractions.items():
+        rank = math.floor(fraction * (total - 1))
+        values[name] = round(bin_value(bins[bisect.bisect_right(cumulative, rank)][0]), 2)
+    return values
+
+
+class MarketStatsService:
+    """Service maintaining and reading the price per m² sketches"""
+
+    @staticmethod
+    def sketch_key(state: dict) -> Optional[tuple]:
+        index = price_m2_bin(state["price"], state["area"])
+        return None if index is None else (state["location"], index)
+
+    @staticmethod
+    def _add(db: Session, key: tuple, delta: int) -> None:
+        location, index = key
+        sketch_bin = db.query(PropertyPriceM2Bin).filter(
+            PropertyPriceM2Bin.location == location,
+            PropertyPriceM2Bin.bin == index,
+        )
+        updated = sketch_bin.update(
+            {PropertyPriceM2Bin.count: PropertyPriceM2Bin.count + delta},
+            synchronize_session=False
+        )
+        if not updated and delta > 0:
+            db.add(PropertyPriceM2Bin(location=location, bin=index, count=delta))
+            # The session does not autoflush: make the row visible to the
+            # next UPDATE in this transaction
+            db.flush()
+        elif delta < 0:
+            sketch_bin.filter(PropertyPriceM2Bin.count <= 0).delete(synchronize_session=False)
+
+    @classmethod
+    def record_change(cls, db: Session, old: Optional[dict], new: Optional[dict]) -> None:
+        """
+        Apply one property write to the sketches.
+
+        Called by the write routes before ``commit`` so that the sketches
+        and ``properties`` change in the same transaction.
+        """
+        old_key = cls.sketch_key(old) if old is not None else None
+        new_key = cls.sketch_key(new) if new is not None else None
+        if old_key == new_key:
+            return
+        if old_key is not None:
+            cls._add(db, old_key, -1)
+        if new_key is not None:
+            cls._add(db, new_key, 1)
+
+    @classmethod
+    def record_inserts(cls, db: Session, states: List[dict]) -> None:
+        """Apply a batch of new properties with one update per distinct bin"""
+        keys = Counter(cls.sketch_key(state) for state in states)
+        keys.pop(None, None)
+        for key, delta in keys.items():
+            cls._add(db, key, delta)
+
+    @staticmethod
+    def rebuild(db: Session) -> int:
+        """
+        Recompute every sketch from ``properties``; returns the bin count.
+
+        Rows are streamed from a server-side cursor and binned in Python
+        with ``price_m2_bin``, exactly as the write routes do (SQLite has no
+        portable ``LOG``).
+        """
+        counts: Counter = Counter()
+        rows = db.execute(
+            select(Property.location, Property.price, Property.area)
+            .where(Property.price > 0, Property.area > 0)
+            .execution_options(yield_per=REBUILD_CHUNK)
+        )
+        for chunk in rows.partitions():
+            counts.update((location, price_m2_bin(price, area)) for location, price, area in chunk)
+
+        db.query(PropertyPriceM2Bin).delete()
+        if counts:
+            db.execute(insert(PropertyPriceM2Bin), [
+                {"location": location, "bin": index, "count": count} for (location, index), count in counts.items()
+            ])
+        db.commit()
+        logger.info(f"Price per m² sketches rebuilt: {len(counts)} bins")
+        return len(counts)
+
+    @classmethod
+    def ensure_built(cls, db: Session) -> bool:
+        """Build the sketches for a database that has properties but no sketches yet"""
+        if db.query(PropertyPriceM2Bin).first() is None and db.query(Property).first() is not None:
+            cls.rebuild(db)
+            return True
+        return False
+
+    @staticmethod
+    def price_per_m2(db: Session, locations: Optional[List[str]] = None) -> List[dict]:
+        """
+        p10, median and p90 price per m² for each location (every location
+        when ``locations`` is None), read from the sketches in bin order;
+        locations without data are omitted.
+        """
+        query = db.query(PropertyPriceM2Bin.location, PropertyPriceM2Bin.bin, PropertyPriceM2Bin.count)
+        if locations:
+            query = query.filter(PropertyPriceM2Bin.location.in_(locations))
+        sketches: Dict[str, list] = {}
+        for location, index, count in query.order_by(PropertyPriceM2Bin.location, PropertyPriceM2Bin.bin):
+            sketches.setdefault(location, []).append((index, count))
+        order = dict.fromkeys(locations) if locations else sketches
+        return [{"location": location, **quantiles(sketches[location], QUANTILES)} for location in order if location in sketches]
+
+    @classmethod
+    def medians(cls, db: Session, locations: Optional[List[str]] = None) -> Dict[str, float]:
+        """Median price per m² by location (every location when ``locations`` is None)"""
+        return {entry["location"]: entry["median"] for entry in cls.price_per_m2(db, locations)}
+
+    @staticmethod
+    def overall_price_per_m2(db: Session) -> dict:
+        """Same statistics over all locations (the per-location sketches merged)"""
+        bins = db.query(PropertyPriceM2Bin.bin, func.sum(PropertyPriceM2Bin.count))\
+            .group_by(PropertyPriceM2Bin.bin).order_by(PropertyPriceM2Bin.bin).all()
+        return quantiles(bins, QUANTILES)
+
+
+market_stats_service = MarketStatsService()
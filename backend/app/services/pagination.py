@@ -0,0 +1,107 @@
+"""Keyset (cursor) pagination helpers for property listings"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, Optional, Tuple
+
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Query
+
+from app.models import Property
+
+# Sort keys allowed for listings. Each one is paired with ``Property.id`` as a
+# tie-breaker so that the (sort_key, id) pair is unique and totally ordered.
+SORT_KEYS = {
+    "id": Property.id,
+    "price": Property.price,
+    "created_at": Property.created_at,
+}
+
+
+def parse_sort(sort: str) -> Tuple[str, bool]:
+    """Parse ``sort`` (e.g. ``price`` or ``-price``) into (key, descending)"""
+    descending = sort.startswith("-")
+    key = sort[1:] if descending else sort
+    if key not in SORT_KEYS:
+        raise ValueError(f"Unsupported sort key: {key}")
+    return key, descending
+
+
+def encode_cursor(sort: str, value: Any, last_id: int) -> str:
+    """Encode the last (sort_key, id) seen into an opaque URL-safe token"""
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    payload = json.dumps([sort, value, last_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str) -> Tuple[Any, int]:
+    """Decode a cursor produced by ``encode_cursor`` for the same ``sort``"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_sort, value, last_id = json.loads(base64.urlsafe_b64decode(padded))
+    except Exception as e:
+        raise ValueError("Invalid cursor") from e
+
+    if cursor_sort != sort or not isinstance(last_id, int):
+        raise ValueError("Cursor does not match the requested sort")
+
+    key, _ = parse_sort(sort)
+    if key == "created_at" and value is not None:
+        value = datetime.fromisoformat(value)
+    return value, last_id
+
+
+def order_query(query: Query, sort: str, filtered: bool = False) -> Query:
+    """
+    Apply the (sort_key, id) ordering to a query.
+
+    When search filters are present the id tie-breaker is written ``id + 0``:
+    the ordering is unchanged, but no index can then satisfy the whole ORDER
+    BY on its own, so the planner picks the index matching the filters
+    instead of walking the table in sort order.
+    """
+    key, descending = parse_sort(sort)
+    column = SORT_KEYS[key]
+    tie_breaker = Property.id + 0 if filtered else Property.id
+    columns = [tie_breaker] if key == "id" else [column, tie_breaker]
+    if descending:
+        columns = [c.desc() for c in columns]
+    return query.order_by(*columns)
+
+
+def paginate_keyset(
+    query: Query,
+    sort: str,
+    cursor: Optional[str],
+    limit: int,
+    filtered: bool = False,
+):
+    """
+    Return ``(items, next_cursor)`` for the page following ``cursor``.
+
+    The page boundary is a row-value comparison on ``(sort_key, id)`` so the
+    database seeks straight to the first row of the page through the index
+    instead of scanning and discarding the previous pages.
+    """
+    key, descending = parse_sort(sort)
+    column = SORT_KEYS[key]
+
+    if cursor:
+        value, last_id = decode_cursor(cursor, sort)
+        if key == "id":
+            boundary = (Property.id < last_id) if descending else (Property.id > last_id)
+        else:
+            row = tuple_(column, Property.id)
+            boundary = row < (value, last_id) if descending else row > (value, last_id)
+        query = query.filter(boundary)
+
+    # Fetch one extra row to know whether another page exists
+    rows = order_query(query, sort, filtered).limit(limit + 1).all()
+    items = rows[:limit]
+
+    next_cursor = None
+    if len(rows) > limit and items:
+        last = items[-1]
+        next_cursor = encode_cursor(sort, getattr(last, key), last.id)
+    return items, next_cursor
@@ -29,7 +29,6 @@ class PasswordHistoryService:
             )
             db.add(history)
             db.commit()
-            db.refresh(history)
             logger.info(f"Password change recorded for user_id {user_id}: {reason}")
             return history
         except Exception as e:
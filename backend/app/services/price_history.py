@@ -0,0 +1,167 @@
+"""Asking price history of properties: recording and series reads"""
+import logging
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import and_, delete, func, insert, literal_column, or_, select, tuple_
+from sqlalchemy.orm import Session
+
+from app.models import Property, PropertyPriceHistory
+
+logger = logging.getLogger("api")
+
+# Downsampling intervals accepted by ``PriceHistoryService.buckets``
+INTERVALS = ("hour", "day", "week", "month")
+
+
+def bucket_start(column, interval: str, dialect_name: str):
+    """SQL expression truncating a timestamp column to the start of its bucket"""
+    if interval not in INTERVALS:
+        raise ValueError(f"interval must be one of: {', '.join(INTERVALS)}")
+    if dialect_name != "sqlite":
+        return func.date_trunc(interval, column)
+    if interval == "hour":
+        return func.strftime("%Y-%m-%d %H:00:00", column)
+    if interval == "day":
+        return func.datetime(column, "start of day")
+    if interval == "week":
+        # Back to the Monday on or before the date ('weekday 1' moves forward)
+        return func.datetime(column, "start of day", "-6 days", "weekday 1")
+    return func.datetime(column, "start of month")
+
+
+class PriceHistoryService:
+    """Service recording and reading property price changes"""
+
+    @staticmethod
+    def record_change(db: Session, old: Optional[dict], new: Optional[dict]) -> None:
+        """
+        Record the price of a created property, or its new price when an
+        update changed it (a deleted property's history goes with
+        ``forget``).
+
+        Takes the ``(old, new)`` write snapshots and is called by the write
+        routes before ``commit``, like the facet rollups.
+        """
+        if new is None or old is not None and old["price"] == new["price"]:
+            return
+        db.execute(insert(PropertyPriceHistory).values(
+            property_id=new["id"], price=new["price"], changed_at=datetime.utcnow()
+        ))
+
+    @staticmethod
+    def forget(db: Session, property_id: int) -> None:
+        """
+        Drop the history of a property about to be deleted; called before
+        the property row goes, as the history references it.
+        """
+        db.execute(delete(PropertyPriceHistory).where(PropertyPriceHistory.property_id == property_id))
+
+    @staticmethod
+    def record_inserts(db: Session, states: List[dict]) -> None:
+        """Record the initial price of a batch of new properties in one INSERT"""
+        if not states:
+            return
+        changed_at = datetime.utcnow()
+        db.execute(insert(PropertyPriceHistory), [
+            {"property_id": state["id"], "price": state["price"], "changed_at": changed_at}
+            for state in states
+        ])
+
+    @staticmethod
+    def ensure_seeded(db: Session) -> int:
+        """
+        Give every property without history an initial point at its creation
+        date (databases created before price history existed); returns the
+        number of rows added.
+        """
+        missing = select(
+            Property.id, Property.price, func.coalesce(Property.created_at, func.current_timestamp())
+        ).where(~select(PropertyPriceHistory.id)
+                .where(PropertyPriceHistory.property_id == Property.id)
+                .exists())
+        added = db.execute(insert(PropertyPriceHistory).from_select(
+            ["property_id", "price", "changed_at"], missing
+        )).rowcount
+        db.commit()
+        if added:
+            logger.info(f"Price history seeded for {added} properties")
+        return added
+
+    @staticmethod
+    def series(
+        db: Session,
+        property_ids: List[int],
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None
+    ) -> Dict[int, list]:
+        """
+        Price points per property within ``[start, end]``, oldest first.
+
+        With ``start``, each series begins with the price in effect at that
+        time (the last change before it), so a chart starts at the right
+        level even if nothing changed within the range. Every read is a
+        range scan of the ``(property_id, changed_at)`` index.
+        """
+        history = PropertyPriceHistory
+        in_range = [history.property_id.in_(set(property_ids))]
+        if end is not None:
+            in_range.append(history.changed_at <= end)
+        if start is not None:
+            previous = select(history.property_id, func.max(history.changed_at))\
+                .where(history.property_id.in_(set(property_ids)), history.changed_at < start)\
+                .group_by(history.property_id)
+            in_range.append(or_(
+                history.changed_at >= start,
+                tuple_(history.property_id, history.changed_at).in_(previous)
+            ))
+        rows = db.execute(
+            select(history.property_id, history.changed_at, history.price)
+            .where(and_(*in_range))
+            .order_by(history.property_id, history.changed_at, history.id)
+        )
+        points = defaultdict(list)
+        for property_id, changed_at, price in rows:
+            points[property_id].append({"changed_at": changed_at, "price": price})
+        return points
+
+    @staticmethod
+    def buckets(
+        db: Session,
+        property_ids: List[int],
+        interval: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None
+    ) -> Dict[int, list]:
+        """
+        Downsampled series: per property and ``interval`` bucket, the number
+        of price points and their min, max and average, computed by one
+        GROUP BY in the database. Buckets without a change are omitted.
+        """
+        history = PropertyPriceHistory
+        bucket = bucket_start(history.changed_at, interval, db.get_bind().dialect.name).label("bucket")
+        query = select(
+            history.property_id,
+            bucket,
+            func.count(history.id),
+            func.min(history.price),
+            func.max(history.price),
+            func.avg(history.price),
+        ).where(history.property_id.in_(set(property_ids)))
+        if start is not None:
+            query = query.where(history.changed_at >= start)
+        if end is not None:
+            query = query.where(history.changed_at <= end)
+        query = query.group_by(history.property_id, literal_column("bucket"))\
+            .order_by(history.property_id, literal_column("bucket"))
+
+        buckets = defaultdict(list)
+        for property_id, start_at, count, low, high, average in db.execute(query):
+            buckets[property_id].append({
+                "start": start_at, "count": count, "min": low, "max": high, "avg": float(average)
+            })
+        return buckets
+
+
+price_history_service = PriceHistoryService()
@@ -0,0 +1,440 @@
+"""
+Buy-renovate-resell profitability, vectorized over NumPy arrays
+
+Port of ``calculateProfitability`` from
+``frontend/src/pages/ProfitabilitySimulator.tsx``: same formulas, same
+order of operations, with every parameter a scalar or an array so that
+one call evaluates any number of deals (NumPy broadcasting).
+"""
+import logging
+import math
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Mapping, Optional
+
+import numpy as np
+
+logger = logging.getLogger("api")
+
+# Simulator parameters (camelCase in the frontend) with its default values
+DEFAULTS = {
+    # A. Purchase
+    "list_price": 300000.0,
+    "purchase_negotiation": 0.05,
+    "notary_fees": 0.08,
+    "buyer_agency_fees": 0.05,
+    # B. Works
+    "surface": 100.0,
+    "renovation_cost_per_m2": 500.0,
+    "contingency_margin": 0.1,
+    # C. Holding
+    "holding_duration_months": 6.0,
+    "monthly_interest": 500.0,
+    "monthly_condo_charges": 100.0,
+    "monthly_property_tax": 50.0,
+    # D. Resale
+    "target_sale_price_per_m2": 4500.0,
+    "seller_agency_fees": 0.05,
+    "sale_negotiation": 0.02,
+    "min_profit_margin_percent": 20.0,
+}
+PARAMETERS = tuple(DEFAULTS)
+RESULTS = (
+    "net_acquisition_cost", "adjusted_works_cost", "total_holding_costs", "total_cost_of_return",
+    "target_sale_price", "seller_agency_fees_amount", "net_sale_price", "gross_margin_euro",
+    "gross_margin_percent", "break_even_price", "target_met",
+)
+
+
+def simulate(params: Mapping[str, object]) -> Dict[str, np.ndarray]:
+    """
+    Evaluate deals described by ``params`` (any of ``PARAMETERS``, missing
+    ones take ``DEFAULTS``; scalars and arrays broadcast together).
+
+    Returns one float64 array per name in ``RESULTS`` (``target_met`` is
+    boolean), all with the broadcast shape. As in the frontend, a zero
+    total cost or resale fees of 100% give inf/NaN rather than an error.
+    """
+    unknown = set(params) - set(DEFAULTS)
+    if unknown:
+        raise ValueError(f"Unknown parameters: {', '.join(sorted(unknown))}")
+    p = {name: np.asarray(params.get(name, default), dtype=np.float64) for name, default in DEFAULTS.items()}
+    shape = np.broadcast_shapes(*(value.shape for value in p.values()))
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        net_acquisition_cost = (
+            p["list_price"] * (1 - p["purchase_negotiation"]) * (1 + p["notary_fees"]) * (1 + p["buyer_agency_fees"])
+        )
+        adjusted_works_cost = p["surface"] * p["renovation_cost_per_m2"] * (1 + p["contingency_margin"])
+        total_holding_costs = p["holding_duration_months"] * (
+            p["monthly_interest"] + p["monthly_condo_charges"] + p["monthly_property_tax"]
+        )
+        total_cost_of_return = net_acquisition_cost + adjusted_works_cost + total_holding_costs
+        target_sale_price = p["surface"] * p["target_sale_price_per_m2"]
+        seller_agency_fees_amount = target_sale_price * p["seller_agency_fees"]
+        net_sale_price = target_sale_price * (1 - p["sale_negotiation"]) - seller_agency_fees_amount
+        gross_margin_euro = net_sale_price - total_cost_of_return
+        gross_margin_percent = gross_margin_euro / total_cost_of_return * 100
+        break_even_price = total_cost_of_return / (1 - p["seller_agency_fees"] - p["sale_negotiation"])
+        target_met = gross_margin_percent >= p["min_profit_margin_percent"]
+
+    results = {
+        "net_acquisition_cost": net_acquisition_cost,
+        "adjusted_works_cost": adjusted_works_cost,
+        "total_holding_costs": total_holding_costs,
+        "total_cost_of_return": total_cost_of_return,
+        "target_sale_price": target_sale_price,
+        "seller_agency_fees_amount": seller_agency_fees_amount,
+        "net_sale_price": net_sale_price,
+        "gross_margin_euro": gross_margin_euro,
+        "gross_margin_percent": gross_margin_percent,
+        "break_even_price": break_even_price,
+        "target_met": target_met,
+    }
+    return {name: np.broadcast_to(value, shape) for name, value in results.items()}
+
+
+def simulate_records(records: List[Mapping[str, object]]) -> List[dict]:
+    """
+    Evaluate a list of deals (one parameter mapping each) in one vectorized
+    pass; returns one result dict per deal, non-finite values as None.
+    """
+    if not records:
+        return []
+    unknown = set().union(*records) - set(DEFAULTS)
+    if unknown:
+        raise ValueError(f"Unknown parameters: {', '.join(sorted(unknown))}")
+    columns = {
+        name: np.fromiter((record.get(name, default) for record in records), dtype=np.float64, count=len(records))
+        for name, default in DEFAULTS.items()
+    }
+    results = simulate(columns)
+    output = {}
+    for name, values in results.items():
+        if values.dtype == bool:
+            output[name] = values.tolist()
+        else:
+            finite = np.isfinite(values)
+            output[name] = values.tolist() if finite.all() else np.where(finite, values, None).tolist()
+    return [dict(zip(RESULTS, row)) for row in zip(*(output[name] for name in RESULTS))]
+
+
+# Parameter sweeps: grid size limits and points evaluated per chunk. A
+# chunk costs about 20 float64 temporaries, so 2**17 points stay around
+# 20 MiB whatever the grid size; only the two output surfaces (8 bytes
+# per point each) grow with it.
+MAX_AXIS_STEPS = 1000
+MAX_GRID_POINTS = 1_000_000
+SWEEP_CHUNK_POINTS = 1 << 17
+
+
+def axis_values(name: str, values: Optional[List[float]] = None, start: Optional[float] = None,
+                stop: Optional[float] = None, steps: Optional[int] = None) -> np.ndarray:
+    """Values of one sweep axis: explicit ``values`` or ``steps`` evenly spaced from ``start`` to ``stop``"""
+    if name not in DEFAULTS:
+        raise ValueError(f"Unknown parameter: {name}")
+    if values is not None:
+        if start is not None or stop is not None or steps is not None:
+            raise ValueError(f"{name}: give either values or start/stop/steps")
+        axis = np.asarray(values, dtype=np.float64)
+    else:
+        if start is None or stop is None or steps is None:
+            raise ValueError(f"{name}: start, stop and steps are required without values")
+        if steps < 2:
+            raise ValueError(f"{name}: steps must be at least 2")
+        axis = np.linspace(start, stop, min(steps, MAX_AXIS_STEPS + 1))
+    if not 1 <= len(axis) <= MAX_AXIS_STEPS:
+        raise ValueError(f"{name}: between 1 and {MAX_AXIS_STEPS} values per axis")
+    return axis
+
+
+def _chunks(shape: tuple):
+    """
+    Index tuples covering a grid of ``shape`` in blocks of at most
+    ``SWEEP_CHUNK_POINTS`` points: whole trailing axes, a slice of the axis
+    before them and single positions on the leading ones.
+    """
+    split = len(shape)
+    while split > 0 and math.prod(shape[split - 1:]) <= SWEEP_CHUNK_POINTS:
+        split -= 1
+    if split == 0:
+        yield ()
+        return
+    step = max(SWEEP_CHUNK_POINTS // math.prod(shape[split:]), 1)
+    for leading in np.ndindex(*shape[:split - 1]):
+        for start in range(0, shape[split - 1], step):
+            yield leading + (slice(start, start + step),)
+
+
+def break_even_frontier(margins: np.ndarray, axis: int, values: np.ndarray) -> np.ndarray:
+    """
+    Value of the ``axis`` parameter at which the margin first changes sign,
+    for every combination of the other axes (NaN where it never does),
+    interpolated linearly between grid points.
+    """
+    margins = np.moveaxis(margins, axis, -1)
+    if margins.shape[-1] < 2:
+        return np.full(margins.shape[:-1], np.nan)
+    profitable = margins >= 0
+    crossing = profitable[..., 1:] != profitable[..., :-1]
+    first = crossing.argmax(axis=-1)[..., None]
+    before = np.take_along_axis(margins, first, axis=-1)[..., 0]
+    after = np.take_along_axis(margins, first + 1, axis=-1)[..., 0]
+    low, high = values[first[..., 0]], values[first[..., 0] + 1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        frontier = low - before * (high - low) / (after - before)
+    return np.where(crossing.any(axis=-1), frontier, np.nan)
+
+
+def sweep(base: Mapping[str, float], axes: Dict[str, np.ndarray], frontier_axis: Optional[str] = None) -> dict:
+    """
+    Evaluate the Cartesian grid of ``axes`` (parameter -> values, in grid
+    axis order) around the fixed ``base`` parameters.
+
+    Each axis is reshaped to broadcast along its own dimension, so a chunk
+    of the grid is one ``simulate`` call over broadcast arrays; chunks
+    bound the memory of the temporaries. Returns the ``gross_margin_percent``
+    and ``gross_margin_euro`` surfaces (shape: the axis lengths) and the
+    break-even frontier along ``frontier_axis`` (default: the last axis).
+    """
+    if not axes:
+        raise ValueError("At least one axis is required")
+    names = list(axes)
+    frontier_axis = frontier_axis or names[-1]
+    if frontier_axis not in axes:
+        raise ValueError(f"frontier_axis must be one of the swept parameters: {', '.join(names)}")
+    shape = tuple(len(axes[name]) for name in names)
+    if math.prod(shape) > MAX_GRID_POINTS:
+        raise ValueError(f"Grid too large: {math.prod(shape)} points (at most {MAX_GRID_POINTS})")
+
+    percent = np.empty(shape)
+    euro = np.empty(shape)
+    for block in _chunks(shape):
+        params = dict(base)
+        for dimension, name in enumerate(names):
+            values = axes[name][block[dimension]] if dimension < len(block) else axes[name]
+            # Axes indexed by position are scalars; the others get their
+            # own dimension, counted from the end so that they broadcast
+            params[name] = values.reshape((-1,) + (1,) * (len(names) - dimension - 1)) if np.ndim(values) else values
+        results = simulate(params)
+        percent[block] = results["gross_margin_percent"]
+        euro[block] = results["gross_margin_euro"]
+
+    axis = names.index(frontier_axis)
+    return {
+        "axes": [{"name": name, "values": axes[name]} for name in names],
+        "gross_margin_percent": percent,
+        "gross_margin_euro": euro,
+        "break_even": {"axis": frontier_axis, "values": break_even_frontier(euro, axis, axes[frontier_axis])},
+    }
+
+
+# Monte Carlo: parameter distributions, scenarios per chunk (each chunk is
+# drawn from its own child of the seed, so results depend on the seed only,
+# not on how chunks are spread over processes) and run size limits
+DISTRIBUTIONS = ("triangular", "normal", "uniform")
+MONTE_CARLO_CHUNK = 1 << 17
+MAX_SCENARIOS = 2_000_000
+
+# Chunks return a sketch of their margins instead of the margins: counts
+# per signed log bin of relative accuracy MARGIN_ACCURACY (as the price per
+# m² sketches of market_stats), with |margin| < MARGIN_RESOLUTION as 0
+MARGIN_ACCURACY = 0.001
+MARGIN_RESOLUTION = 1e-9
+MARGIN_GAMMA = (1 + MARGIN_ACCURACY) / (1 - MARGIN_ACCURACY)
+MARGIN_LOG_GAMMA = math.log(MARGIN_GAMMA)
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def check_distribution(name: str, spec: Mapping[str, Optional[float]]) -> None:
+    """
+    Validate one parameter distribution: ``triangular`` (``low``, ``mode``,
+    ``high``), ``normal`` (``mean``, ``std``, optionally clipped to
+    ``low``/``high``) or ``uniform`` (``low``, ``high``).
+    """
+    if name not in DEFAULTS:
+        raise ValueError(f"Unknown parameter: {name}")
+    kind = spec.get("distribution")
+    if kind not in DISTRIBUTIONS:
+        raise ValueError(f"{name}: distribution must be one of: {', '.join(DISTRIBUTIONS)}")
+    required = {"triangular": ("low", "mode", "high"), "normal": ("mean", "std"), "uniform": ("low", "high")}[kind]
+    missing = [key for key in required if spec.get(key) is None]
+    if missing:
+        raise ValueError(f"{name}: {kind} distribution requires {', '.join(missing)}")
+    low, high = spec.get("low"), spec.get("high")
+    if kind == "normal":
+        if spec["std"] < 0 or low is not None and high is not None and low > high:
+            raise ValueError(f"{name}: expected std >= 0 and low <= high")
+    elif not low < high or kind == "triangular" and not low <= spec["mode"] <= high:
+        raise ValueError(f"{name}: expected low < high (and low <= mode <= high)")
+
+
+def _draw(rng: np.random.Generator, spec: Mapping[str, Optional[float]], size: int) -> np.ndarray:
+    kind = spec["distribution"]
+    if kind == "triangular":
+        return rng.triangular(spec["low"], spec["mode"], spec["high"], size)
+    if kind == "uniform":
+        return rng.uniform(spec["low"], spec["high"], size)
+    values = rng.normal(spec["mean"], spec["std"], size)
+    if spec.get("low") is not None or spec.get("high") is not None:
+        np.clip(values, spec.get("low"), spec.get("high"), out=values)
+    return values
+
+
+class MarginSketch:
+    """
+    Mergeable summary of margins: finite count, mean and sum of squared
+    deviations (merged as in Chan et al.), exact min and max, and bin
+    counts for the percentiles (within ``MARGIN_ACCURACY``, exact at 0
+    and 100).
+    """
+
+    def __init__(self, values: np.ndarray):
+        finite = values[np.isfinite(values)]
+        self.count = len(finite)
+        self.mean = float(finite.mean()) if self.count else 0.0
+        self.m2 = float(np.square(finite - self.mean).sum()) if self.count else 0.0
+        self.low = float(finite.min()) if self.count else math.inf
+        self.high = float(finite.max()) if self.count else -math.inf
+        magnitude = np.maximum(np.abs(finite), MARGIN_RESOLUTION)
+        bins = np.ceil(np.log(magnitude / MARGIN_RESOLUTION) / MARGIN_LOG_GAMMA).astype(np.int64) + 1
+        bins[np.abs(finite) < MARGIN_RESOLUTION] = 0
+        self.bins, self.counts = np.unique(np.sign(finite).astype(np.int64) * bins, return_counts=True)
+
+    def merge(self, other: "MarginSketch") -> "MarginSketch":
+        if other.count:
+            count = self.count + other.count
+            delta = other.mean - self.mean
+            self.mean += delta * other.count / count
+            self.m2 += other.m2 + delta * delta * self.count * other.count / count
+            self.count = count
+            self.low, self.high = min(self.low, other.low), max(self.high, other.high)
+            bins, position = np.unique(np.concatenate([self.bins, other.bins]), return_inverse=True)
+            self.counts = np.bincount(position, np.concatenate([self.counts, other.counts])).astype(np.int64)
+            self.bins = bins
+        return self
+
+    @staticmethod
+    def bin_value(index: int) -> float:
+        """Representative margin of a bin (within ``MARGIN_ACCURACY`` of all its values)"""
+        if index == 0:
+            return 0.0
+        magnitude = MARGIN_RESOLUTION * 2 * MARGIN_GAMMA ** (abs(index) - 1) / (MARGIN_GAMMA + 1)
+        return math.copysign(magnitude, index)
+
+    def percentile(self, p: float) -> float:
+        """Margin at rank ``p`` % of the finite margins (nearest rank)"""
+        rank = round(p / 100 * (self.count - 1))
+        if rank == 0:
+            return self.low
+        if rank == self.count - 1:
+            return self.high
+        index = int(np.searchsorted(np.cumsum(self.counts), rank, side="right"))
+        return min(max(self.bin_value(int(self.bins[index])), self.low), self.high)
+
+    def summary(self, percentiles: List[float]) -> dict:
+        if not self.count:
+            return {"mean": None, "std": None, "percentiles": {f"p{p:g}": None for p in percentiles}}
+        return {
+            "mean": self.mean,
+            "std": math.sqrt(self.m2 / self.count),
+            "percentiles": {f"p{p:g}": self.percentile(p) for p in percentiles},
+        }
+
+
+def _run_scenarios(base: Mapping[str, float], distributions: Mapping[str, Mapping], seed: np.random.SeedSequence,
+                   size: int) -> tuple:
+    """
+    One chunk of scenarios: margin sketches (% and €), how many miss the
+    target margin and how many make a loss
+    """
+    rng = np.random.default_rng(seed)
+    params = dict(base)
+    # Parameter order, not request order, fixes which draws go where
+    for name in DEFAULTS:
+        if name in distributions:
+            params[name] = _draw(rng, distributions[name], size)
+    results = simulate(params)
+    # Without distributions every result is a scalar
+    percent, euro, target_met = (
+        np.broadcast_to(results[name], (size,)) for name in ("gross_margin_percent", "gross_margin_euro", "target_met")
+    )
+    return (
+        MarginSketch(percent), MarginSketch(euro),
+        size - int(np.count_nonzero(target_met)), int(np.count_nonzero(euro < 0)),
+    )
+
+
+def _pool(workers: int) -> ProcessPoolExecutor:
+    """Process pool shared by Monte Carlo runs, started on first use"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # spawn: forking a threaded server process is unsafe
+            _executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        return _executor
+
+
+def _discard_pool(pool: ProcessPoolExecutor) -> None:
+    """Drop a broken pool so that the next run starts a new one"""
+    global _executor
+    with _executor_lock:
+        if _executor is pool:
+            _executor = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def monte_carlo(base: Mapping[str, float], distributions: Dict[str, Mapping], scenarios: int, seed: int,
+                percentiles: List[float], workers: int = 1) -> dict:
+    """
+    Draw ``scenarios`` deals (``distributions`` parameters random, the
+    others from ``base``), evaluate them vectorized and summarize the gross
+    margin: mean, standard deviation, ``percentiles`` (% and €, within
+    ``MARGIN_ACCURACY``), the probability of missing
+    ``min_profit_margin_percent`` and of a loss.
+
+    Scenarios are drawn in chunks of ``MONTE_CARLO_CHUNK``; with
+    ``workers > 1`` and more than one chunk, chunks run in a process pool
+    and send back their sketches only. If a worker dies, the pool is
+    replaced for the next run and this one finishes in the calling thread.
+    The same ``seed`` gives the same result either way.
+    """
+    for name, spec in distributions.items():
+        check_distribution(name, spec)
+    if not 1 <= scenarios <= MAX_SCENARIOS:
+        raise ValueError(f"scenarios must be between 1 and {MAX_SCENARIOS}")
+    if any(not 0 <= p <= 100 for p in percentiles):
+        raise ValueError("percentiles must be between 0 and 100")
+    if seed < 0:
+        raise ValueError("seed must be non-negative")
+
+    sizes = [min(MONTE_CARLO_CHUNK, scenarios - start) for start in range(0, scenarios, MONTE_CARLO_CHUNK)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    base = {name: value for name, value in base.items() if name not in distributions}
+    chunks = None
+    if workers > 1 and len(sizes) > 1:
+        pool = _pool(workers)
+        try:
+            chunks = list(pool.map(_run_scenarios, [base] * len(sizes), [distributions] * len(sizes), seeds, sizes))
+        except BrokenProcessPool:
+            logger.error("Monte Carlo worker died, pool restarted; running this simulation in-process", exc_info=True)
+            _discard_pool(pool)
+    if chunks is None:
+        chunks = [_run_scenarios(base, distributions, chunk_seed, size) for chunk_seed, size in zip(seeds, sizes)]
+
+    percent, euro = chunks[0][0], chunks[0][1]
+    for chunk in chunks[1:]:
+        percent.merge(chunk[0])
+        euro.merge(chunk[1])
+    return {
+        "scenarios": scenarios,
+        "seed": seed,
+        "gross_margin_percent": percent.summary(percentiles),
+        "gross_margin_euro": euro.summary(percentiles),
+        "probability_below_target": sum(chunk[2] for chunk in chunks) / scenarios,
+        "probability_of_loss": sum(chunk[3] for chunk in chunks) / scenarios,
+    }
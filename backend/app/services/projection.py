@@ -0,0 +1,71 @@
+"""Column projection (``?fields=``) and JSON encoding of property reads"""
+from datetime import datetime
+from functools import lru_cache
+from typing import Iterable, List, Optional
+
+from pydantic_core import to_json
+
+from sqlalchemy.orm import Query
+
+from app.models import Property
+from app.schemas import PropertyResponse
+from app.services.fast_json import RowEncoder
+
+# Fields a client may request: exactly the public PropertyResponse fields
+PROPERTY_FIELDS = {name: getattr(Property, name) for name in PropertyResponse.model_fields}
+
+
+def parse_fields(value: str) -> List[str]:
+    """Parse ``"id,title,price"`` into a de-duplicated, validated field list"""
+    fields = []
+    for name in (part.strip() for part in value.split(",")):
+        if not name:
+            continue
+        if name not in PROPERTY_FIELDS:
+            raise ValueError(f"Unknown field: {name}")
+        if name not in fields:
+            fields.append(name)
+    if not fields:
+        raise ValueError("fields must name at least one field")
+    return fields
+
+
+def project(query: Query, fields: Iterable[str]) -> Query:
+    """
+    Select only ``fields`` from a properties query.
+
+    The query then yields lightweight row tuples (attribute access by field
+    name) instead of hydrated ``Property`` entities.
+    """
+    return query.with_entities(*[PROPERTY_FIELDS[name].label(name) for name in fields])
+
+
+def encode_value(value):
+    """JSON-ready value (datetimes as ISO 8601 strings)"""
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def serialize_row(row, fields: List[str]) -> dict:
+    """JSON-ready dict holding only the requested keys"""
+    return {name: encode_value(getattr(row, name)) for name in fields}
+
+
+@lru_cache(maxsize=256)
+def encoder(fields: tuple) -> RowEncoder:
+    """Shared encoder per field list"""
+    return RowEncoder(fields)
+
+
+def dump_row(row, fields: List[str]) -> bytes:
+    """JSON bytes of one projected row holding only the requested keys"""
+    return encoder(tuple(fields)).dumps(row)
+
+
+def dump_rows(rows, fields: List[str]) -> bytes:
+    """JSON array of projected rows (None entries become null)"""
+    return encoder(tuple(fields)).dumps_many(rows)
+
+
+def dump_page(rows, fields: List[str], next_cursor: Optional[str]) -> bytes:
+    """JSON keyset page: ``{"items": [...], "next_cursor": ...}``"""
+    return to_json({"items": encoder(tuple(fields)).rows(rows), "next_cursor": next_cursor})
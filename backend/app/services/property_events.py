@@ -0,0 +1,90 @@
+"""In-process notifications for property writes"""
+import logging
+from typing import Callable, List, Optional, Tuple
+
+logger = logging.getLogger("api")
+
+# Columns copied into write snapshots: the ones rollups and listeners key
+# on. An update touching none of them leaves its snapshot unchanged, so
+# the write path can skip reading the previous values.
+SNAPSHOT_FIELDS = (
+    "id", "price", "location", "rooms", "bathrooms", "area", "latitude", "longitude",
+)
+
+# (old, new) snapshots of one write
+Change = Tuple[Optional[dict], Optional[dict]]
+
+
+def snapshot(property_obj) -> dict:
+    """Plain-dict copy of a property, safe to use after the session closes"""
+    return {field: getattr(property_obj, field, None) for field in SNAPSHOT_FIELDS}
+
+
+def snapshot_values(values: dict) -> dict:
+    """Same as ``snapshot`` for a plain column -> value mapping"""
+    return {field: values.get(field) for field in SNAPSHOT_FIELDS}
+
+
+class PropertyEvents:
+    """
+    Publish committed property writes to in-process subscribers
+    (caches, in-memory indexes).
+
+    Subscribers receive ``(old, new)`` snapshots: ``old`` is None for a
+    creation and ``new`` is None for a deletion. Batch subscribers receive
+    the list of ``(old, new)`` pairs of one committed write or batch at
+    once, for work that should happen once per commit, together with the
+    table version the commit produced (None when unknown).
+    """
+
+    def __init__(self):
+        self._listeners: List[Callable[[Optional[dict], Optional[dict]], None]] = []
+        self._batch_listeners: List[Callable[[List[Change], Optional[int]], None]] = []
+
+    def subscribe(self, listener: Callable[[Optional[dict], Optional[dict]], None]):
+        """Register a listener; usable as a decorator"""
+        self._listeners.append(listener)
+        return listener
+
+    def subscribe_batch(self, listener: Callable[[List[Change], Optional[int]], None]):
+        """Register a batch listener; usable as a decorator"""
+        self._batch_listeners.append(listener)
+        return listener
+
+    def publish(self, old: Optional[dict], new: Optional[dict], version: Optional[int] = None) -> None:
+        """Notify every listener of one write"""
+        self.publish_many([(old, new)], version)
+
+    def publish_many(self, changes: List[Change], version: Optional[int] = None) -> None:
+        """
+        Notify every listener of the writes of one commit; a failing
+        listener does not stop the others. ``version`` is the value
+        ``http_cache.bump_version`` returned for that commit.
+        """
+        for listener in self._listeners:
+            for old, new in changes:
+                try:
+                    listener(old, new)
+                except Exception as e:
+                    logger.error(f"Property write listener {listener.__name__} failed: {e}", exc_info=True)
+        for listener in self._batch_listeners:
+            try:
+                listener(changes, version)
+            except Exception as e:
+                logger.error(f"Property write listener {listener.__name__} failed: {e}", exc_info=True)
+
+
+def next_version(seen: Optional[int], version: Optional[int]) -> Optional[int]:
+    """
+    Version an in-memory structure reflects after applying a commit.
+
+    Only a commit that directly follows ``seen`` keeps the structure in
+    step with the table; after a gap (a write made by another process) or
+    an unknown version it returns None, so the next read rebuilds.
+    """
+    if seen is None or version is None or version != seen + 1:
+        return None
+    return version
+
+
+property_events = PropertyEvents()
@@ -0,0 +1,107 @@
+"""Server-side property search filters"""
+from typing import Annotated, List, Optional
+
+from fastapi import Query as QueryParam
+from sqlalchemy.orm import Query
+
+from app.models import Property
+
+
+class PropertyFilters:
+    """
+    Filters shared by the property read endpoints.
+
+    Used as a FastAPI dependency (``filters: PropertyFilters = Depends()``).
+    Every numeric column accepts ``<col>_min``/``<col>_max`` ranges; ``rooms``,
+    ``bathrooms`` and ``location`` also accept equality or IN lists by
+    repeating the parameter (``?rooms=2&rooms=3``). Each supported predicate
+    is backed by one of the composite indexes declared on ``Property``.
+    """
+
+    def __init__(
+        self,
+        price_min: Optional[int] = None,
+        price_max: Optional[int] = None,
+        rooms: Annotated[Optional[List[int]], QueryParam()] = None,
+        rooms_min: Optional[int] = None,
+        rooms_max: Optional[int] = None,
+        bathrooms: Annotated[Optional[List[int]], QueryParam()] = None,
+        bathrooms_min: Optional[int] = None,
+        bathrooms_max: Optional[int] = None,
+        area_min: Optional[int] = None,
+        area_max: Optional[int] = None,
+        location: Annotated[Optional[List[str]], QueryParam()] = None,
+    ):
+        self.price_min = price_min
+        self.price_max = price_max
+        self.rooms = rooms
+        self.rooms_min = rooms_min
+        self.rooms_max = rooms_max
+        self.bathrooms = bathrooms
+        self.bathrooms_min = bathrooms_min
+        self.bathrooms_max = bathrooms_max
+        self.area_min = area_min
+        self.area_max = area_max
+        self.location = location
+
+    def is_empty(self) -> bool:
+        """True when no filter was given"""
+        return not any(value is not None for value in vars(self).values())
+
+    def apply(self, query: Query) -> Query:
+        """Add the WHERE clauses for every filter that was given"""
+        ranges = (
+            (Property.price, self.price_min, self.price_max),
+            (Property.rooms, self.rooms_min, self.rooms_max),
+            (Property.bathrooms, self.bathrooms_min, self.bathrooms_max),
+            (Property.area, self.area_min, self.area_max),
+        )
+        for column, low, high in ranges:
+            if low is not None:
+                query = query.filter(column >= low)
+            if high is not None:
+                query = query.filter(column <= high)
+
+        for column, values in (
+            (Property.rooms, self.rooms),
+            (Property.bathrooms, self.bathrooms),
+            (Property.location, self.location),
+        ):
+            if values:
+                if len(values) == 1:
+                    query = query.filter(column == values[0])
+                else:
+                    query = query.filter(column.in_(values))
+        return query
+
+
+def parse_ids(value: str, max_ids: int) -> List[int]:
+    """Parse ``"1,2,3"`` into ints, keeping order and duplicates"""
+    try:
+        ids = [int(part) for part in value.split(",") if part.strip()]
+    except ValueError as e:
+        raise ValueError("ids must be a comma-separated list of integers") from e
+    check_ids(ids, max_ids)
+    return ids
+
+
+def check_ids(ids: List[int], max_ids: int) -> None:
+    if not ids:
+        raise ValueError("ids must contain at least one id")
+    if len(ids) > max_ids:
+        raise ValueError(f"At most {max_ids} ids can be requested at once")
+
+
+def load_in_order(query: Query, ids: List[int], keep_missing: bool = False) -> list:
+    """
+    Load rows of a properties query (entities or projected rows with an
+    ``id`` column) with a single IN query, in the order of ``ids``.
+
+    Missing ids are dropped, or returned as None with ``keep_missing``.
+    """
+    if not ids:
+        return []
+    by_id = {row.id: row for row in query.filter(Property.id.in_(set(ids)))}
+    if keep_missing:
+        return [by_id.get(i) for i in ids]
+    return [by_id[i] for i in ids if i in by_id]
@@ -0,0 +1,112 @@
+"""Cache of serialized read responses, invalidated by property writes"""
+import json
+import threading
+from typing import Dict, List, NamedTuple, Optional
+from urllib.parse import urlencode
+
+from fastapi import Request
+
+from app.config import settings
+from app.services.cache_backends import CacheBackend, cache_backend
+from app.services.property_events import Change, property_events
+
+# Namespaces: one per property, and one for every listing variant
+PROPERTY = "property"
+LISTING = "listing"
+
+
+class CachedResponse(NamedTuple):
+    body: bytes
+    headers: Dict[str, str]
+
+
+class ResponseCache:
+    """
+    Cache of JSON response bodies on top of a ``CacheBackend``.
+
+    Entries hold the exact bytes sent to the client plus their cache
+    headers, so a hit answers without touching the database. Keys embed the
+    version of their namespace (the listings, or one property): a write
+    bumps the versions, which invalidates at once in every process sharing
+    the backend, and a response computed while the write was committing
+    lands under the old version where it is never read. Unreachable entries
+    are left to the backend's size-bounded eviction.
+    """
+
+    def __init__(self, backend: CacheBackend, ttl_seconds: float):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _scope(namespace: str, item: Optional[int]) -> str:
+        return f"{namespace}:{item}" if item is not None else namespace
+
+    def key(self, namespace: str, request: Request, item: Optional[int] = None) -> str:
+        """
+        Versioned key from the route path and the query parameters in
+        canonical order; ``item`` narrows the namespace to one property.
+        """
+        scope = self._scope(namespace, item)
+        version = self.backend.counter(f"version:{scope}")
+        query = urlencode(sorted(request.query_params.multi_items()))
+        return f"response:{scope}@{version}:{request.url.path}?{query}"
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        value = self.backend.get(key) if self.ttl_seconds > 0 else None
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        headers, body = value.split(b"\n", 1)
+        return CachedResponse(body, json.loads(headers))
+
+    def put(self, key: str, body: bytes, headers: Dict[str, str]) -> None:
+        if self.ttl_seconds > 0:
+            self.backend.set(key, json.dumps(headers).encode("utf-8") + b"\n" + body, self.ttl_seconds)
+
+    def invalidate(self, changes: List[Change]) -> None:
+        """
+        Invalidate the listings once, and the cached properties that were
+        updated or deleted (a new property has no cached entry yet). The
+        version counter of a deleted property is dropped.
+        """
+        for old, new in changes:
+            if old is None:
+                continue
+            scope = f"version:{self._scope(PROPERTY, old['id'])}"
+            if new is None:
+                self.backend.delete_counter(scope)
+            else:
+                self.backend.incr(scope)
+        self.backend.incr(f"version:{LISTING}")
+        with self._lock:
+            self.invalidations += 1
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            counters = {
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "invalidations": self.invalidations,
+            }
+        return {**self.backend.stats(), **counters}
+
+
+response_cache = ResponseCache(cache_backend, settings.response_cache_ttl)
+
+
+@property_events.subscribe_batch
+def invalidate_responses(changes: List[Change], version: Optional[int]) -> None:
+    """Invalidate cached responses made stale by a property write or batch"""
+    response_cache.invalidate(changes)
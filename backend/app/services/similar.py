@@ -0,0 +1,289 @@
+"""In-memory nearest-neighbour index for "similar properties" recommendations"""
+import logging
+import math
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.models import Property
+from app.services import http_cache
+from app.services.property_events import Change, next_version, property_events
+
+logger = logging.getLogger("api")
+
+# (column, center, scale, weight). Prices and areas compare on a log scale;
+# one scale step is one unit of distance before weighting.
+FEATURES = (
+    ("price", math.log(200_000), 0.25, 1.0),
+    ("area", math.log(60), 0.25, 1.0),
+    ("rooms", 3.0, 1.0, 0.5),
+    ("bathrooms", 1.0, 1.0, 0.25),
+)
+# Squared distance added for a different location, and for an unknown
+# value (which otherwise counts as the center value)
+LOCATION_PENALTY = 1.0
+MISSING_PENALTY = 1.0
+# Every SAMPLE_STEP-th score is used to guess a cut-off for the top-k
+SAMPLE_STEP = 97
+INITIAL_CAPACITY = 1024
+
+
+def _standardize(name: str, value, center: float, scale: float) -> Optional[float]:
+    if value is None:
+        return None
+    if name in ("price", "area"):
+        if value <= 0:
+            return None
+        value = math.log(value)
+    return (value - center) / scale
+
+
+class SimilarIndex:
+    """
+    Weighted-distance k-NN over price, area, rooms, bathrooms and location.
+
+    The distance to a property is
+    ``sum(weight * (x - q) ** 2) + LOCATION_PENALTY * (location differs)``
+    over the standardized features the reference property has. Expanded,
+    ``weight * (x - q) ** 2 = weight * x ** 2 - 2 * weight * q * x`` plus a
+    constant, so every score comes from one matrix-vector product over a
+    float32 matrix holding ``x ** 2`` and ``x`` for each feature, one
+    contiguous row per term. Unknown values are stored as ``x = 0`` and
+    ``x ** 2 = MISSING_PENALTY``. The top-k is taken with ``argpartition``
+    over the scores under a cut-off estimated from a sample of them.
+
+    The matrix is loaded from the database on first use and then kept up to
+    date from ``property_events``; writes published while it loads are
+    replayed afterwards. ``version`` is the table version the matrix
+    reflects: when the database is ahead of it (a write from another worker
+    process) the next query reloads. Deleting swaps the last column into
+    the freed slot so that the columns stay dense.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._clear()
+
+    def _clear(self) -> None:
+        self.loaded = False
+        self.version: Optional[int] = None
+        self._loading = False
+        self._pending: list = []
+        self._size = 0
+        self._matrix = np.zeros((2 * len(FEATURES), INITIAL_CAPACITY), dtype=np.float32)
+        self._locations = np.zeros(INITIAL_CAPACITY, dtype=np.int32)
+        self._known = np.zeros(INITIAL_CAPACITY, dtype=np.uint8)  # bit j: feature j is known
+        self._ids = np.zeros(INITIAL_CAPACITY, dtype=np.int64)
+        self._slots: Dict[int, int] = {}
+        self._location_codes: Dict[str, int] = {}
+
+    def clear(self) -> None:
+        """Forget everything; the next query reloads from the database"""
+        with self._lock:
+            self._clear()
+
+    def __len__(self) -> int:
+        return self._size
+
+    @staticmethod
+    def _columns(values: dict):
+        """``[x ** 2 ..., x ...]`` and the known-feature bits for one property"""
+        column = np.zeros(2 * len(FEATURES), dtype=np.float32)
+        known = 0
+        for j, (name, center, scale, _) in enumerate(FEATURES):
+            x = _standardize(name, values.get(name), center, scale)
+            column[j] = MISSING_PENALTY if x is None else x * x
+            column[len(FEATURES) + j] = 0.0 if x is None else x
+            known |= 0 if x is None else 1 << j
+        return column, known
+
+    def _location_code(self, location: Optional[str]) -> int:
+        return self._location_codes.setdefault(location or "", len(self._location_codes))
+
+    def _grow(self, capacity: int) -> None:
+        matrix = np.zeros((self._matrix.shape[0], capacity), dtype=np.float32)
+        matrix[:, :self._size] = self._matrix[:, :self._size]
+        self._matrix = matrix
+        for name in ("_locations", "_known", "_ids"):
+            current = getattr(self, name)
+            grown = np.zeros(capacity, dtype=current.dtype)
+            grown[:self._size] = current[:self._size]
+            setattr(self, name, grown)
+
+    def _upsert(self, values: dict) -> None:
+        slot = self._slots.get(values["id"])
+        if slot is None:
+            if self._size == len(self._ids):
+                self._grow(2 * len(self._ids))
+            slot = self._size
+            self._size += 1
+            self._slots[values["id"]] = slot
+            self._ids[slot] = values["id"]
+        self._matrix[:, slot], self._known[slot] = self._columns(values)
+        self._locations[slot] = self._location_code(values.get("location"))
+
+    def _remove(self, property_id: int) -> None:
+        slot = self._slots.pop(property_id, None)
+        if slot is None:
+            return
+        last = self._size - 1
+        if slot != last:
+            self._matrix[:, slot] = self._matrix[:, last]
+            self._locations[slot] = self._locations[last]
+            self._known[slot] = self._known[last]
+            self._ids[slot] = self._ids[last]
+            self._slots[int(self._ids[slot])] = slot
+        self._size = last
+
+    def _apply(self, old: Optional[dict], new: Optional[dict]) -> None:
+        if new is None:
+            self._remove(old["id"])
+        else:
+            self._upsert(new)
+
+    def apply(self, old: Optional[dict], new: Optional[dict], version: Optional[int] = None) -> None:
+        """Apply one committed property write (see ``PropertyEvents``)"""
+        self.apply_many([(old, new)], version)
+
+    def apply_many(self, changes: List[Change], version: Optional[int]) -> None:
+        """Apply the writes of one commit, which moved the table to ``version``"""
+        with self._lock:
+            if self._loading:
+                self._pending.append((changes, version))
+            if self.loaded:
+                for old, new in changes:
+                    self._apply(old, new)
+                self.version = next_version(self.version, version)
+
+    def ensure_loaded(self, db: Session) -> None:
+        """
+        Load every property with one query the first time, and again when
+        the table version in the database is not the one the index reflects.
+        The previous matrix keeps answering queries during a reload.
+        """
+        if self.loaded and self.version == http_cache.current_version(db)[0]:
+            return
+        with self._load_lock:
+            with self._lock:
+                self._loading = True
+            try:
+                version = http_cache.current_version(db)[0]
+                if self.loaded and self.version == version:
+                    rows = None
+                else:
+                    rows = db.query(
+                        Property.id, Property.price, Property.area, Property.rooms, Property.bathrooms,
+                        Property.location
+                    ).all()
+            except Exception:
+                with self._lock:
+                    self._loading = False
+                    self._pending = []
+                raise
+            with self._lock:
+                pending = self._pending
+                self._pending = []
+                self._loading = False
+                if rows is None:
+                    return
+                self._clear()
+                self._load(rows)
+                self.version = version
+                for changes, change_version in pending:
+                    # Writes committed before the version was read are in the rows
+                    if change_version is not None and change_version <= version:
+                        continue
+                    for old, new in changes:
+                        self._apply(old, new)
+                    self.version = next_version(self.version, change_version)
+                self.loaded = True
+        logger.info(f"Similar-properties index loaded: {len(rows)} properties")
+
+    def _load(self, rows: list) -> None:
+        """Fill the index from ``(id, price, area, rooms, bathrooms, location)`` rows, column by column"""
+        count = len(rows)
+        self._grow(max(INITIAL_CAPACITY, 2 * count))
+        if not count:
+            return
+        ids, prices, areas, rooms, bathrooms, locations = zip(*rows)
+        columns = {"price": prices, "area": areas, "rooms": rooms, "bathrooms": bathrooms}
+        known_bits = np.zeros(count, dtype=np.uint8)
+        for j, (name, center, scale, _) in enumerate(FEATURES):
+            raw = np.array(columns[name], dtype=np.float64)  # None becomes NaN
+            if name in ("price", "area"):
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    raw = np.where(raw > 0, np.log(raw), np.nan)
+            x = (raw - center) / scale
+            known = ~np.isnan(x)
+            self._matrix[j, :count] = np.where(known, x * x, MISSING_PENALTY)
+            self._matrix[len(FEATURES) + j, :count] = np.where(known, x, 0.0)
+            known_bits |= known.astype(np.uint8) << j
+        self._known[:count] = known_bits
+        self._ids[:count] = ids
+        self._locations[:count] = [self._location_code(location) for location in locations]
+        self._slots = {property_id: slot for slot, property_id in enumerate(ids)}
+        self._size = count
+
+    def similar(self, property_id: int, k: int) -> List[int]:
+        """
+        Ids of the ``k`` properties closest to ``property_id``, nearest first.
+
+        Raises ``KeyError`` if the property is not indexed.
+        """
+        with self._lock:
+            slot = self._slots[property_id]
+            return self._nearest(self._matrix[:, slot], int(self._known[slot]), self._locations[slot], k, slot)
+
+    def nearest(self, values: dict, k: int, exclude: Optional[int] = None) -> List[int]:
+        """
+        Ids of the ``k`` properties closest to ``values`` (a property-like
+        dict; missing keys are left out of the distance), nearest first.
+        ``exclude`` is a property id never returned.
+        """
+        column, known = self._columns(values)
+        with self._lock:
+            location = self._location_codes.get(values.get("location") or "", -1)
+            return self._nearest(column, known, location, k, self._slots.get(exclude))
+
+    def _nearest(self, reference: np.ndarray, known: int, location: int, k: int, skip: Optional[int]) -> List[int]:
+        size = self._size
+        k = min(k, size - (skip is not None))
+        if k <= 0:
+            return []
+        features = len(FEATURES)
+        query = np.zeros(2 * features, dtype=np.float32)
+        for j, (_, _, _, weight) in enumerate(FEATURES):
+            # Features the reference lacks are left out
+            if known >> j & 1:
+                query[j] = weight
+                query[features + j] = -2.0 * weight * reference[features + j]
+
+        scores = query @ self._matrix[:, :size]
+        np.add(scores, LOCATION_PENALTY, out=scores, where=self._locations[:size] != location)
+        if skip is not None:
+            scores[skip] = np.inf
+
+        # When at least k scores fall under the k-th smallest of a
+        # sample, the top-k is among them: only those are partitioned
+        top = None
+        sample = scores[::SAMPLE_STEP]
+        if len(sample) > k:
+            under = np.flatnonzero(scores <= np.partition(sample, k - 1)[k - 1])
+            if len(under) >= k:
+                top = under[np.argpartition(scores[under], k - 1)[:k]] if len(under) > k else under
+        if top is None:
+            top = np.argpartition(scores, k - 1)[:k]
+        top = top[np.argsort(scores[top], kind="stable")]
+        return self._ids[top].tolist()
+
+
+similar_index = SimilarIndex()
+
+
+@property_events.subscribe_batch
+def update_similar_index(changes: List[Change], version: Optional[int]) -> None:
+    """Keep the similar-properties index in step with property writes"""
+    similar_index.apply_many(changes, version)
@@ -0,0 +1,353 @@
+"""Automated valuation: hedonic model of the price per m² with location effects"""
+import logging
+import math
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.models import Property
+from app.services import http_cache
+from app.services.property_events import Change, next_version, property_events
+from app.services.similar import similar_index
+
+logger = logging.getLogger("api")
+
+# Regressors of log(price / area), centered so that the sums stay well
+# conditioned: log area, rooms and bathrooms, with an indicator for each
+# unknown count (whose value then counts as the center)
+LOG_AREA_CENTER = math.log(60)
+ROOMS_CENTER = 3.0
+BATHROOMS_CENTER = 1.0
+REGRESSORS = ("log_area", "rooms", "rooms_missing", "bathrooms", "bathrooms_missing")
+# A location effect is shrunk towards the overall level as if it had
+# SHRINKAGE extra listings at that level
+SHRINKAGE = 5.0
+# Comparables drawn from the similar-properties index for the interval
+COMPARABLES = 10
+MIN_COMPARABLES = 4
+CONFIDENCE = 0.8
+Z_SCORE = 1.2816  # two-sided 80% normal quantile, used without comparables
+
+
+def design(areas, rooms, bathrooms) -> np.ndarray:
+    """Regressor matrix (one row per property); None counts are unknown"""
+    areas = np.asarray(areas, dtype=np.float64)
+    rooms = np.array(rooms, dtype=np.float64)  # None becomes NaN
+    bathrooms = np.array(bathrooms, dtype=np.float64)
+    rooms_missing = np.isnan(rooms)
+    bathrooms_missing = np.isnan(bathrooms)
+    return np.column_stack([
+        np.log(areas) - LOG_AREA_CENTER,
+        np.where(rooms_missing, 0.0, rooms - ROOMS_CENTER),
+        rooms_missing,
+        np.where(bathrooms_missing, 0.0, bathrooms - BATHROOMS_CENTER),
+        bathrooms_missing,
+    ])
+
+
+def _valid(values: dict) -> bool:
+    """Only priced listings with a surface take part in the fit"""
+    return bool(values.get("price")) and values["price"] > 0 and bool(values.get("area")) and values["area"] > 0
+
+
+class ValuationModel:
+    """
+    Hedonic regression ``log(price / area) = alpha[location] + x @ beta``,
+    fitted on every priced listing with a surface.
+
+    The fit runs on per-location sufficient statistics (count and sums of
+    ``x``, ``y``, ``x x^T``, ``x y``, ``y^2``) that are loaded with one query
+    and then updated from ``property_events``, so a write costs a few
+    small array updates and never a table scan. ``beta`` is the
+    within-location least-squares solution (``np.linalg.lstsq`` on the
+    demeaned normal equations, which handles regressors without
+    variation); each location effect is the mean residual of its listings,
+    shrunk towards the overall level. The model is refitted lazily, on the
+    first valuation after a write, at a cost that depends only on the
+    number of locations. As for ``SimilarIndex``, the statistics are
+    reloaded when the table version in the database is not the one they
+    reflect.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._clear()
+
+    def _clear(self) -> None:
+        self.loaded = False
+        self.version: Optional[int] = None
+        self._loading = False
+        self._pending: list = []
+        self._fit: Optional[dict] = None
+        width = len(REGRESSORS)
+        self._locations: Dict[str, int] = {}
+        self._count = np.zeros(0)
+        self._sum_x = np.zeros((0, width))
+        self._sum_y = np.zeros(0)
+        self._sum_xx = np.zeros((0, width, width))
+        self._sum_xy = np.zeros((0, width))
+        self._sum_yy = np.zeros(0)
+
+    def clear(self) -> None:
+        """Forget everything; the next valuation reloads from the database"""
+        with self._lock:
+            self._clear()
+
+    def __len__(self) -> int:
+        return int(round(self._count.sum()))
+
+    def _location_code(self, location: Optional[str]) -> int:
+        code = self._locations.setdefault(location or "", len(self._locations))
+        if code == len(self._count):
+            grow = max(1, len(self._count))
+            for name in ("_count", "_sum_x", "_sum_y", "_sum_xx", "_sum_xy", "_sum_yy"):
+                current = getattr(self, name)
+                setattr(self, name, np.concatenate([current, np.zeros((grow, *current.shape[1:]))]))
+        return code
+
+    def _add(self, values: dict, sign: float) -> None:
+        if not _valid(values):
+            return
+        code = self._location_code(values.get("location"))
+        x = design([values["area"]], [values.get("rooms")], [values.get("bathrooms")])[0]
+        y = math.log(values["price"] / values["area"])
+        self._count[code] += sign
+        self._sum_x[code] += sign * x
+        self._sum_y[code] += sign * y
+        self._sum_xx[code] += sign * np.outer(x, x)
+        self._sum_xy[code] += sign * x * y
+        self._sum_yy[code] += sign * y * y
+        self._fit = None
+
+    def _apply(self, old: Optional[dict], new: Optional[dict]) -> None:
+        if old is not None:
+            self._add(old, -1.0)
+        if new is not None:
+            self._add(new, 1.0)
+
+    def apply(self, old: Optional[dict], new: Optional[dict], version: Optional[int] = None) -> None:
+        """Apply one committed property write (see ``PropertyEvents``)"""
+        self.apply_many([(old, new)], version)
+
+    def apply_many(self, changes: List[Change], version: Optional[int]) -> None:
+        """Apply the writes of one commit, which moved the table to ``version``"""
+        with self._lock:
+            if self._loading:
+                self._pending.append((changes, version))
+            if self.loaded:
+                for old, new in changes:
+                    self._apply(old, new)
+                self.version = next_version(self.version, version)
+
+    def ensure_loaded(self, db: Session) -> None:
+        """
+        Accumulate the statistics of every property with one query the
+        first time, and again when the table version in the database is
+        not the one they reflect.
+        """
+        if self.loaded and self.version == http_cache.current_version(db)[0]:
+            return
+        with self._load_lock:
+            with self._lock:
+                self._loading = True
+            try:
+                version = http_cache.current_version(db)[0]
+                if self.loaded and self.version == version:
+                    rows = None
+                else:
+                    rows = db.query(
+                        Property.price, Property.area, Property.rooms, Property.bathrooms, Property.location
+                    ).filter(Property.price > 0, Property.area > 0).all()
+            except Exception:
+                with self._lock:
+                    self._loading = False
+                    self._pending = []
+                raise
+            with self._lock:
+                pending = self._pending
+                self._pending = []
+                self._loading = False
+                if rows is None:
+                    return
+                self._clear()
+                self._load(rows)
+                self.version = version
+                for changes, change_version in pending:
+                    # Writes committed before the version was read are in the
+                    # rows; replaying them would count them twice
+                    if change_version is not None and change_version <= version:
+                        continue
+                    for old, new in changes:
+                        self._apply(old, new)
+                    self.version = next_version(self.version, change_version)
+                self.loaded = True
+        logger.info(f"Valuation model loaded: {len(rows)} properties")
+
+    def _load(self, rows: list) -> None:
+        """Accumulate ``(price, area, rooms, bathrooms, location)`` rows, grouped with ``bincount``"""
+        if not rows:
+            return
+        prices, areas, rooms, bathrooms, locations = zip(*rows)
+        codes = np.array([self._location_code(location) for location in locations])
+        x = design(areas, rooms, bathrooms)
+        y = np.log(np.asarray(prices, dtype=np.float64) / np.asarray(areas, dtype=np.float64))
+        size = len(self._count)
+
+        def total(weights):
+            return np.bincount(codes, weights=weights, minlength=size)
+
+        self._count += total(None)
+        self._sum_y += total(y)
+        self._sum_yy += total(y * y)
+        for a in range(x.shape[1]):
+            self._sum_x[:, a] += total(x[:, a])
+            self._sum_xy[:, a] += total(x[:, a] * y)
+            for b in range(a, x.shape[1]):
+                products = total(x[:, a] * x[:, b])
+                self._sum_xx[:, a, b] += products
+                if b != a:
+                    self._sum_xx[:, b, a] += products
+        self._fit = None
+
+    def _solve(self) -> Optional[dict]:
+        """Fit the model from the statistics (None without data)"""
+        count = self._count
+        total = count.sum()
+        if total < 1:
+            return None
+        used = count > 0.5
+        n = count[used][:, None]
+        sum_x = self._sum_x[used]
+        sum_y = self._sum_y[used]
+        # Demeaned within each location
+        within_xx = self._sum_xx[used].sum(axis=0) - np.einsum("la,lb->ab", sum_x / n, sum_x)
+        within_xy = self._sum_xy[used].sum(axis=0) - (sum_x * (sum_y[:, None] / n)).sum(axis=0)
+        beta = np.linalg.lstsq(within_xx, within_xy, rcond=None)[0]
+
+        level = (sum_y.sum() - sum_x.sum(axis=0) @ beta) / total
+        raw = (sum_y - sum_x @ beta) / n[:, 0]
+        effects = np.full(len(count), level)
+        effects[used] = level + n[:, 0] / (n[:, 0] + SHRINKAGE) * (raw - level)
+
+        # Residual sum of squares, expanded over the sums
+        alpha = effects[used]
+        residual = (
+            self._sum_yy[used] - 2 * self._sum_xy[used] @ beta
+            + np.einsum("a,lab,b->l", beta, self._sum_xx[used], beta)
+            - 2 * alpha * (sum_y - sum_x @ beta) + n[:, 0] * alpha * alpha
+        ).sum()
+        dof = max(total - len(REGRESSORS) - used.sum(), 1.0)
+        return {"beta": beta, "level": level, "effects": effects, "rmse": math.sqrt(max(residual, 0.0) / dof)}
+
+    def fit(self) -> Optional[dict]:
+        """Current coefficients, refitted if a write came in since the last fit"""
+        with self._lock:
+            if self._fit is None:
+                self._fit = self._solve()
+            return self._fit
+
+    def predict(self, fit: dict, x: np.ndarray, locations: List[Optional[str]]) -> np.ndarray:
+        """log(price / area) for regressor rows ``x``; unknown locations get the overall level"""
+        with self._lock:
+            codes = [self._locations.get(location or "", -1) for location in locations]
+        effects = np.array([
+            fit["effects"][code] if 0 <= code < len(fit["effects"]) else fit["level"] for code in codes
+        ])
+        return effects + x @ fit["beta"]
+
+    def value(self, db: Session, items: List[dict]) -> List[Optional[dict]]:
+        """
+        Estimate the price of each item (``area``, ``rooms``, ``bathrooms``,
+        ``location``, or ``property_id`` to value a listing from its stored
+        features). Items naming a missing property give None.
+
+        The estimate is the model value corrected by the median residual of
+        the nearest comparable listings (asking prices are not used to pick
+        them); the interval spans their central ``CONFIDENCE`` residuals, or
+        a normal interval from the model error without enough comparables.
+
+        Raises ``ValueError`` for an item without a positive area and
+        ``LookupError`` when there is nothing to fit on.
+        """
+        self.ensure_loaded(db)
+        similar_index.ensure_loaded(db)
+
+        listing_ids = [item["property_id"] for item in items if item.get("property_id") is not None]
+        listings = {}
+        if listing_ids:
+            rows = db.query(
+                Property.id, Property.area, Property.rooms, Property.bathrooms, Property.location
+            ).filter(Property.id.in_(set(listing_ids))).all()
+            listings = {row.id: row._asdict() for row in rows}
+
+        subjects = []
+        for item in items:
+            property_id = item.get("property_id")
+            if property_id is not None:
+                subject = listings.get(property_id)
+                if subject is None:
+                    subjects.append(None)
+                    continue
+                subject = {**subject, "property_id": property_id}
+            else:
+                subject = {"property_id": None, **{key: item.get(key) for key in ("area", "rooms", "bathrooms", "location")}}
+            if not subject.get("area") or subject["area"] <= 0:
+                raise ValueError(
+                    f"Property {property_id} has no area" if property_id is not None else "area must be positive"
+                )
+            subject["comparables"] = similar_index.nearest(
+                {key: subject[key] for key in ("area", "rooms", "bathrooms", "location")}, COMPARABLES, exclude=property_id
+            )
+            subjects.append(subject)
+
+        found = [subject for subject in subjects if subject is not None]
+        if not found:
+            return subjects
+        fit = self.fit()
+        if fit is None:
+            raise LookupError("No priced property with an area to fit the valuation model on")
+        comparable_ids = {i for subject in found for i in subject["comparables"]}
+        comparables = {}
+        if comparable_ids:
+            rows = db.query(
+                Property.id, Property.price, Property.area, Property.rooms, Property.bathrooms, Property.location
+            ).filter(Property.id.in_(comparable_ids), Property.price > 0, Property.area > 0).all()
+            if rows:
+                x = design([row.area for row in rows], [row.rooms for row in rows], [row.bathrooms for row in rows])
+                actual = np.log(np.array([row.price / row.area for row in rows]))
+                residuals = actual - self.predict(fit, x, [row.location for row in rows])
+                comparables = {row.id: residual for row, residual in zip(rows, residuals.tolist())}
+
+        x = design([s["area"] for s in found], [s["rooms"] for s in found], [s["bathrooms"] for s in found])
+        predicted = self.predict(fit, x, [s["location"] for s in found])
+        tail = (1 - CONFIDENCE) / 2
+        for subject, log_price_m2 in zip(found, predicted.tolist()):
+            ids = [i for i in subject.pop("comparables") if i in comparables]
+            if len(ids) >= MIN_COMPARABLES:
+                residuals = np.array([comparables[i] for i in ids])
+                center = float(np.median(residuals))
+                low, high = np.quantile(residuals, [tail, 1 - tail]).tolist()
+            else:
+                center, low, high = 0.0, -Z_SCORE * fit["rmse"], Z_SCORE * fit["rmse"]
+            area = subject["area"]
+            subject.update({
+                "price_per_m2": round(math.exp(log_price_m2 + center), 2),
+                "estimated_price": round(area * math.exp(log_price_m2 + center)),
+                "price_low": round(area * math.exp(log_price_m2 + min(low, center))),
+                "price_high": round(area * math.exp(log_price_m2 + max(high, center))),
+                "confidence": CONFIDENCE,
+                "comparables": ids,
+            })
+        return subjects
+
+
+valuation_model = ValuationModel()
+
+
+@property_events.subscribe_batch
+def update_valuation_model(changes: List[Change], version: Optional[int]) -> None:
+    """Keep the valuation statistics in step with property writes"""
+    valuation_model.apply_many(changes, version)
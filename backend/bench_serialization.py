@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la sérialisation JSON des listes de propriétés
+
+Compare, pour 100, 1 000 et 10 000 biens, le coût par élément de:
+- avant: entités ORM hydratées puis validées une à une par
+  ``PropertyResponse`` (chemin ``response_model`` de FastAPI);
+- après: colonnes projetées encodées en une passe (``projection.dump_rows``).
+
+Les deux chemins incluent la requête SQL (base SQLite en mémoire).
+
+Usage: python bench_serialization.py [--repeat 5]
+"""
+
+import argparse
+import json
+import time
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from pydantic import TypeAdapter
+
+from app.database import Base
+from app.models import Property
+from app.schemas import PropertyResponse
+from app.services import projection
+
+SIZES = (100, 1_000, 10_000)
+LIST_ADAPTER = TypeAdapter(List[Optional[PropertyResponse]])
+
+
+def seed(db, count: int):
+    now = datetime.utcnow()
+    db.execute(insert(Property), [
+        {
+            "title": f"Appartement {i}", "description": "Lumineux, proche des transports " * 4,
+            "price": 100_000 + i, "location": "Lyon", "rooms": 3, "bathrooms": 1, "area": 65,
+            "latitude": 45.75, "longitude": 4.85, "created_at": now, "updated_at": now,
+        }
+        for i in range(count)
+    ])
+    db.commit()
+
+
+def before(db, count: int) -> bytes:
+    """Entités ORM + validation Pydantic par élément + json.dumps"""
+    items = db.query(Property).order_by(Property.id).limit(count).all()
+    content = LIST_ADAPTER.dump_python(LIST_ADAPTER.validate_python(items, from_attributes=True), mode="json")
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def after(db, count: int) -> bytes:
+    """Colonnes projetées encodées en une passe"""
+    fields = list(projection.PROPERTY_FIELDS)
+    query = db.query(Property).order_by(Property.id).limit(count)
+    return projection.dump_rows(projection.project(query, fields).all(), fields)
+
+
+def best_time(run, db, count: int, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        db.expunge_all()
+        start = time.perf_counter()
+        run(db, count)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    """Fonction principale"""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    seed(db, max(SIZES))
+
+    assert json.loads(before(db, 100)) == json.loads(after(db, 100)), "les deux chemins doivent produire le même JSON"
+
+    print(f"\n{'éléments':>10} {'avant µs/élt':>14} {'après µs/élt':>14} {'gain':>7}")
+    for count in SIZES:
+        slow = best_time(before, db, count, args.repeat) / count * 1e6
+        fast = best_time(after, db, count, args.repeat) / count * 1e6
+        print(f"{count:>10} {slow:>14.2f} {fast:>14.2f} {slow / fast:>6.1f}x")
+    print()
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,13 @@
 """Pytest configuration and fixtures"""
 import pytest
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from fastapi.testclient import TestClient
 
 from app.database import Base
 from main import app
 from app.database import get_db
+from app.services.response_cache import response_cache
 
 # Create test database
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
@@ -19,6 +20,7 @@ TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engin
 def db():
     """Create a fresh test database for each test"""
     Base.metadata.create_all(bind=engine)
+    response_cache.clear()
     db = TestingSessionLocal()
     yield db
     db.close()
@@ -36,3 +38,17 @@ def client(db):
     app.dependency_overrides[get_db] = override_get_db
     yield TestClient(app)
     app.dependency_overrides.clear()
+
+@pytest.fixture
+def foreign_keys(db):
+    """Enforce foreign keys, as PostgreSQL does (SQLite leaves them off per connection)"""
+    def enable(connection, record):
+        connection.execute("PRAGMA foreign_keys=ON")
+
+    db.close()
+    engine.dispose()
+    event.listen(engine, "connect", enable)
+    yield
+    event.remove(engine, "connect", enable)
+    db.close()
+    engine.dispose()
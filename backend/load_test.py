@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Test de charge: routes d'authentification synchrones vs asynchrones
+
+Lance l'API avec uvicorn (un worker) dans chaque mode (``ASYNC_ROUTES``
+false puis true) sur une base SQLite temporaire pré-remplie d'utilisateurs,
+puis la sollicite avec N clients concurrents (200 par défaut) pendant une
+durée fixe sur ``GET /api/auth/me``, avec un jeton par utilisateur: une
+lecture en base par requête. Affiche le débit soutenu (req/s) et les
+latences p50/p99 de chaque mode.
+
+Usage: python load_test.py [--clients 200] [--duration 20] [--users 5000]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+import httpx
+from sqlalchemy import create_engine, insert
+
+from app.database import Base
+from app.models import User
+from app.services.auth import auth_service
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def seed(database_url: str, count: int) -> List[str]:
+    """Crée ``count`` utilisateurs et renvoie un jeton par utilisateur"""
+    engine = create_engine(database_url)
+    Base.metadata.create_all(bind=engine)
+    now = datetime.utcnow()
+    with engine.begin() as connection:
+        connection.execute(insert(User), [
+            {
+                "username": f"user{i}", "email": f"user{i}@example.com", "hashed_password": "-",
+                "created_at": now, "updated_at": now,
+            }
+            for i in range(count)
+        ])
+    engine.dispose()
+    return [
+        auth_service.create_access_token({"sub": f"user{i}"}, timedelta(hours=1)) for i in range(count)
+    ]
+
+
+def start_server(port: int, env: dict) -> subprocess.Popen:
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health").status_code == 200:
+                return server
+        except httpx.TransportError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError("le serveur n'a pas démarré")
+
+
+async def run_clients(base_url: str, clients: int, duration: float, tokens: List[str]) -> dict:
+    latencies = []
+    errors = 0
+    stop_at = time.perf_counter() + duration
+
+    async def client_loop(http: httpx.AsyncClient):
+        nonlocal errors
+        while time.perf_counter() < stop_at:
+            headers = {"Authorization": f"Bearer {random.choice(tokens)}"}
+            start = time.perf_counter()
+            try:
+                response = await http.get("/api/auth/me", headers=headers)
+                if response.status_code != 200:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as http:
+        started = time.perf_counter()
+        await asyncio.gather(*(client_loop(http) for _ in range(clients)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+
+    def percentile(p: float) -> float:
+        return latencies[min(int(p * len(latencies)), len(latencies) - 1)] * 1000 if latencies else float("nan")
+
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed,
+        "p50_ms": percentile(0.50),
+        "p99_ms": percentile(0.99),
+    }
+
+
+def main():
+    """Fonction principale"""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--users", type=int, default=5000)
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        database_url = f"sqlite:///{os.path.join(workdir, 'load.db')}"
+        tokens = seed(database_url, args.users)
+        for mode in ("sync", "async"):
+            port = free_port()
+            env = {
+                **os.environ,
+                "DATABASE_URL": database_url,
+                "ASYNC_ROUTES": "true" if mode == "async" else "false",
+                "RESPONSE_CACHE_TTL": "0",
+            }
+            server = start_server(port, env)
+            try:
+                print(f"⏱  {mode}: {args.clients} clients pendant {args.duration:.0f}s...")
+                results[mode] = asyncio.run(
+                    run_clients(f"http://127.0.0.1:{port}", args.clients, args.duration, tokens)
+                )
+            finally:
+                server.terminate()
+                server.wait()
+
+    print(f"\n{'mode':>6} {'requêtes':>9} {'erreurs':>8} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9}")
+    for mode, result in results.items():
+        print(
+            f"{mode:>6} {result['requests']:>9} {result['errors']:>8} {result['rps']:>9.1f} "
+            f"{result['p50_ms']:>9.1f} {result['p99_ms']:>9.1f}"
+        )
+    print()
+
+
+if __name__ == "__main__":
+    main()
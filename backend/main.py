@@ -1,29 +1,55 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.exceptions import RequestValidationError
 from starlette.responses import JSONResponse
 from app.config import settings
-from app.database import engine, Base
+from app.database import engine, Base, SessionLocal, upgrade_schema
 from app.routes import health, auth
-from app.routes import properties
+from app.routes import properties, simulations, stats, valuation
+from app.routes import auth_async
+from app.services import full_text
+from app.services.deal_scores import deal_score_service
+from app.services.dedup import dedup_service
+from app.services.facets import facet_service
+from app.services.market_stats import market_stats_service
+from app.services.price_history import price_history_service
 from app.middleware import LoggingMiddleware
 from app.logging_config import logger, setup_logging
 
-# Setup logging
-setup_logging()
-logger.info("=" * 50)
-logger.info("Starting Immobilier API")
-logger.info("=" * 50)
+def prepare_database():
+    """Create or upgrade the schema and build the derived tables it is missing"""
+    Base.metadata.create_all(bind=engine)
+    upgrade_schema(engine)
+    full_text.ensure_index(engine)
+    with SessionLocal() as startup_db:
+        facet_service.ensure_built(startup_db)
+        market_stats_service.ensure_built(startup_db)
+        deal_score_service.ensure_built(startup_db)
+        price_history_service.ensure_seeded(startup_db)
+        dedup_service.ensure_built(startup_db)
+    logger.info("Database tables created/verified")
 
-# Create tables
-Base.metadata.create_all(bind=engine)
-logger.info("Database tables created/verified")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Startup runs here, not at import: Monte Carlo worker processes
+    # (spawn) re-import this module and must not redo it
+    setup_logging()
+    logger.info("=" * 50)
+    logger.info("Starting Immobilier API")
+    logger.info("=" * 50)
+    prepare_database()
+    logger.info(f"CORS allowed origins: {settings.allowed_origins}")
+    logger.info(f"All routers included ({'async' if settings.async_routes else 'sync'} auth routes)")
+    yield
 
 # Initialize app
 app = FastAPI(
     title=settings.app_name,
     version=settings.api_version,
-    debug=settings.debug
+    debug=settings.debug,
+    lifespan=lifespan
 )
 
 # Add CORS middleware FIRST (must be added first)
@@ -57,11 +83,14 @@ async def general_exception_handler(request, exc):
 
 # Include routers
 app.include_router(health.router)
+if settings.async_routes:
+    # Registered first so they take precedence over their sync counterparts
+    app.include_router(auth_async.router)
 app.include_router(auth.router)
 app.include_router(properties.router)
-
-logger.info(f"CORS allowed origins: {settings.allowed_origins}")
-logger.info("All routers included")
+app.include_router(valuation.router)
+app.include_router(stats.router)
+app.include_router(simulations.router)
 
 if __name__ == "__main__":
     import uvicorn
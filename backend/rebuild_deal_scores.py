@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Script pour recalculer les scores de rentabilité des biens (top deals)
+
+À utiliser après un import direct en base ou après rebuild_market_stats.py:
+recalcule le score de chaque bien (marge brute en revendant au prix médian
+au m² de sa localisation) à partir de la table properties et des sketches
+de prix au m².
+
+Usage: python rebuild_deal_scores.py
+"""
+
+import sys
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.config import settings
+from app.database import Base
+from app.services.deal_scores import deal_score_service
+
+engine = create_engine(settings.database_url)
+SessionLocal = sessionmaker(bind=engine)
+
+
+def main():
+    """Fonction principale"""
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        scores = deal_score_service.rebuild(db)
+        print(f"\n✅ Scores de rentabilité recalculés: {scores} bien(s)\n")
+    except Exception as e:
+        db.rollback()
+        print(f"\n❌ Erreur: {e}\n")
+        sys.exit(1)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Script pour reconstruire l'index de détection des doublons
+
+À utiliser après un import direct en base ou un changement des paramètres
+MinHash/LSH: recalcule la signature et les buckets LSH de chaque bien à
+partir de la table properties.
+
+Usage: python rebuild_dedup_index.py
+"""
+
+import sys
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.config import settings
+from app.database import Base
+from app.services.dedup import dedup_service
+
+engine = create_engine(settings.database_url)
+SessionLocal = sessionmaker(bind=engine)
+
+
+def main():
+    """Fonction principale"""
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        count = dedup_service.rebuild(db)
+        print(f"\n✅ Index des doublons reconstruit: {count} bien(s)\n")
+    except Exception as e:
+        db.rollback()
+        print(f"\n❌ Erreur: {e}\n")
+        sys.exit(1)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Script pour reconstruire les tables de rollup des facettes
+
+À utiliser après un import direct en base ou si les compteurs ont dérivé:
+recalcule tous les compteurs (localisation, tranches de prix, pièces,
+surface) à partir de la table properties.
+
+Usage: python rebuild_facets.py
+"""
+
+import sys
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.config import settings
+from app.database import Base
+from app.services.facets import facet_service
+
+engine = create_engine(settings.database_url)
+SessionLocal = sessionmaker(bind=engine)
+
+
+def main():
+    """Fonction principale"""
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        rows = facet_service.rebuild(db)
+        print(f"\n✅ Rollups des facettes reconstruits: {rows} ligne(s)\n")
+    except Exception as e:
+        db.rollback()
+        print(f"\n❌ Erreur: {e}\n")
+        sys.exit(1)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
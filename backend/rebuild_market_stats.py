@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Script pour reconstruire les sketches de prix au m² par localisation
+
+À utiliser après un import direct en base ou si les quantiles ont dérivé:
+recalcule toutes les tranches (localisation, tranche logarithmique de prix
+au m²) à partir de la table properties.
+
+Usage: python rebuild_market_stats.py
+"""
+
+import sys
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.config import settings
+from app.database import Base
+from app.services.market_stats import market_stats_service
+
+engine = create_engine(settings.database_url)
+SessionLocal = sessionmaker(bind=engine)
+
+
+def main():
+    """Fonction principale"""
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        bins = market_stats_service.rebuild(db)
+        print(f"\n✅ Sketches de prix au m² reconstruits: {bins} tranche(s)\n")
+    except Exception as e:
+        db.rollback()
+        print(f"\n❌ Erreur: {e}\n")
+        sys.exit(1)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Script pour (re)construire l'index plein texte des propriétés (SQLite FTS5)
+
+Crée la table virtuelle et les triggers s'ils manquent, puis réindexe tous
+les titres et descriptions existants.
+
+Usage: python rebuild_search_index.py
+"""
+
+import sys
+from sqlalchemy import create_engine, text
+from app.config import settings
+from app.services import full_text
+
+engine = create_engine(settings.database_url)
+
+
+def main():
+    """Fonction principale"""
+    if not full_text.uses_fts(engine.dialect.name):
+        print(f"\n⚠️  Base {engine.dialect.name}: pas d'index FTS5, la recherche utilise LIKE\n")
+        return
+
+    try:
+        with engine.begin() as connection:
+            full_text.rebuild_index(connection)
+            count = connection.execute(text("SELECT COUNT(*) FROM properties")).scalar()
+        print(f"\n✅ Index plein texte reconstruit: {count} propriété(s) indexée(s)\n")
+    except Exception as e:
+        print(f"\n❌ Erreur: {e}\n")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""Tests for the cache backends (in-process and shared SQLite store)"""
+import multiprocessing
+
+import pytest
+
+from app.services import auth, cache_backends
+from app.services.cache_backends import CacheBackend, MemoryBackend, SQLiteBackend
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        return MemoryBackend(max_entries=100)
+    return SQLiteBackend(str(tmp_path / "cache.db"), max_bytes=1_000_000)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_backends.time, "monotonic", lambda: now[0])
+    monkeypatch.setattr(cache_backends.time, "time", lambda: now[0])
+    return now
+
+
+def write_from_another_process(path):
+    shared = SQLiteBackend(path, max_bytes=1_000_000)
+    shared.set("listing", b"from child", 60)
+    shared.incr("version:listing")
+
+
+class TestCacheBackend:
+    """Behaviour shared by every backend"""
+
+    def test_set_get_delete(self, backend):
+        backend.set("k", b"value", 60)
+        assert backend.get("k") == b"value"
+
+        backend.delete("k")
+        assert backend.get("k") is None
+
+    def test_ttl(self, backend, clock):
+        backend.set("k", b"value", 5)
+
+        clock[0] += 4
+        assert backend.get("k") == b"value"
+        clock[0] += 1
+        assert backend.get("k") is None
+
+    def test_counters(self, backend):
+        assert backend.counter("version:listing") == 0
+        assert backend.incr("version:listing") == 1
+        assert backend.incr("version:listing") == 2
+        assert backend.counter("version:listing") == 2
+
+    def test_deleted_counter_never_goes_back(self, backend):
+        backend.incr("version:property:1")
+        backend.incr("version:property:1")
+
+        backend.delete_counter("version:property:1")
+
+        assert backend.stats()["counters"] <= 1
+        # Missing counters (deleted or never written) read past every old value
+        assert backend.counter("version:property:1") == 3
+        assert backend.counter("version:property:2") == 3
+        assert backend.incr("version:property:2") == 4
+        # Deleting a counter never written still hides entries under the floor
+        backend.delete_counter("version:property:3")
+        assert backend.counter("version:property:3") == 4
+
+    def test_clear(self, backend):
+        backend.set("k", b"value", 60)
+        backend.incr("version:listing")
+
+        backend.clear()
+
+        assert backend.get("k") is None
+        assert backend.counter("version:listing") == 0
+
+    def test_incomplete_backend_cannot_be_created(self):
+        class NoCounters(CacheBackend):
+            def get(self, key):
+                return None
+
+        with pytest.raises(TypeError):
+            NoCounters()
+
+
+class TestMemoryBackend:
+    """Entry-count bound of the in-process backend"""
+
+    def test_lru_eviction(self):
+        backend = MemoryBackend(max_entries=2)
+        backend.set("a", b"1", 60)
+        backend.set("b", b"2", 60)
+        backend.get("a")
+        backend.set("c", b"3", 60)
+
+        assert backend.get("b") is None
+        assert backend.get("a") == b"1"
+        assert backend.stats()["evictions"] == 1
+
+
+class TestSQLiteBackend:
+    """Size bound and sharing of the on-disk backend"""
+
+    def test_size_bounded_lru_eviction(self, tmp_path, clock):
+        backend = SQLiteBackend(str(tmp_path / "cache.db"), max_bytes=350)
+        for i in range(3):
+            backend.set(f"k{i}", bytes(100), 60)
+            clock[0] += 2
+        backend.get("k0")
+        clock[0] += 2
+        backend.set("k3", bytes(100), 60)
+
+        assert backend.get("k1") is None
+        assert all(backend.get(key) is not None for key in ("k0", "k2", "k3"))
+        assert backend.stats()["bytes"] == 300
+        assert backend.stats()["evictions"] == 1
+
+    def test_replacing_a_key_keeps_the_size_total(self, tmp_path):
+        backend = SQLiteBackend(str(tmp_path / "cache.db"), max_bytes=1000)
+        backend.set("k", bytes(300), 60)
+        backend.set("k", bytes(100), 60)
+
+        assert backend.stats()["bytes"] == 100
+
+    def test_shared_between_processes(self, tmp_path):
+        path = str(tmp_path / "cache.db")
+        backend = SQLiteBackend(path, max_bytes=1_000_000)
+
+        process = multiprocessing.get_context("spawn").Process(target=write_from_another_process, args=(path,))
+        process.start()
+        process.join(30)
+
+        assert process.exitcode == 0
+        assert backend.get("listing") == b"from child"
+        assert backend.counter("version:listing") == 1
+
+
+class TestTokenCache:
+    """Verified tokens are served from the cache backend"""
+
+    def test_second_verification_skips_decoding(self, monkeypatch):
+        token = auth.auth_service.create_access_token({"sub": "cached-user", "jti": "first"})
+        calls = []
+        decode = auth.jwt.decode
+        monkeypatch.setattr(auth.jwt, "decode", lambda *args, **kwargs: calls.append(1) or decode(*args, **kwargs))
+
+        first = auth.auth_service.verify_token(token)
+        second = auth.auth_service.verify_token(token)
+
+        assert first == second and first["sub"] == "cached-user"
+        assert len(calls) == 1
+
+    def test_invalid_tokens_are_not_cached(self):
+        token = auth.auth_service.create_access_token({"sub": "cached-user"})
+
+        assert auth.auth_service.verify_token(token + "x") is None
+        assert auth.auth_service.verify_token(token + "x") is None
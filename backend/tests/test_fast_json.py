@@ -0,0 +1,59 @@
+"""Tests for the one-step JSON encoders used by the read routes"""
+from typing import List, Optional
+
+from pydantic import TypeAdapter
+from conftest import client, db
+
+from app.models import Property
+from app.schemas import PropertyResponse, UserResponse
+from app.services import projection
+from app.services.fast_json import RowEncoder
+
+LISTINGS = [
+    {"title": "Studio à Lyon", "description": None, "price": 120000, "location": "Lyon",
+     "area": 25, "latitude": 45.76, "longitude": 4.83},
+    {"title": "T3", "description": "Balcon, parking", "price": 320000, "location": "Paris",
+     "rooms": 3, "bathrooms": 1, "area": 65},
+]
+
+
+class TestRowEncoder:
+    """The fast path must produce the bytes the validated path produces"""
+
+    def test_matches_validated_serialization(self, client, db):
+        for listing in LISTINGS:
+            assert client.post("/api/properties/", json=listing).status_code == 201
+        entities = db.query(Property).order_by(Property.id).all()
+        adapter = TypeAdapter(List[Optional[PropertyResponse]])
+        expected = adapter.dump_json(adapter.validate_python([*entities, None], from_attributes=True))
+
+        fields = list(projection.PROPERTY_FIELDS)
+        rows = projection.project(db.query(Property).order_by(Property.id), fields).all()
+
+        assert projection.dump_rows([*rows, None], fields) == expected
+        assert RowEncoder.for_model(PropertyResponse).dumps_many([*entities, None]) == expected
+
+    def test_listing_route_matches_schema(self, client):
+        for listing in LISTINGS:
+            client.post("/api/properties/", json=listing)
+
+        data = client.get("/api/properties/").json()
+
+        assert [list(item) for item in data] == [list(PropertyResponse.model_fields)] * 2
+        assert data[0]["title"] == "Studio à Lyon" and data[0]["description"] is None
+
+    def test_single_field(self):
+        class Row:
+            id = 7
+
+        assert RowEncoder(["id"]).dumps(Row()) == b'{"id":7}'
+
+    def test_user_routes(self, client):
+        response = client.post(
+            "/api/auth/register",
+            json={"username": "fastjson", "email": "fast@example.com", "password": "Secret123!"}
+        )
+
+        assert response.status_code == 201
+        assert list(response.json()) == list(UserResponse.model_fields)
+        assert "hashed_password" not in response.text
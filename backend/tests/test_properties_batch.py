@@ -0,0 +1,89 @@
+"""Tests for batch lookup by id (GET ?ids= and POST /batch)"""
+import pytest
+from sqlalchemy import event
+from conftest import client, db, engine
+
+from app.routes.properties import MAX_BATCH_IDS
+
+
+@pytest.fixture
+def property_ids(client):
+    ids = []
+    for i, price in enumerate([100000, 200000, 300000]):
+        response = client.post(
+            "/api/properties/",
+            json={"title": f"Bien {i}", "price": price, "location": "Lyon"}
+        )
+        assert response.status_code == 201
+        ids.append(response.json()["id"])
+    return ids
+
+
+class TestBatchLookup:
+    """Test fetching many properties by id"""
+
+    def test_request_order_is_kept(self, client, property_ids):
+        first, second, third = property_ids
+        response = client.get("/api/properties/", params={"ids": f"{third},{first},{second}"})
+
+        assert response.status_code == 200
+        assert [item["id"] for item in response.json()] == [third, first, second]
+
+    def test_duplicates_and_missing_ids(self, client, property_ids):
+        first = property_ids[0]
+        data = client.get("/api/properties/", params={"ids": f"{first},999999,{first}"}).json()
+
+        assert data[1] is None
+        assert data[0]["id"] == data[2]["id"] == first
+
+    def test_single_query(self, client, property_ids):
+        statements = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", capture)
+        try:
+            client.get("/api/properties/", params={"ids": ",".join(map(str, property_ids))})
+        finally:
+            event.remove(engine, "before_cursor_execute", capture)
+
+        selects = [
+            s for s in statements
+            if s.lstrip().upper().startswith("SELECT") and "table_versions" not in s
+        ]
+        assert len(selects) == 1
+        assert " IN " in selects[0]
+
+    def test_ignores_filters_and_pagination(self, client, property_ids):
+        data = client.get(
+            "/api/properties/",
+            params={"ids": ",".join(map(str, property_ids)), "price_min": 250000, "limit": 1}
+        ).json()
+
+        assert len(data) == 3
+
+    def test_with_fields(self, client, property_ids):
+        first = property_ids[0]
+        data = client.get("/api/properties/", params={"ids": f"{first},999999", "fields": "price"}).json()
+
+        assert data == [{"price": 100000}, None]
+
+    def test_post_batch(self, client, property_ids):
+        first, second, _ = property_ids
+        response = client.post("/api/properties/batch", json={"ids": [second, 999999, first]})
+
+        assert response.status_code == 200
+        data = response.json()
+        assert [item and item["id"] for item in data] == [second, None, first]
+
+    @pytest.mark.parametrize("ids", ["", "1,abc", ",".join(["1"] * (MAX_BATCH_IDS + 1))])
+    def test_invalid_ids(self, client, ids):
+        response = client.get("/api/properties/", params={"ids": ids})
+
+        assert response.status_code == 400
+
+    def test_post_batch_limit(self, client):
+        response = client.post("/api/properties/batch", json={"ids": list(range(MAX_BATCH_IDS + 1))})
+
+        assert response.status_code == 400
@@ -0,0 +1,162 @@
+"""Tests for POST /api/properties/bulk"""
+import asyncio
+import json
+
+import pytest
+from conftest import client, db
+from app.config import settings
+from app.models import Property
+from app.services import bulk_import
+
+NDJSON = {"Content-Type": "application/x-ndjson"}
+CSV = {"Content-Type": "text/csv"}
+
+
+def ndjson(rows):
+    return "\n".join(json.dumps(row) if isinstance(row, dict) else row for row in rows) + "\n"
+
+
+def listing(idx, **extra):
+    return {"title": f"Bien {idx}", "price": 100000 + idx, "location": "Paris", **extra}
+
+
+class TestBulkImport:
+    """Test bulk ingestion"""
+
+    def test_ndjson_in_batches(self, client, db):
+        body = ndjson([listing(i) for i in range(25)])
+
+        response = client.post("/api/properties/bulk", params={"batch_size": 10}, content=body, headers=NDJSON)
+
+        assert response.status_code == 200
+        assert response.json() == {
+            "inserted": 25, "failed": 0, "batches": 3, "errors": [], "duplicates": [],
+            "errors_omitted": 0, "duplicates_omitted": 0,
+        }
+        assert db.query(Property).count() == 25
+
+    def test_csv_with_quoted_multiline_field(self, client, db):
+        body = (
+            "title,description,price,location,rooms,latitude,longitude\r\n"
+            'T2,"Lumineux,\nrefait à neuf",210000,Lyon,2,45.76,4.83\r\n'
+            "Studio,,99000,Paris,,,\r\n"
+        )
+
+        response = client.post("/api/properties/bulk", content=body.encode("utf-8"), headers=CSV)
+
+        assert response.json()["inserted"] == 2
+        t2 = db.query(Property).filter(Property.title == "T2").one()
+        assert t2.description == "Lumineux,\nrefait à neuf"
+        assert t2.rooms == 2
+        assert t2.geo_cell is not None
+        studio = db.query(Property).filter(Property.title == "Studio").one()
+        assert studio.description is None and studio.rooms is None
+
+    def test_per_row_error_report(self, client, db):
+        body = ndjson([
+            listing(1),
+            {"title": "Sans prix", "location": "Paris"},
+            "{not json",
+            listing(2, price="cher"),
+            "[1, 2]",
+            listing(3),
+        ])
+
+        report = client.post("/api/properties/bulk", content=body, headers=NDJSON).json()
+
+        assert report["inserted"] == 2
+        assert report["failed"] == 4
+        assert [e["row"] for e in report["errors"]] == [2, 3, 4, 5]
+        assert "price" in report["errors"][0]["errors"][0]
+        assert report["errors"][1]["errors"][0].startswith("Invalid JSON")
+
+    def test_failed_batch_does_not_roll_back_good_batches(self, client, db, monkeypatch):
+        original = bulk_import.insert_batch
+        calls = []
+
+        def flaky_insert(session, rows):
+            calls.append(len(rows))
+            if len(calls) == 2:
+                raise RuntimeError("disk full")
+            return original(session, rows)
+
+        monkeypatch.setattr(bulk_import, "insert_batch", flaky_insert)
+        body = ndjson([listing(i) for i in range(9)])
+
+        report = client.post("/api/properties/bulk", params={"batch_size": 3}, content=body, headers=NDJSON).json()
+
+        assert report["inserted"] == 6
+        assert report["failed"] == 3
+        assert [e["row"] for e in report["errors"]] == [4, 5, 6]
+        assert db.query(Property).count() == 6
+
+    def test_imported_rows_are_searchable_and_counted(self, client, db):
+        body = ndjson([listing(1, description="terrasse"), listing(2, rooms=3)])
+        client.post("/api/properties/bulk", content=body, headers=NDJSON)
+
+        assert [p["title"] for p in client.get("/api/properties/", params={"q": "terrasse"}).json()] == ["Bien 1"]
+        facets = client.get("/api/properties/facets").json()
+        assert facets["source"] == "rollup" and facets["total"] == 2
+
+    def test_unsupported_content_type(self, client):
+        response = client.post("/api/properties/bulk", content="<xml/>", headers={"Content-Type": "application/xml"})
+
+        assert response.status_code == 415
+
+    def test_csv_column_mismatch(self, client, db):
+        body = "title,price,location\nA,1\nB,2,Paris\n"
+
+        report = client.post("/api/properties/bulk", content=body, headers=CSV).json()
+
+        assert report["inserted"] == 1
+        assert report["errors"] == [{"row": 1, "errors": ["Expected 3 columns, got 2"]}]
+
+    def test_rows_that_are_not_utf8(self, client, db):
+        body = ndjson([listing(1)]).encode() + b'{"title": "\xe9t\xe9"}\n' + ndjson([listing(2)]).encode()
+        csv_body = "title,price,location\nA,1,Paris\n".encode() + b"\xff,2,Lyon\nB,3,Nice\n"
+
+        report = client.post("/api/properties/bulk", content=body, headers=NDJSON).json()
+        csv_report = client.post("/api/properties/bulk", content=csv_body, headers=CSV).json()
+
+        assert report["inserted"] == 2
+        assert [e["row"] for e in report["errors"]] == [2]
+        assert report["errors"][0]["errors"][0].startswith("Invalid UTF-8")
+        assert csv_report["inserted"] == 2
+        assert [e["row"] for e in csv_report["errors"]] == [2]
+
+    def test_csv_header_that_is_not_utf8(self, client, db):
+        response = client.post("/api/properties/bulk", content=b"titre,prix,lieu\xe9\nA,1,Paris\n", headers=CSV)
+
+        assert response.status_code == 400
+        assert db.query(Property).count() == 0
+
+    def test_report_is_capped(self, client, db, monkeypatch):
+        monkeypatch.setattr(settings, "bulk_max_reported_rows", 2)
+        body = ndjson(["{not json"] * 5 + [listing(1)])
+
+        report = client.post("/api/properties/bulk", content=body, headers=NDJSON).json()
+
+        assert report["failed"] == 5
+        assert [e["row"] for e in report["errors"]] == [1, 2]
+        assert report["errors_omitted"] == 3
+        assert report["inserted"] == 1
+
+
+class TestIterLines:
+    """Test the streamed line splitter"""
+
+    @staticmethod
+    def lines(chunks):
+        async def stream():
+            for chunk in chunks:
+                yield chunk
+
+        async def collect():
+            return [line async for line in bulk_import.iter_lines(stream())]
+
+        return asyncio.run(collect())
+
+    def test_lines_across_chunks(self):
+        assert self.lines([b"ab", b"c\r\nd", b"e\n\nf", b"", b"g"]) == [b"abc", b"de", b"", b"fg"]
+        assert self.lines([b"a\n", b"b\n"]) == [b"a", b"b"]
+        assert self.lines([]) == []
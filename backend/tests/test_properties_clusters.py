@@ -0,0 +1,135 @@
+"""Tests for GET /api/properties/clusters"""
+import numpy as np
+import pytest
+from conftest import client, db
+from app.models import Property
+from app.services import clusters, http_cache
+
+FRANCE = "-5,41,10,52"
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    """The cluster cache is process-wide; start every test cold"""
+    clusters.cluster_cache.clear()
+    yield
+    clusters.cluster_cache.clear()
+
+
+def create(client, lat, lon, price, title="Bien"):
+    response = client.post(
+        "/api/properties/",
+        json={"title": title, "price": price, "location": "X", "latitude": lat, "longitude": lon}
+    )
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+def get_clusters(client, bbox=FRANCE, zoom=6):
+    response = client.get("/api/properties/clusters", params={"bbox": bbox, "zoom": zoom})
+    assert response.status_code == 200
+    return response.json()["clusters"]
+
+
+class TestClusterEndpoint:
+    """Test the clustering endpoint"""
+
+    def test_groups_nearby_points(self, client):
+        create(client, 48.85, 2.35, 100)
+        create(client, 48.86, 2.34, 300)
+        create(client, 48.87, 2.36, 200)
+        create(client, 45.76, 4.83, 50)
+
+        result = sorted(get_clusters(client), key=lambda c: -c["count"])
+
+        assert [c["count"] for c in result] == [3, 1]
+        paris = result[0]
+        assert paris["latitude"] == pytest.approx(48.86)
+        assert (paris["price_min"], paris["price_median"], paris["price_max"]) == (100, 200, 300)
+
+    def test_even_count_median(self, client):
+        for price in (100, 200, 300, 1000):
+            create(client, 48.85, 2.35, price)
+
+        [cluster] = get_clusters(client)
+
+        assert cluster["price_median"] == 250
+
+    def test_points_outside_bbox_are_ignored(self, client):
+        create(client, 48.85, 2.35, 100)
+        create(client, 40.71, -74.0, 100)
+
+        assert sum(c["count"] for c in get_clusters(client)) == 1
+
+    def test_points_without_coordinates_are_ignored(self, client):
+        client.post("/api/properties/", json={"title": "X", "price": 1, "location": "X"})
+
+        assert get_clusters(client) == []
+
+    def test_cache_is_invalidated_on_write(self, client):
+        property_id = create(client, 48.85, 2.35, 100)
+        assert get_clusters(client)[0]["count"] == 1
+
+        create(client, 48.851, 2.351, 200)
+        assert get_clusters(client)[0]["count"] == 2
+
+        client.put(f"/api/properties/{property_id}", json={"price": 900})
+        assert get_clusters(client)[0]["price_max"] == 900
+
+        client.delete(f"/api/properties/{property_id}")
+        assert get_clusters(client)[0]["count"] == 1
+
+    def test_cached_tiles_are_reused(self, client):
+        create(client, 48.85, 2.35, 100)
+        get_clusters(client)
+
+        key = clusters.tile_for_point(48.85, 2.35, 6)
+        assert clusters.cluster_cache.get(key) is not None
+
+    def test_in_process_writes_keep_other_tiles(self, client):
+        create(client, 48.85, 2.35, 100)
+        get_clusters(client)
+
+        create(client, 44.84, -0.58, 50)
+
+        assert clusters.cluster_cache.get(clusters.tile_for_point(48.85, 2.35, 6)) is not None
+
+    def test_write_from_another_process_drops_the_cache(self, client, db):
+        create(client, 48.85, 2.35, 100)
+        assert get_clusters(client)[0]["count"] == 1
+
+        # Another worker: committed and versioned, but not published here
+        db.add(Property(title="Autre", price=200, location="X", latitude=48.851, longitude=2.351))
+        http_cache.bump_version(db)
+        db.commit()
+
+        assert get_clusters(client)[0]["count"] == 2
+
+    def test_invalid_parameters(self, client):
+        assert client.get("/api/properties/clusters", params={"bbox": "1,2,3", "zoom": 3}).status_code == 400
+        assert client.get("/api/properties/clusters", params={"bbox": "10,41,-5,52", "zoom": 3}).status_code == 400
+        assert client.get("/api/properties/clusters", params={"bbox": FRANCE, "zoom": 99}).status_code == 422
+        assert client.get("/api/properties/clusters", params={"bbox": "-180,-90,180,90", "zoom": 12}).status_code == 400
+
+
+class TestBuildClusters:
+    """Test the vectorized aggregation directly"""
+
+    def test_matches_naive_grouping(self):
+        rng = np.random.default_rng(0)
+        lats = rng.uniform(43, 49, 5000)
+        lons = rng.uniform(-1, 7, 5000)
+        prices = rng.integers(50_000, 900_000, 5000).astype(np.float64)
+
+        tiles = clusters.build_clusters(lats, lons, prices, 5)
+
+        size = clusters.tile_degrees(5) / clusters.CELLS_PER_TILE
+        groups = {}
+        for lat, lon, price in zip(lats, lons, prices):
+            groups.setdefault((int((lon + 180) // size), int((lat + 90) // size)), []).append(price)
+        result = [c for cells in tiles.values() for c in cells]
+        assert sum(c["count"] for c in result) == 5000
+        assert len(result) == len(groups)
+        assert sorted(c["price_median"] for c in result) == pytest.approx(
+            sorted(float(np.median(g)) for g in groups.values())
+        )
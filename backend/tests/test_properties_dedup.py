@@ -0,0 +1,177 @@
+"""Tests for near-duplicate detection (MinHash/LSH) on ingest and over the catalog"""
+import json
+
+import numpy as np
+import pytest
+from sqlalchemy import insert
+from conftest import client, db, foreign_keys
+
+from app.models import Property, PropertyLshBucket, PropertySignature
+from app.services import dedup
+from app.services.dedup import dedup_service
+
+NDJSON = {"Content-Type": "application/x-ndjson"}
+
+AGENCY_A = {
+    "title": "Bel appartement T3 lumineux",
+    "description": "Proche métro, balcon, parking, 3e étage avec ascenseur",
+    "price": 250000, "location": "Lyon", "area": 65,
+}
+AGENCY_B = {
+    "title": "Appartement T3 très lumineux",
+    "description": "proche metro, balcon et parking. 3eme etage, ascenseur",
+    "price": 249000, "location": "Lyon", "area": 65,
+}
+OTHER = {
+    "title": "Maison 5 pièces avec jardin",
+    "description": "Quartier calme, garage double, cuisine équipée",
+    "price": 450000, "location": "Lyon", "area": 120,
+}
+
+
+class TestFingerprint:
+    """Test the MinHash signatures"""
+
+    def test_same_listing_from_two_agencies_matches(self):
+        assert dedup.is_duplicate(dedup.fingerprint(AGENCY_A), dedup.fingerprint(AGENCY_B))
+        assert not dedup.is_duplicate(dedup.fingerprint(AGENCY_A), dedup.fingerprint(OTHER))
+
+    def test_price_outside_tolerance_does_not_match(self):
+        cheaper = {**AGENCY_B, "price": 200000}
+
+        assert not dedup.is_duplicate(dedup.fingerprint(AGENCY_A), dedup.fingerprint(cheaper))
+
+    def test_signatures_are_stable(self):
+        first = dedup.fingerprint(AGENCY_A)
+
+        assert first.signature.dtype.str == "<u4" and len(first.signature) == dedup.NUM_PERM
+        assert first.buckets == dedup.fingerprint(dict(AGENCY_A)).buckets
+        assert dedup.normalize("  Étage,  3ÈME!") == "etage 3eme"
+
+
+class TestIngest:
+    """Duplicate handling on POST / and POST /bulk"""
+
+    def test_flag_reports_the_match_in_a_header(self, client):
+        first = client.post("/api/properties/", json=AGENCY_A).json()["id"]
+
+        response = client.post("/api/properties/", params={"on_duplicate": "flag"}, json=AGENCY_B)
+
+        assert response.status_code == 201
+        assert response.headers["X-Duplicate-Of"] == str(first)
+
+    def test_reject_answers_conflict(self, client, db):
+        first = client.post("/api/properties/", json=AGENCY_A).json()["id"]
+
+        response = client.post("/api/properties/", params={"on_duplicate": "reject"}, json=AGENCY_B)
+
+        assert response.status_code == 409
+        assert response.headers["X-Duplicate-Of"] == str(first)
+        assert db.query(Property).count() == 1
+        assert client.post("/api/properties/", params={"on_duplicate": "reject"}, json=OTHER).status_code == 201
+
+    def test_allow_skips_the_check(self, client):
+        client.post("/api/properties/", json=AGENCY_A)
+
+        response = client.post("/api/properties/", json=AGENCY_B)
+
+        assert response.status_code == 201 and "X-Duplicate-Of" not in response.headers
+
+    def test_invalid_action(self, client):
+        assert client.post("/api/properties/", params={"on_duplicate": "merge"}, json=OTHER).status_code == 400
+
+    def test_bulk_reject_within_batch_and_against_catalog(self, client, db):
+        existing = client.post("/api/properties/", json=OTHER).json()["id"]
+        body = "\n".join(json.dumps(row) for row in [AGENCY_A, {**OTHER, "price": 452000}, AGENCY_B]) + "\n"
+
+        report = client.post(
+            "/api/properties/bulk", params={"on_duplicate": "reject"}, content=body, headers=NDJSON
+        ).json()
+
+        assert report["inserted"] == 1 and report["failed"] == 2
+        assert report["errors"] == [
+            {"row": 2, "errors": [f"Duplicate of property {existing}"]},
+            {"row": 3, "errors": ["Duplicate of row 1"]},
+        ]
+
+    def test_bulk_flag_lists_matching_ids(self, client, db):
+        body = "\n".join(json.dumps(row) for row in [AGENCY_A, AGENCY_B]) + "\n"
+
+        report = client.post(
+            "/api/properties/bulk", params={"on_duplicate": "flag"}, content=body, headers=NDJSON
+        ).json()
+
+        first = db.query(Property.id).filter(Property.title == AGENCY_A["title"]).scalar()
+        assert report["inserted"] == 2
+        assert report["duplicates"] == [{"row": 2, "duplicate_of": [first]}]
+
+
+class TestIndexMaintenance:
+    """The LSH index follows updates and deletes"""
+
+    def test_update_reindexes_and_delete_removes(self, client, db):
+        first = client.post("/api/properties/", json=AGENCY_A).json()["id"]
+        second = client.post("/api/properties/", json=OTHER).json()["id"]
+
+        client.patch(f"/api/properties/{second}", json=AGENCY_B)
+        assert client.get("/api/properties/duplicates").json()["clusters"] == [{"ids": [first, second]}]
+
+        client.delete(f"/api/properties/{second}")
+        assert db.query(PropertySignature).count() == 1
+        assert db.query(PropertyLshBucket).filter(PropertyLshBucket.property_id == second).count() == 0
+        assert client.get("/api/properties/duplicates").json()["clusters"] == []
+
+    def test_delete_with_enforced_foreign_keys(self, client, db, foreign_keys):
+        db.execute(insert(Property), [AGENCY_A, OTHER])
+        db.commit()
+        dedup_service.ensure_built(db)
+
+        assert client.delete("/api/properties/1").status_code == 204
+        assert db.query(PropertySignature.property_id).all() == [(2,)]
+
+    def test_rebuild_from_existing_properties(self, db):
+        db.execute(insert(Property), [AGENCY_A, AGENCY_B, OTHER])
+        db.commit()
+
+        assert dedup_service.ensure_built(db)
+        assert not dedup_service.ensure_built(db)
+        assert dedup_service.clusters(db)["clusters"] == [{"ids": [1, 2]}]
+
+
+class TestClusters:
+    """Test GET /duplicates"""
+
+    def test_clusters_join_through_shared_members(self, client):
+        ids = [client.post("/api/properties/", json=row).json()["id"] for row in (AGENCY_A, OTHER, AGENCY_B)]
+        client.post("/api/properties/", json={**AGENCY_B, "title": "Appartement T3 lumineux, ascenseur"})
+
+        data = client.get("/api/properties/duplicates").json()
+
+        assert data["candidate_pairs"] >= 3
+        assert data["clusters"] == [{"ids": [ids[0], ids[2], 4]}]
+
+    def test_all_members_of_a_bucket_are_compared(self, db):
+        # 2 and 3 are duplicates; 1 shares their only bucket but matches neither
+        signature = np.arange(dedup.NUM_PERM, dtype="<u4")
+        db.execute(insert(PropertySignature), [
+            {"property_id": 1, "signature": (signature + 1000).tobytes(), "price": 250000, "area": 65},
+            {"property_id": 2, "signature": signature.tobytes(), "price": 250000, "area": 65},
+            {"property_id": 3, "signature": signature.tobytes(), "price": 251000, "area": 65},
+        ])
+        db.execute(insert(PropertyLshBucket), [{"bucket": 7, "property_id": i} for i in (1, 2, 3)])
+        db.commit()
+
+        data = dedup_service.clusters(db)
+
+        assert data["candidate_pairs"] == 3
+        assert data["clusters"] == [{"ids": [2, 3]}]
+
+    def test_crowded_buckets_chain_consecutive_members(self, monkeypatch):
+        monkeypatch.setattr(dedup, "MAX_BUCKET_PAIRING", 2)
+        rows = np.array([[1, 5], [1, 6], [2, 4], [2, 5], [2, 9]])
+
+        assert dedup.bucket_pairs(rows).tolist() == [[4, 5], [5, 6], [5, 9]]
+
+    @pytest.mark.parametrize("params", [{"threshold": 0}, {"threshold": 1.5}, {"min_size": 1}])
+    def test_invalid_parameters(self, client, params):
+        assert client.get("/api/properties/duplicates", params=params).status_code == 422
@@ -0,0 +1,71 @@
+"""Tests for GET /api/properties/export"""
+import csv
+import io
+import json
+
+import pytest
+from conftest import client, db
+from app.models import Property
+from app.services import export
+
+
+@pytest.fixture
+def listings(client):
+    for idx in range(7):
+        response = client.post(
+            "/api/properties/",
+            json={"title": f"Bien {idx}", "description": "Séjour, balcon", "price": 100000 + idx,
+                  "location": "Paris" if idx % 2 else "Lyon", "rooms": idx}
+        )
+        assert response.status_code == 201
+
+
+class TestExport:
+    """Test the streaming export"""
+
+    def test_ndjson(self, client, listings):
+        response = client.get("/api/properties/export")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        assert [r["title"] for r in rows] == [f"Bien {i}" for i in range(7)]
+        assert rows[0]["description"] == "Séjour, balcon"
+        assert "created_at" in rows[0]
+
+    def test_csv(self, client, listings):
+        response = client.get("/api/properties/export", params={"format": "csv", "fields": "id,title,rooms"})
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/csv")
+        assert "attachment" in response.headers["content-disposition"]
+        rows = list(csv.DictReader(io.StringIO(response.text)))
+        assert len(rows) == 7
+        assert set(rows[0]) == {"id", "title", "rooms"}
+        assert rows[3]["rooms"] == "3"
+
+    def test_filters_apply(self, client, listings):
+        response = client.get("/api/properties/export", params={"location": "Paris", "rooms_min": 3})
+
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        assert [r["title"] for r in rows] == ["Bien 3", "Bien 5"]
+
+    def test_text_search_applies(self, client, listings):
+        client.post("/api/properties/", json={"title": "Loft", "description": "verrière", "price": 1, "location": "X"})
+
+        response = client.get("/api/properties/export", params={"q": "verriere", "fields": "title"})
+
+        assert response.text.splitlines() == ['{"title": "Loft"}']
+
+    def test_invalid_format(self, client):
+        assert client.get("/api/properties/export", params={"format": "xml"}).status_code == 400
+
+    def test_streams_in_batches(self, db, listings, monkeypatch):
+        """Test that the generators emit one chunk per batch instead of one blob"""
+        monkeypatch.setattr(export, "EXPORT_BATCH_SIZE", 3)
+
+        ndjson_chunks = list(export.stream_ndjson(db.query(Property), ["id"]))
+        csv_chunks = list(export.stream_csv(db.query(Property), ["id"]))
+
+        assert [chunk.count(b"\n") for chunk in ndjson_chunks] == [3, 3, 1]
+        assert len(csv_chunks) == 3
@@ -0,0 +1,125 @@
+"""Tests for GET /api/properties/facets and the rollup tables"""
+import pytest
+from conftest import client, db
+from app.models import PropertyFacetRollup
+from app.services.facets import PRICE_BUCKETS, ROOMS_BUCKETS, facet_service
+
+LISTINGS = [
+    {"title": "Studio", "description": "balcon", "price": 90000, "location": "Lyon", "rooms": 1, "bathrooms": 1, "area": 20},
+    {"title": "T2", "price": 150000, "location": "Lyon", "rooms": 2, "bathrooms": 1, "area": 45},
+    {"title": "T3", "description": "balcon", "price": 320000, "location": "Paris", "rooms": 3, "bathrooms": 1, "area": 65},
+    {"title": "T4", "price": 450000, "location": "Paris", "rooms": 4, "bathrooms": 2, "area": 90},
+    {"title": "Maison", "price": 1200000, "location": "Nantes", "rooms": 7, "bathrooms": 3, "area": 210},
+    {"title": "Terrain", "price": 50000, "location": "Nantes"},
+]
+
+
+@pytest.fixture
+def listings(client):
+    ids = {}
+    for listing in LISTINGS:
+        response = client.post("/api/properties/", json=listing)
+        assert response.status_code == 201
+        ids[listing["title"]] = response.json()["id"]
+    return ids
+
+
+def facets(client, **params):
+    response = client.get("/api/properties/facets", params=params)
+    assert response.status_code == 200
+    return response.json()
+
+
+def as_dict(counts):
+    return {c["value"]: c["count"] for c in counts}
+
+
+class TestFacetEndpoint:
+    """Test the facet counts"""
+
+    def test_unfiltered_counts(self, client, listings):
+        data = facets(client)
+
+        assert data["source"] == "rollup"
+        assert data["total"] == 6
+        assert as_dict(data["location"]) == {"Lyon": 2, "Nantes": 2, "Paris": 2}
+        assert as_dict(data["rooms"]) == {"unknown": 1, "1": 1, "2": 1, "3": 1, "4": 1, "5+": 1}
+        assert as_dict(data["price"]) == {
+            "0-100000": 2, "100000-200000": 1, "300000-400000": 1,
+            "400000-500000": 1, "1000000+": 1,
+        }
+        assert as_dict(data["area"])["200+"] == 1
+
+    def test_aligned_filters_use_rollups(self, client, listings):
+        data = facets(client, location=["Paris", "Lyon"], price_min=100000, rooms_min=2)
+
+        assert data["source"] == "rollup"
+        assert data["total"] == 3
+        assert as_dict(data["location"]) == {"Lyon": 1, "Paris": 2}
+
+    def test_unaligned_filters_fall_back_to_live(self, client, listings):
+        data = facets(client, price_min=120000, price_max=400000)
+
+        assert data["source"] == "live"
+        assert data["total"] == 2
+
+    def test_live_filters_match_listing(self, client, listings):
+        params = {"bathrooms": 1, "q": "balcon"}
+        listed = client.get("/api/properties/", params=params).json()
+
+        data = facets(client, **params)
+
+        assert data["source"] == "live"
+        assert data["total"] == len(listed) == 2
+
+    def test_rollups_follow_writes(self, client, listings):
+        client.put(f"/api/properties/{listings['T2']}", json={"location": "Paris", "rooms": 3})
+        client.delete(f"/api/properties/{listings['Studio']}")
+        client.post("/api/properties/", json={"title": "T5", "price": 600000, "location": "Lyon", "rooms": 5})
+
+        data = facets(client)
+
+        assert as_dict(data["location"]) == {"Lyon": 1, "Nantes": 2, "Paris": 3}
+        assert as_dict(data["rooms"]) == {"unknown": 1, "3": 2, "4": 1, "5+": 2}
+
+    def test_rebuild_matches_incremental(self, client, db, listings):
+        client.put(f"/api/properties/{listings['T4']}", json={"price": 95000, "area": 30})
+        client.delete(f"/api/properties/{listings['Maison']}")
+        incremental = facets(client)
+
+        db.query(PropertyFacetRollup).delete()
+        db.commit()
+        assert facets(client)["total"] == 0
+
+        facet_service.rebuild(db)
+
+        assert facets(client) == incremental
+
+    def test_ensure_built(self, client, db, listings):
+        db.query(PropertyFacetRollup).delete()
+        db.commit()
+
+        assert facet_service.ensure_built(db) is True
+        assert facets(client)["total"] == 6
+        assert facet_service.ensure_built(db) is False
+
+
+class TestBuckets:
+    """Test bucket classification used to decide if rollups can answer"""
+
+    def test_index(self):
+        assert PRICE_BUCKETS.index(None) == -1
+        assert PRICE_BUCKETS.index(-5) == 0
+        assert PRICE_BUCKETS.index(100000) == 1
+        assert ROOMS_BUCKETS.index(9) == 5
+
+    def test_classify(self):
+        assert PRICE_BUCKETS.classify(2, 200000, None, None) is True
+        assert PRICE_BUCKETS.classify(1, 200000, None, None) is False
+        assert PRICE_BUCKETS.classify(1, 150000, None, None) is None
+        assert PRICE_BUCKETS.classify(7, None, 2000000, None) is None
+        assert PRICE_BUCKETS.classify(-1, 0, None, None) is False
+        assert ROOMS_BUCKETS.classify(3, None, None, [3, 4]) is True
+        assert ROOMS_BUCKETS.classify(5, None, None, [3, 4]) is False
+        assert ROOMS_BUCKETS.classify(5, None, None, [6]) is None
+        assert ROOMS_BUCKETS.classify(5, 5, None, None) is True
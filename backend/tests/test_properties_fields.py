@@ -0,0 +1,100 @@
+"""Tests for sparse fieldsets (?fields=) on GET /api/properties"""
+import pytest
+from sqlalchemy import event
+from conftest import client, db, engine
+
+LISTINGS = [
+    {"title": "Studio", "description": "x" * 900, "price": 120000, "location": "Lyon", "area": 25,
+     "latitude": 45.76, "longitude": 4.83},
+    {"title": "T3", "description": "y" * 900, "price": 320000, "location": "Paris", "area": 65,
+     "latitude": 48.85, "longitude": 2.35},
+    {"title": "T4", "description": "z" * 900, "price": 450000, "location": "Paris", "area": 90,
+     "latitude": 48.86, "longitude": 2.34},
+]
+
+
+@pytest.fixture
+def listings(client):
+    for listing in LISTINGS:
+        assert client.post("/api/properties/", json=listing).status_code == 201
+
+
+class TestSparseFieldsets:
+    """Test the fields parameter"""
+
+    def test_only_requested_keys(self, client, listings):
+        response = client.get("/api/properties/", params={"fields": "id,title,price"})
+
+        assert response.status_code == 200
+        data = response.json()
+        assert [set(item) for item in data] == [{"id", "title", "price"}] * 3
+        assert [item["price"] for item in data] == [120000, 320000, 450000]
+
+    def test_datetimes_are_serialized(self, client, listings):
+        data = client.get("/api/properties/", params={"fields": "created_at"}).json()
+
+        assert isinstance(data[0]["created_at"], str)
+
+    def test_only_requested_columns_are_selected(self, client, listings):
+        statements = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", capture)
+        try:
+            client.get("/api/properties/", params={"fields": "title,area"})
+        finally:
+            event.remove(engine, "before_cursor_execute", capture)
+
+        select = [s for s in statements if s.lstrip().upper().startswith("SELECT")][-1]
+        assert "description" not in select
+        assert "properties.title" in select and "properties.area" in select
+
+    def test_with_filters_and_offset(self, client, listings):
+        data = client.get(
+            "/api/properties/",
+            params={"fields": "title", "location": "Paris", "skip": 1}
+        ).json()
+
+        assert data == [{"title": "T4"}]
+
+    def test_with_cursor_without_sort_key(self, client, listings):
+        """Test that the cursor still works when id/sort key are not requested"""
+        titles = []
+        cursor = ""
+        while cursor is not None:
+            page = client.get(
+                "/api/properties/",
+                params={"fields": "title", "sort": "-price", "cursor": cursor, "limit": 2}
+            ).json()
+            assert all(set(item) == {"title"} for item in page["items"])
+            titles.extend(item["title"] for item in page["items"])
+            cursor = page["next_cursor"]
+
+        assert titles == ["T4", "T3", "Studio"]
+
+    def test_with_near(self, client, listings):
+        data = client.get(
+            "/api/properties/",
+            params={"fields": "title", "near": "48.85,2.35", "radius_km": 10}
+        ).json()
+
+        assert data == [{"title": "T3"}, {"title": "T4"}]
+
+    def test_with_text_search(self, client, listings):
+        client.post("/api/properties/", json={"title": "Loft", "description": "terrasse", "price": 1, "location": "X"})
+
+        data = client.get("/api/properties/", params={"fields": "title,price", "q": "terrasse"}).json()
+
+        assert data == [{"title": "Loft", "price": 1}]
+
+    def test_unknown_field(self, client, listings):
+        response = client.get("/api/properties/", params={"fields": "id,hashed_password"})
+
+        assert response.status_code == 400
+
+    def test_internal_columns_are_not_exposed(self, client, listings):
+        response = client.get("/api/properties/", params={"fields": "geo_cell"})
+
+        assert response.status_code == 400
@@ -0,0 +1,105 @@
+"""Tests for keyword search (q=) on GET /api/properties"""
+import pytest
+from sqlalchemy import text
+from conftest import client, db, engine
+from app.models import Property
+from app.services import full_text
+
+LISTINGS = [
+    {"title": "Appartement rénové", "description": "Grand balcon plein sud", "price": 300000, "location": "Lyon"},
+    {"title": "Maison avec parking", "description": "Jardin et parking double", "price": 450000, "location": "Nantes"},
+    {"title": "Studio", "description": "Proche métro, balcon", "price": 150000, "location": "Paris"},
+    {"title": "Loft", "description": "Ancienne usine à rénover", "price": 500000, "location": "Lille"},
+]
+
+
+@pytest.fixture
+def listings(client):
+    """Create the sample listings and return their ids by title"""
+    ids = {}
+    for listing in LISTINGS:
+        response = client.post("/api/properties/", json=listing)
+        assert response.status_code == 201
+        ids[listing["title"]] = response.json()["id"]
+    return ids
+
+
+def search(client, **params):
+    response = client.get("/api/properties/", params=params)
+    assert response.status_code == 200
+    return [p["title"] for p in response.json()]
+
+
+class TestFullTextSearch:
+    """Test the FTS5-backed keyword search"""
+
+    def test_single_keyword(self, client, listings):
+        assert sorted(search(client, q="balcon")) == ["Appartement rénové", "Studio"]
+
+    def test_accents_are_ignored(self, client, listings):
+        assert search(client, q="renove") == ["Appartement rénové"]
+
+    def test_keywords_are_anded(self, client, listings):
+        assert search(client, q="balcon métro") == ["Studio"]
+
+    def test_ranked_by_bm25(self, client, listings):
+        """Test that the listing mentioning parking twice ranks first"""
+        client.post(
+            "/api/properties/",
+            json={"title": "T2", "description": "Parking en sous-sol", "price": 1, "location": "Paris"}
+        )
+        assert search(client, q="parking") == ["Maison avec parking", "T2"]
+
+    def test_combined_with_filters(self, client, listings):
+        assert search(client, q="balcon", location="Paris") == ["Studio"]
+
+    def test_operator_characters_are_harmless(self, client, listings):
+        assert sorted(search(client, q='balcon"* -(')) == ["Appartement rénové", "Studio"]
+        assert search(client, q='"NEAR(*') == []
+
+    def test_index_follows_updates(self, client, listings):
+        client.put(f"/api/properties/{listings['Loft']}", json={"description": "Terrasse et parking"})
+
+        assert "Loft" in search(client, q="terrasse")
+        assert search(client, q="usine") == []
+
+    def test_index_follows_deletes(self, client, listings):
+        client.delete(f"/api/properties/{listings['Studio']}")
+
+        assert search(client, q="metro") == []
+
+    def test_cursor_requires_sort(self, client, listings):
+        response = client.get("/api/properties/", params={"q": "balcon", "cursor": ""})
+        assert response.status_code == 400
+
+    def test_cursor_with_sort(self, client, listings):
+        page = client.get(
+            "/api/properties/",
+            params={"q": "balcon", "cursor": "", "sort": "price", "limit": 1}
+        ).json()
+        assert [p["title"] for p in page["items"]] == ["Studio"]
+        assert page["next_cursor"] is not None
+
+
+class TestFullTextIndexMaintenance:
+    """Test the rebuild path and the non-SQLite fallback"""
+
+    def test_rebuild_index_for_existing_rows(self, db, listings):
+        with engine.begin() as connection:
+            connection.execute(text("DROP TABLE properties_fts"))
+            full_text.rebuild_index(connection)
+            rows = connection.execute(
+                text("SELECT rowid FROM properties_fts WHERE properties_fts MATCH 'jardin'")
+            ).fetchall()
+
+        assert [r[0] for r in rows] == [listings["Maison avec parking"]]
+
+    def test_ensure_index_is_noop_when_present(self, db):
+        assert full_text.ensure_index(engine) is False
+
+    def test_like_fallback(self, db, listings):
+        query = full_text.apply_text_search(db.query(Property), "BALCON", "postgresql")
+        sql = str(query.statement.compile(engine))
+
+        assert "properties_fts" not in sql
+        assert "lower" in sql.lower() or "like" in sql.lower()
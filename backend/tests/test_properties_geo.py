@@ -0,0 +1,158 @@
+"""Tests for radius search (near=lat,lon&radius_km=) on GET /api/properties"""
+import random
+
+import pytest
+from sqlalchemy import text
+from conftest import client, db, engine
+from app.models import Property
+from app.services import geo
+
+PARIS = (48.8566, 2.3522)
+
+LISTINGS = [
+    {"title": "Paris", "price": 500000, "location": "Paris", "latitude": 48.8570, "longitude": 2.3530},
+    {"title": "Versailles", "price": 400000, "location": "Versailles", "latitude": 48.8049, "longitude": 2.1204},
+    {"title": "Lyon", "price": 300000, "location": "Lyon", "latitude": 45.7640, "longitude": 4.8357},
+    {"title": "Sans coordonnées", "price": 100000, "location": "Inconnu"},
+]
+
+
+@pytest.fixture
+def listings(client):
+    ids = {}
+    for listing in LISTINGS:
+        response = client.post("/api/properties/", json=listing)
+        assert response.status_code == 201
+        ids[listing["title"]] = response.json()["id"]
+    return ids
+
+
+def near(client, radius_km, point=PARIS, **params):
+    response = client.get(
+        "/api/properties/",
+        params={"near": f"{point[0]},{point[1]}", "radius_km": radius_km, **params}
+    )
+    assert response.status_code == 200
+    return [p["title"] for p in response.json()]
+
+
+class TestRadiusSearch:
+    """Test the near/radius_km query"""
+
+    def test_small_radius(self, client, listings):
+        assert near(client, 5) == ["Paris"]
+
+    def test_sorted_by_distance(self, client, listings):
+        assert near(client, 20) == ["Paris", "Versailles"]
+        assert near(client, 500) == ["Paris", "Versailles", "Lyon"]
+
+    def test_combined_with_filters(self, client, listings):
+        assert near(client, 500, price_max=450000) == ["Versailles", "Lyon"]
+
+    def test_offset_over_distance_order(self, client, listings):
+        assert near(client, 500, skip=1, limit=1) == ["Versailles"]
+
+    def test_update_moves_cell(self, client, listings):
+        client.put(
+            f"/api/properties/{listings['Lyon']}",
+            json={"latitude": 48.86, "longitude": 2.35}
+        )
+        assert near(client, 5) == ["Paris", "Lyon"]
+
+    def test_coordinates_returned(self, client, listings):
+        data = client.get(f"/api/properties/{listings['Paris']}").json()
+        assert data["latitude"] == pytest.approx(48.8570)
+
+    def test_invalid_requests(self, client):
+        assert client.get("/api/properties/", params={"near": "48.8"}).status_code == 400
+        assert client.get("/api/properties/", params={"near": "48.8,2.3"}).status_code == 400
+        assert client.get(
+            "/api/properties/",
+            params={"near": "48.8,2.3", "radius_km": 5, "cursor": ""}
+        ).status_code == 400
+        too_wide = {"near": "45.75,4.85", "radius_km": geo.MAX_RADIUS_KM + 1}
+        assert client.get("/api/properties/", params=too_wide).status_code == 400
+
+    def test_widest_radius(self, client, listings):
+        assert near(client, geo.MAX_RADIUS_KM, point=(45.75, 4.85)) == ["Lyon", "Paris", "Versailles"]
+
+
+class TestGridIndex:
+    """Test the grid cell helpers"""
+
+    def test_haversine(self):
+        assert geo.haversine_km(48.8566, 2.3522, 45.7640, 4.8357) == pytest.approx(392, abs=2)
+
+    def test_cell_ranges_cover_circle(self):
+        """Every random point inside the radius falls in one of the ranges"""
+        rng = random.Random(42)
+        for center in [PARIS, (0.0, 179.99), (-33.86, -179.99), (89.5, 10.0)]:
+            ranges = geo.cell_ranges(center[0], center[1], 15)
+            for _ in range(500):
+                lat = max(-90.0, min(90.0, center[0] + rng.uniform(-0.2, 0.2)))
+                lon = (center[1] + rng.uniform(-2, 2) + 180) % 360 - 180
+                if geo.haversine_km(center[0], center[1], lat, lon) <= 15:
+                    cell = geo.geo_cell(lat, lon)
+                    assert any(low <= cell <= high for low, high in ranges)
+
+    def test_candidate_query_uses_covering_index(self, db):
+        query = geo.candidate_query(db.query(Property), PARIS[0], PARIS[1], 5)
+        sql = str(query.statement.compile(engine, compile_kwargs={"literal_binds": True}))
+
+        plan = [row[-1] for row in db.execute(text("EXPLAIN QUERY PLAN " + sql))]
+
+        assert any("COVERING INDEX ix_properties_geo" in step for step in plan), plan
+        assert not any(step.startswith("SCAN properties") for step in plan), plan
+
+    @pytest.mark.parametrize("center", [PARIS, (0.0, 179.99), (-33.86, -179.99), (89.5, 10.0)])
+    def test_band_scan_matches_cell_ranges(self, db, monkeypatch, center):
+        rng = random.Random(7)
+        db.add_all([
+            Property(**geo.with_geo_cell({
+                "title": "P", "price": 1, "location": "X",
+                "latitude": max(-90.0, min(90.0, center[0] + rng.uniform(-1, 1))),
+                "longitude": (center[1] + rng.uniform(-3, 3) + 180) % 360 - 180,
+            }))
+            for _ in range(300)
+        ])
+        db.commit()
+        expected = geo.nearest_ids(db.query(Property), center[0], center[1], 60)
+
+        monkeypatch.setattr(geo, "MAX_CELL_RANGES", 0)
+
+        assert geo.nearest_ids(db.query(Property), center[0], center[1], 60) == expected
+        assert expected
+
+    def test_band_scan_uses_covering_index(self, db, monkeypatch):
+        monkeypatch.setattr(geo, "MAX_CELL_RANGES", 0)
+        query = geo.candidate_query(db.query(Property), PARIS[0], PARIS[1], 5)
+        sql = str(query.statement.compile(engine, compile_kwargs={"literal_binds": True}))
+
+        plan = [row[-1] for row in db.execute(text("EXPLAIN QUERY PLAN " + sql))]
+
+        assert plan == ["SEARCH properties USING COVERING INDEX ix_properties_geo (geo_cell>? AND geo_cell<?)"]
+
+
+class TestSchemaUpgrade:
+    """Test that existing databases gain the new columns and indexes"""
+
+    def test_upgrade_adds_geo_columns(self):
+        from sqlalchemy import create_engine, inspect
+        from app.database import Base, upgrade_schema
+
+        old_engine = create_engine("sqlite://")
+        with old_engine.begin() as connection:
+            connection.execute(text(
+                "CREATE TABLE properties (id INTEGER PRIMARY KEY, title VARCHAR(200) NOT NULL, "
+                "description VARCHAR(1000), price INTEGER NOT NULL, location VARCHAR(200) NOT NULL, "
+                "rooms INTEGER, bathrooms INTEGER, area INTEGER, created_at DATETIME, updated_at DATETIME)"
+            ))
+        Base.metadata.create_all(bind=old_engine)
+
+        upgrade_schema(old_engine)
+
+        inspector = inspect(old_engine)
+        columns = {c["name"] for c in inspector.get_columns("properties")}
+        indexes = {i["name"] for i in inspector.get_indexes("properties")}
+        assert {"latitude", "longitude", "geo_cell"} <= columns
+        assert "ix_properties_geo" in indexes
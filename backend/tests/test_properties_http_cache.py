@@ -0,0 +1,113 @@
+"""Tests for ETag / conditional GET on property resources and listings"""
+import pytest
+from sqlalchemy import event
+from conftest import client, db, engine
+
+
+@pytest.fixture
+def property_id(client):
+    response = client.post("/api/properties/", json={"title": "T2", "price": 210000, "location": "Lyon"})
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+def capture_selects(run):
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        response = run()
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+    return response, [s for s in statements if s.lstrip().upper().startswith("SELECT")]
+
+
+class TestPropertyETag:
+    """Test validators on GET /api/properties/{id}"""
+
+    def test_headers(self, client, property_id):
+        response = client.get(f"/api/properties/{property_id}")
+
+        assert response.status_code == 200
+        assert response.headers["etag"].startswith(f'"p{property_id}-')
+        assert response.headers["last-modified"].endswith("GMT")
+        assert "max-age" in response.headers["cache-control"]
+
+    def test_not_modified_without_loading_the_row(self, client, property_id):
+        etag = client.get(f"/api/properties/{property_id}").headers["etag"]
+
+        response, selects = capture_selects(
+            lambda: client.get(f"/api/properties/{property_id}", headers={"If-None-Match": etag})
+        )
+
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+        assert not any("properties.title" in select for select in selects)
+
+    def test_weak_and_listed_tags_match(self, client, property_id):
+        etag = client.get(f"/api/properties/{property_id}").headers["etag"]
+
+        response = client.get(f"/api/properties/{property_id}", headers={"If-None-Match": f'"other", W/{etag}'})
+
+        assert response.status_code == 304
+
+    def test_update_changes_etag(self, client, property_id):
+        etag = client.get(f"/api/properties/{property_id}").headers["etag"]
+        client.put(f"/api/properties/{property_id}", json={"price": 200000})
+
+        response = client.get(f"/api/properties/{property_id}", headers={"If-None-Match": etag})
+
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+        assert response.json()["price"] == 200000
+
+    def test_missing_property(self, client):
+        response = client.get("/api/properties/999999", headers={"If-None-Match": "*"})
+
+        assert response.status_code == 404
+
+
+class TestCollectionETag:
+    """Test validators on listings and derived collections"""
+
+    @pytest.mark.parametrize("path", [
+        "/api/properties/",
+        "/api/properties/?fields=id,price",
+        "/api/properties/facets",
+        "/api/properties/clusters?bbox=-5,41,10,52&zoom=6",
+    ])
+    def test_not_modified_until_a_write(self, client, property_id, path):
+        etag = client.get(path).headers["etag"]
+
+        response, selects = capture_selects(lambda: client.get(path, headers={"If-None-Match": etag}))
+        assert response.status_code == 304
+        assert all("table_versions" in select for select in selects)
+
+        client.post("/api/properties/", json={"title": "T3", "price": 300000, "location": "Lyon"})
+        assert client.get(path, headers={"If-None-Match": etag}).status_code == 200
+
+    def test_etag_depends_on_query(self, client, property_id):
+        first = client.get("/api/properties/", params={"limit": 1}).headers["etag"]
+        second = client.get("/api/properties/", params={"limit": 2}).headers["etag"]
+
+        assert first != second
+
+    @pytest.mark.parametrize("write", ["put", "delete", "bulk"])
+    def test_every_write_bumps_the_version(self, client, property_id, write):
+        etag = client.get("/api/properties/").headers["etag"]
+        if write == "put":
+            client.put(f"/api/properties/{property_id}", json={"title": "T2 bis"})
+        elif write == "delete":
+            client.delete(f"/api/properties/{property_id}")
+        else:
+            client.post(
+                "/api/properties/bulk",
+                content=b'{"title": "T1", "price": 90000, "location": "Nice"}\n',
+                headers={"Content-Type": "application/x-ndjson"}
+            )
+
+        assert client.get("/api/properties/").headers["etag"] != etag
@@ -0,0 +1,103 @@
+"""Tests for keyset (cursor) pagination on GET /api/properties"""
+import pytest
+from conftest import client, db
+
+
+def create_properties(client, prices):
+    """Create one property per price and return the created payloads"""
+    created = []
+    for idx, price in enumerate(prices):
+        response = client.post(
+            "/api/properties/",
+            json={"title": f"Bien {idx}", "price": price, "location": "Paris"}
+        )
+        assert response.status_code == 201
+        created.append(response.json())
+    return created
+
+
+def walk_pages(client, **params):
+    """Follow next_cursor until exhaustion and return all ids seen"""
+    ids = []
+    cursor = ""
+    while cursor is not None:
+        response = client.get("/api/properties/", params={**params, "cursor": cursor})
+        assert response.status_code == 200
+        page = response.json()
+        ids.extend(item["id"] for item in page["items"])
+        cursor = page["next_cursor"]
+    return ids
+
+
+class TestCursorPagination:
+    """Test cursor-based pagination"""
+
+    def test_offset_mode_still_returns_list(self, client):
+        """Test that offset mode keeps returning a plain list"""
+        create_properties(client, [100, 200, 300])
+
+        response = client.get("/api/properties/", params={"skip": 1, "limit": 1})
+
+        assert response.status_code == 200
+        data = response.json()
+        assert isinstance(data, list)
+        assert len(data) == 1
+
+    def test_cursor_walk_by_id(self, client):
+        """Test that walking all pages returns every property once, in id order"""
+        created = create_properties(client, [500, 100, 300, 200, 400])
+
+        ids = walk_pages(client, limit=2)
+
+        assert ids == sorted(p["id"] for p in created)
+
+    def test_cursor_walk_by_price_with_ties(self, client):
+        """Test that ties on the sort key are broken by id without gaps or duplicates"""
+        created = create_properties(client, [300, 100, 300, 100, 200, 300])
+
+        ids = walk_pages(client, limit=2, sort="price")
+
+        expected = [p["id"] for p in sorted(created, key=lambda p: (p["price"], p["id"]))]
+        assert ids == expected
+
+    def test_cursor_walk_descending(self, client):
+        """Test descending sort"""
+        created = create_properties(client, [300, 100, 200])
+
+        ids = walk_pages(client, limit=1, sort="-price")
+
+        expected = [p["id"] for p in sorted(created, key=lambda p: (-p["price"], -p["id"]))]
+        assert ids == expected
+
+    def test_last_page_has_no_next_cursor(self, client):
+        """Test that next_cursor is null when no rows remain"""
+        create_properties(client, [100, 200])
+
+        response = client.get("/api/properties/", params={"cursor": "", "limit": 5})
+
+        assert response.status_code == 200
+        assert response.json()["next_cursor"] is None
+
+    def test_invalid_cursor(self, client):
+        """Test that a garbage cursor is rejected"""
+        response = client.get("/api/properties/", params={"cursor": "not-a-cursor"})
+
+        assert response.status_code == 400
+
+    def test_cursor_from_other_sort_rejected(self, client):
+        """Test that a cursor cannot be replayed with a different sort"""
+        create_properties(client, [100, 200, 300])
+        page = client.get("/api/properties/", params={"cursor": "", "limit": 1}).json()
+
+        response = client.get(
+            "/api/properties/",
+            params={"cursor": page["next_cursor"], "sort": "price"}
+        )
+
+        assert response.status_code == 400
+
+    def test_unknown_sort_key(self, client):
+        """Test that an unsupported sort key is rejected"""
+        response = client.get("/api/properties/", params={"sort": "description"})
+
+        assert response.status_code == 400
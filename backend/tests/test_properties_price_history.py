@@ -0,0 +1,128 @@
+"""Tests for the property price history (recording and series endpoint)"""
+from datetime import datetime
+
+import pytest
+from sqlalchemy import insert
+from conftest import client, db, foreign_keys
+
+from app.models import Property, PropertyPriceHistory
+from app.services.bulk_import import insert_batch, validate_record
+from app.services.price_history import price_history_service
+
+
+@pytest.fixture
+def property_id(client):
+    response = client.post("/api/properties/", json={"title": "T2", "price": 200000, "location": "Lyon"})
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+@pytest.fixture
+def dated_history(db):
+    """Property 1 with a price change at fixed dates over three months"""
+    db.execute(insert(Property).values(id=1, title="T3", price=300000, location="Nice"))
+    db.execute(insert(PropertyPriceHistory), [
+        {"property_id": 1, "price": price, "changed_at": changed_at}
+        for price, changed_at in [
+            (320000, datetime(2024, 1, 3, 9)),
+            (310000, datetime(2024, 1, 20, 9)),
+            (305000, datetime(2024, 2, 5, 9)),
+            (299000, datetime(2024, 2, 6, 18)),
+            (300000, datetime(2024, 3, 1, 9)),
+        ]
+    ])
+    db.commit()
+
+
+class TestRecording:
+    """Price points are written by the property write paths"""
+
+    def test_creation_records_the_listing_price(self, client, property_id):
+        data = client.get("/api/properties/price-history", params={"ids": property_id}).json()
+
+        assert data["series"][0]["property_id"] == property_id
+        assert [point["price"] for point in data["series"][0]["points"]] == [200000]
+
+    def test_only_price_changes_are_recorded(self, client, property_id):
+        client.patch(f"/api/properties/{property_id}", json={"price": 195000})
+        client.patch(f"/api/properties/{property_id}", json={"title": "T2 rénové"})
+        client.put(f"/api/properties/{property_id}", json={"price": 195000, "rooms": 2})
+        client.patch(f"/api/properties/{property_id}", json={"price": 189000})
+
+        points = client.get("/api/properties/price-history", params={"ids": property_id}).json()["series"][0]["points"]
+        assert [point["price"] for point in points] == [200000, 195000, 189000]
+
+    def test_delete_drops_the_history(self, client, db, property_id):
+        client.delete(f"/api/properties/{property_id}")
+
+        assert db.query(PropertyPriceHistory).count() == 0
+
+    def test_delete_with_enforced_foreign_keys(self, client, db, dated_history, foreign_keys):
+        assert client.delete("/api/properties/1").status_code == 204
+        assert db.query(PropertyPriceHistory).count() == 0
+
+    def test_bulk_insert_records_initial_prices(self, client, db):
+        ids = insert_batch(db, [
+            validate_record({"title": "A", "price": 100000, "location": "Lyon"})[0],
+            validate_record({"title": "B", "price": 150000, "location": "Nice"})[0],
+        ])
+
+        data = client.get("/api/properties/price-history", params={"ids": ",".join(map(str, ids))}).json()
+        assert [s["points"][0]["price"] for s in data["series"]] == [100000, 150000]
+
+    def test_seeding_existing_properties(self, db):
+        db.execute(insert(Property).values(title="Ancien", price=99000, location="Lyon"))
+        db.commit()
+
+        assert price_history_service.ensure_seeded(db) == 1
+        assert price_history_service.ensure_seeded(db) == 0
+        assert db.query(PropertyPriceHistory.price).scalar() == 99000
+
+
+class TestSeries:
+    """Test the series and downsampled modes of GET /price-history"""
+
+    def test_range_starts_with_the_price_in_effect(self, client, dated_history):
+        data = client.get("/api/properties/price-history", params={
+            "ids": "1", "start": "2024-02-01T00:00:00", "end": "2024-02-28T00:00:00"
+        }).json()
+
+        points = data["series"][0]["points"]
+        assert [point["price"] for point in points] == [310000, 305000, 299000]
+        assert points[0]["changed_at"] == "2024-01-20T09:00:00"
+
+    def test_many_properties_in_request_order(self, client, dated_history, property_id):
+        data = client.get("/api/properties/price-history", params={"ids": f"{property_id},1,999"}).json()
+
+        assert [s["property_id"] for s in data["series"]] == [property_id, 1]
+        assert len(data["series"][1]["points"]) == 5
+
+    def test_monthly_buckets(self, client, dated_history):
+        data = client.get("/api/properties/price-history", params={"ids": "1", "interval": "month"}).json()
+
+        assert data["interval"] == "month"
+        buckets = data["series"][0]["buckets"]
+        assert [bucket["start"] for bucket in buckets] == [
+            "2024-01-01T00:00:00", "2024-02-01T00:00:00", "2024-03-01T00:00:00"
+        ]
+        assert buckets[0] == {"start": "2024-01-01T00:00:00", "count": 2, "min": 310000, "max": 320000, "avg": 315000.0}
+        assert data["series"][0]["points"] is None
+
+    def test_weekly_buckets_start_on_monday(self, client, dated_history):
+        data = client.get("/api/properties/price-history", params={
+            "ids": "1", "interval": "week", "start": "2024-02-01T00:00:00"
+        }).json()
+
+        buckets = data["series"][0]["buckets"]
+        # 2024-02-05 is a Monday: both February changes fall in its week
+        assert [(bucket["start"], bucket["count"]) for bucket in buckets] == [
+            ("2024-02-05T00:00:00", 2), ("2024-02-26T00:00:00", 1)
+        ]
+
+    @pytest.mark.parametrize("params", [
+        {"ids": "1", "interval": "year"},
+        {"ids": "1", "start": "2024-03-01T00:00:00", "end": "2024-01-01T00:00:00"},
+        {"ids": "a,b"},
+    ])
+    def test_invalid_parameters(self, client, params):
+        assert client.get("/api/properties/price-history", params=params).status_code == 400
@@ -0,0 +1,158 @@
+"""Tests for the in-process response cache of property reads"""
+import pytest
+from sqlalchemy import event
+from conftest import client, db, engine
+
+from fastapi import Request
+
+from app.services.cache_backends import MemoryBackend
+from app.services.response_cache import LISTING, PROPERTY, ResponseCache
+
+
+def create(client, title, price=150000):
+    response = client.post("/api/properties/", json={"title": title, "price": price, "location": "Lyon"})
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+def count_queries(run):
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        response = run()
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+    return response, len(statements)
+
+
+class TestResponseCacheRoutes:
+    """Test caching on GET /api/properties and GET /api/properties/{id}"""
+
+    @pytest.mark.parametrize("path", ["/api/properties/?limit=10", "/api/properties/{id}"])
+    def test_hit_skips_the_database(self, client, path):
+        path = path.format(id=create(client, "T2"))
+        first = client.get(path)
+
+        second, queries = count_queries(lambda: client.get(path))
+
+        assert second.status_code == 200
+        assert second.content == first.content
+        assert second.headers["etag"] == first.headers["etag"]
+        assert queries == 0
+
+    def test_query_order_does_not_matter(self, client):
+        create(client, "T2")
+        client.get("/api/properties/", params=[("location", "Lyon"), ("limit", "5")])
+
+        _, queries = count_queries(
+            lambda: client.get("/api/properties/", params=[("limit", "5"), ("location", "Lyon")])
+        )
+
+        assert queries == 0
+
+    def test_write_invalidates_the_property_and_listings_only(self, client):
+        first, second = create(client, "T2"), create(client, "T3")
+        client.get(f"/api/properties/{first}")
+        client.get(f"/api/properties/{second}")
+        client.get("/api/properties/")
+
+        client.put(f"/api/properties/{first}", json={"title": "T2 rénové"})
+
+        assert client.get(f"/api/properties/{first}").json()["title"] == "T2 rénové"
+        assert [item["title"] for item in client.get("/api/properties/").json()] == ["T2 rénové", "T3"]
+        _, queries = count_queries(lambda: client.get(f"/api/properties/{second}"))
+        assert queries == 0
+
+    def test_delete_invalidates(self, client):
+        property_id = create(client, "T2")
+        client.get(f"/api/properties/{property_id}")
+
+        client.delete(f"/api/properties/{property_id}")
+
+        assert client.get(f"/api/properties/{property_id}").status_code == 404
+        assert client.get("/api/properties/").json() == []
+
+    def test_conditional_get_on_a_hit(self, client):
+        property_id = create(client, "T2")
+        etag = client.get(f"/api/properties/{property_id}").headers["etag"]
+
+        response = client.get(f"/api/properties/{property_id}", headers={"If-None-Match": etag})
+
+        assert response.status_code == 304
+
+    def test_stats_endpoint(self, client):
+        create(client, "T2")
+        client.get("/api/properties/")
+        client.get("/api/properties/")
+
+        stats = client.get("/health/cache").json()
+
+        assert stats["hits"] >= 1 and stats["misses"] >= 1
+        assert stats["entries"] >= 1
+
+
+class TestResponseCache:
+    """Test the ResponseCache class directly"""
+
+    @staticmethod
+    def request(path="/api/properties/", query=b""):
+        return Request({"type": "http", "method": "GET", "path": path, "query_string": query, "headers": []})
+
+    def test_write_changes_the_keys(self):
+        cache = ResponseCache(MemoryBackend(max_entries=10), ttl_seconds=60)
+        listing = cache.key(LISTING, self.request())
+        one = cache.key(PROPERTY, self.request("/api/properties/1"), 1)
+        two = cache.key(PROPERTY, self.request("/api/properties/2"), 2)
+        cache.put(listing, b"[]", {"ETag": '"v1"'})
+
+        cache.invalidate([({"id": 1}, {"id": 1})])
+
+        assert cache.key(LISTING, self.request()) != listing
+        assert cache.key(PROPERTY, self.request("/api/properties/1"), 1) != one
+        assert cache.key(PROPERTY, self.request("/api/properties/2"), 2) == two
+        assert cache.get(cache.key(LISTING, self.request())) is None
+
+    def test_query_is_encoded_in_canonical_order(self):
+        cache = ResponseCache(MemoryBackend(max_entries=10), ttl_seconds=60)
+
+        assert cache.key(LISTING, self.request(query=b"q=a%26b%3Dc")) != cache.key(LISTING, self.request(query=b"q=a&b=c"))
+        assert cache.key(LISTING, self.request(query=b"b=2&a=1&a=0")) == cache.key(LISTING, self.request(query=b"a=0&a=1&b=2"))
+
+    def test_round_trip(self):
+        cache = ResponseCache(MemoryBackend(max_entries=10), ttl_seconds=60)
+        key = cache.key(LISTING, self.request(query=b"limit=5"))
+        cache.put(key, b'[{"a": "\n"}]', {"ETag": '"v1"'})
+
+        assert cache.get(key) == (b'[{"a": "\n"}]', {"ETag": '"v1"'})
+
+    def test_disabled(self):
+        cache = ResponseCache(MemoryBackend(max_entries=10), ttl_seconds=0)
+        key = cache.key(LISTING, self.request())
+        cache.put(key, b"[]", {})
+
+        assert cache.get(key) is None
+
+    def test_one_listing_bump_per_batch_and_none_for_new_properties(self):
+        backend = MemoryBackend(max_entries=10)
+        cache = ResponseCache(backend, ttl_seconds=60)
+
+        cache.invalidate([(None, {"id": i}) for i in range(1, 1001)])
+
+        assert backend.counter(f"version:{LISTING}") == 1
+        assert backend.stats()["counters"] == 1
+
+    def test_delete_drops_the_property_counter(self):
+        backend = MemoryBackend(max_entries=10)
+        cache = ResponseCache(backend, ttl_seconds=60)
+        cache.invalidate([({"id": 1}, {"id": 1})])
+        key = cache.key(PROPERTY, self.request("/api/properties/1"), 1)
+        cache.put(key, b"{}", {"ETag": '"v1"'})
+
+        cache.invalidate([({"id": 1}, None)])
+
+        assert backend.stats()["counters"] == 1
+        assert cache.get(cache.key(PROPERTY, self.request("/api/properties/1"), 1)) is None
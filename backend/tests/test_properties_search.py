@@ -0,0 +1,104 @@
+"""Tests for server-side property search filters"""
+import pytest
+from sqlalchemy import text
+from conftest import client, db, engine
+from app.models import Property
+from app.services.pagination import order_query
+from app.services.property_search import PropertyFilters
+
+LISTINGS = [
+    {"title": "Studio", "price": 120000, "location": "Lyon", "rooms": 1, "bathrooms": 1, "area": 25},
+    {"title": "T2", "price": 210000, "location": "Lyon", "rooms": 2, "bathrooms": 1, "area": 45},
+    {"title": "T3", "price": 320000, "location": "Paris", "rooms": 3, "bathrooms": 1, "area": 65},
+    {"title": "T4", "price": 450000, "location": "Paris", "rooms": 4, "bathrooms": 2, "area": 90},
+    {"title": "Maison", "price": 380000, "location": "Nantes", "rooms": 5, "bathrooms": 2, "area": 130},
+]
+
+
+@pytest.fixture
+def listings(client):
+    """Create the sample listings"""
+    for listing in LISTINGS:
+        assert client.post("/api/properties/", json=listing).status_code == 201
+
+
+def titles(client, **params):
+    response = client.get("/api/properties/", params=params)
+    assert response.status_code == 200
+    return sorted(p["title"] for p in response.json())
+
+
+class TestPropertyFilters:
+    """Test the search filters on GET /api/properties"""
+
+    def test_price_range(self, client, listings):
+        assert titles(client, price_min=200000, price_max=350000) == ["T2", "T3"]
+
+    def test_rooms_equality(self, client, listings):
+        assert titles(client, rooms=3) == ["T3"]
+
+    def test_rooms_in_list(self, client, listings):
+        assert titles(client, rooms=[1, 5]) == ["Maison", "Studio"]
+
+    def test_bathrooms_range(self, client, listings):
+        assert titles(client, bathrooms_min=2) == ["Maison", "T4"]
+
+    def test_area_range(self, client, listings):
+        assert titles(client, area_min=40, area_max=70) == ["T2", "T3"]
+
+    def test_location_in_list(self, client, listings):
+        assert titles(client, location=["Paris", "Nantes"]) == ["Maison", "T3", "T4"]
+
+    def test_combined_filters(self, client, listings):
+        assert titles(client, location="Paris", price_max=400000, rooms_min=2) == ["T3"]
+
+    def test_filters_with_cursor(self, client, listings):
+        """Test that filters apply across cursor pages"""
+        seen = []
+        cursor = ""
+        while cursor is not None:
+            page = client.get(
+                "/api/properties/",
+                params={"location": "Lyon", "cursor": cursor, "limit": 1, "sort": "price"}
+            ).json()
+            seen.extend(p["title"] for p in page["items"])
+            cursor = page["next_cursor"]
+        assert seen == ["Studio", "T2"]
+
+
+# Every supported filter combination must be answered by an index search
+SUPPORTED_COMBINATIONS = [
+    {"price_min": 100000},
+    {"price_max": 300000},
+    {"price_min": 100000, "price_max": 300000},
+    {"rooms": [3]},
+    {"rooms": [2, 3]},
+    {"rooms_min": 2},
+    {"rooms_min": 2, "rooms_max": 4},
+    {"rooms": [3], "price_min": 100000, "price_max": 300000},
+    {"bathrooms": [2]},
+    {"bathrooms_min": 1, "bathrooms_max": 2},
+    {"bathrooms": [1], "price_max": 300000},
+    {"area_min": 50},
+    {"area_min": 50, "area_max": 90},
+    {"area_min": 50, "price_max": 300000},
+    {"location": ["Paris"]},
+    {"location": ["Paris", "Lyon"]},
+    {"location": ["Paris"], "price_min": 100000, "price_max": 300000},
+    {"location": ["Paris"], "rooms": [2, 3], "area_min": 40},
+]
+
+
+class TestSearchQueryPlans:
+    """EXPLAIN QUERY PLAN checks for the search indexes"""
+
+    @pytest.mark.parametrize("sort", ["id", "price", "-created_at"])
+    @pytest.mark.parametrize("combination", SUPPORTED_COMBINATIONS)
+    def test_filter_uses_index(self, db, combination, sort):
+        query = order_query(PropertyFilters(**combination).apply(db.query(Property)), sort, True)
+        sql = str(query.limit(100).statement.compile(engine, compile_kwargs={"literal_binds": True}))
+
+        plan = [row[-1] for row in db.execute(text("EXPLAIN QUERY PLAN " + sql))]
+
+        assert any(step.startswith("SEARCH properties USING") for step in plan), plan
+        assert not any(step.startswith("SCAN properties") for step in plan), plan
@@ -0,0 +1,167 @@
+"""Tests for GET /api/properties/{id}/similar"""
+import numpy as np
+import pytest
+from conftest import client, db
+from app.models import Property
+from app.services import http_cache
+from app.services.similar import FEATURES, LOCATION_PENALTY, MISSING_PENALTY, SimilarIndex, similar_index
+
+
+@pytest.fixture(autouse=True)
+def empty_index():
+    """The index is process-wide; start every test unloaded"""
+    similar_index.clear()
+    yield
+    similar_index.clear()
+
+
+def create(client, **values):
+    body = {"title": "Bien", "location": "Lyon", **values}
+    response = client.post("/api/properties/", json=body)
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+def similar_ids(client, property_id, **params):
+    response = client.get(f"/api/properties/{property_id}/similar", params=params)
+    assert response.status_code == 200
+    return [item["id"] for item in response.json()]
+
+
+class TestSimilar:
+    """Test ranking and the HTTP surface"""
+
+    def test_nearest_first_and_self_excluded(self, client):
+        reference = create(client, price=250000, area=60, rooms=3)
+        close = create(client, price=255000, area=62, rooms=3)
+        further = create(client, price=320000, area=75, rooms=4)
+        far = create(client, price=900000, area=180, rooms=7)
+
+        assert similar_ids(client, reference) == [close, further, far]
+        assert similar_ids(client, reference, limit=1) == [close]
+
+    def test_other_location_is_penalized(self, client):
+        reference = create(client, price=250000, area=60)
+        same_city = create(client, price=280000, area=66)
+        other_city = create(client, price=250000, area=60, location="Nice")
+
+        assert similar_ids(client, reference) == [same_city, other_city]
+
+    def test_missing_values_are_left_out_of_the_reference(self, client):
+        reference = create(client, price=250000)
+        cheaper = create(client, price=150000, area=60, rooms=3)
+        close = create(client, price=245000, area=200, rooms=8)
+
+        assert similar_ids(client, reference) == [close, cheaper]
+
+    def test_sparse_fields(self, client):
+        reference = create(client, price=250000)
+        create(client, price=260000)
+
+        response = client.get(f"/api/properties/{reference}/similar", params={"fields": "id,price"})
+        assert response.json() == [{"id": reference + 1, "price": 260000}]
+
+    def test_unknown_property(self, client):
+        create(client, price=250000)
+
+        assert client.get("/api/properties/999/similar").status_code == 404
+        assert client.get("/api/properties/1/similar", params={"limit": 0}).status_code == 422
+
+
+class TestIncrementalRefresh:
+    """Writes after the first load are applied without reloading"""
+
+    def test_create_update_delete(self, client, db):
+        reference = create(client, price=250000, area=60)
+        other = create(client, price=400000, area=90)
+        assert similar_ids(client, reference) == [other]
+        assert similar_index.loaded
+
+        newcomer = create(client, price=251000, area=60)
+        assert similar_ids(client, reference) == [newcomer, other]
+
+        client.patch(f"/api/properties/{other}", json={"price": 250000, "area": 60})
+        assert similar_ids(client, reference) == [other, newcomer]
+
+        client.delete(f"/api/properties/{other}")
+        assert similar_ids(client, reference) == [newcomer]
+        assert len(similar_index) == 2
+
+    def test_bulk_import_is_indexed(self, client):
+        reference = create(client, price=250000, area=60)
+        similar_ids(client, reference)
+
+        body = '{"title": "A", "price": 252000, "area": 60, "location": "Lyon"}\n'
+        client.post("/api/properties/bulk", content=body, headers={"Content-Type": "application/x-ndjson"})
+
+        assert len(similar_ids(client, reference)) == 1
+
+    def test_published_writes_do_not_reload(self, client, monkeypatch):
+        reference = create(client, price=250000, area=60)
+        similar_ids(client, reference)
+        loads = []
+        monkeypatch.setattr(similar_index, "_load", lambda rows: loads.append(rows))
+
+        create(client, price=251000, area=60)
+        similar_ids(client, reference)
+
+        assert loads == []
+
+    def test_write_from_another_process_reloads(self, client, db):
+        reference = create(client, price=250000, area=60)
+        assert similar_ids(client, reference) == []
+
+        # Another worker: committed and versioned, but not published here
+        db.add(Property(title="Autre", price=251000, area=60, location="Lyon"))
+        http_cache.bump_version(db)
+        db.commit()
+
+        assert len(similar_ids(client, reference)) == 1
+
+
+class TestIndex:
+    """Test the index against a brute-force computation"""
+
+    def test_matches_brute_force_with_growth_and_removals(self):
+        rng = np.random.default_rng(7)
+        index = SimilarIndex()
+        index.loaded = True
+        properties = {}
+        for property_id in range(1, 3001):
+            values = {
+                "id": property_id,
+                "price": int(rng.integers(50, 2000)) * 1000,
+                "area": None if property_id % 5 == 0 else int(rng.integers(10, 300)),
+                "rooms": int(rng.integers(1, 8)),
+                "bathrooms": None if property_id % 3 == 0 else int(rng.integers(1, 4)),
+                "location": f"Ville {rng.integers(0, 20)}",
+            }
+            properties[property_id] = values
+            index.apply(None, values)
+        for property_id in range(1, 3001, 7):
+            index.apply(properties.pop(property_id), None)
+
+        def distance(a, b):
+            total = LOCATION_PENALTY if a["location"] != b["location"] else 0.0
+            for name, center, scale, weight in FEATURES:
+                if a[name] is None:
+                    continue
+                transform = np.log if name in ("price", "area") else float
+                qa = (transform(a[name]) - center) / scale
+                if b[name] is None:
+                    total += weight * (MISSING_PENALTY + qa * qa)
+                else:
+                    total += weight * ((transform(b[name]) - center) / scale - qa) ** 2
+            return total
+
+        for property_id in (2, 10, 2999):
+            reference = properties[property_id]
+            expected = sorted(
+                (distance(reference, other), other_id)
+                for other_id, other in properties.items() if other_id != property_id
+            )
+            found = index.similar(property_id, 10)
+            assert len(found) == 10
+            expected_distances = [d for d, _ in expected[:10]]
+            found_distances = [distance(reference, properties[i]) for i in found]
+            assert np.allclose(found_distances, expected_distances, atol=1e-4)
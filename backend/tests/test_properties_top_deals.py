@@ -0,0 +1,200 @@
+"""Tests for the deal scores and GET /api/properties/top-deals"""
+import random
+
+import pytest
+from sqlalchemy import insert
+from conftest import client, db, foreign_keys
+
+from app.models import Property, PropertyDealScore
+from app.services import profitability
+from app.services.bulk_import import insert_batch, validate_record
+from app.services.deal_scores import PROFILE, deal_score_service
+from app.services.market_stats import market_stats_service
+
+
+def create(client, price, area, location="Lyon"):
+    response = client.post("/api/properties/", json={"title": "T2", "price": price, "area": area, "location": location})
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+def stored_scores(db):
+    return sorted(
+        (row.property_id, row.location, row.sale_price_m2, round(row.score, 9), round(row.gross_margin_euro, 6))
+        for row in db.query(PropertyDealScore)
+    )
+
+
+def expected_margin(price, area, sale_price_m2):
+    return profitability.simulate_records([
+        {**PROFILE, "list_price": price, "surface": area, "target_sale_price_per_m2": sale_price_m2}
+    ])[0]["gross_margin_percent"]
+
+
+class TestMaintenance:
+    """The scores follow every write path"""
+
+    def test_score_is_the_default_deal_at_the_location_median(self, client, db):
+        first = create(client, 200000, 50)
+        create(client, 300000, 60)
+        create(client, 280000, 70)
+
+        median = market_stats_service.medians(db, ["Lyon"])["Lyon"]
+        score = db.query(PropertyDealScore).filter(PropertyDealScore.property_id == first).one()
+        assert score.sale_price_m2 == median
+        assert score.score == pytest.approx(expected_margin(200000, 50, median))
+
+    def test_median_move_rescores_the_location(self, client, db):
+        first = create(client, 200000, 50)
+        create(client, 400000, 50, "Nice")
+        before = db.query(PropertyDealScore.sale_price_m2).filter(PropertyDealScore.property_id == first).scalar()
+
+        create(client, 600000, 50)
+        create(client, 600000, 50)
+
+        rows = db.query(PropertyDealScore.location, PropertyDealScore.sale_price_m2).distinct().all()
+        assert sorted(rows) == sorted(market_stats_service.medians(db).items())
+        assert dict(rows)["Lyon"] != before
+
+    def test_random_writes_match_rebuild(self, client, db):
+        rng = random.Random(25)
+        ids = []
+        for _ in range(60):
+            action = rng.random()
+            if ids and action < 0.2:
+                client.delete(f"/api/properties/{ids.pop(rng.randrange(len(ids)))}")
+            elif ids and action < 0.5:
+                patch = rng.choice([
+                    {"price": rng.randrange(100_000, 900_000, 1000)},
+                    {"area": rng.choice([None, rng.randrange(20, 150)])},
+                    {"location": rng.choice(["Lyon", "Nice", "Brest"])},
+                    {"rooms": 3},
+                ])
+                client.patch(f"/api/properties/{rng.choice(ids)}", json=patch)
+            else:
+                ids.append(create(client, rng.randrange(100_000, 900_000, 1000), rng.randrange(20, 150),
+                                  rng.choice(["Lyon", "Nice", "Brest"])))
+        incremental = stored_scores(db)
+
+        deal_score_service.rebuild(db)
+
+        assert stored_scores(db) == incremental
+        assert len(incremental) == db.query(Property).filter(Property.area.isnot(None)).count()
+
+    def test_bulk_insert_matches_rebuild(self, client, db):
+        create(client, 250000, 50)
+        insert_batch(db, [
+            validate_record({"title": "A", "price": 150000 + 1000 * i, "area": 20 + i, "location": "Lyon"})[0]
+            for i in range(10)
+        ] + [validate_record({"title": "B", "price": 100000, "location": "Nice"})[0]])
+        assert deal_score_service.refresh(db, ["Lyon", "Nice"]) == ["Lyon"]
+        incremental = stored_scores(db)
+
+        deal_score_service.rebuild(db)
+
+        assert len(incremental) == 11
+        assert stored_scores(db) == incremental
+
+    def test_bulk_batches_keep_the_stored_median(self, client, db):
+        create(client, 250000, 50)
+        before = db.query(PropertyDealScore.sale_price_m2).scalar()
+
+        for start in range(0, 30, 10):
+            insert_batch(db, [
+                validate_record({"title": "A", "price": 400000 + 1000 * i, "area": 50, "location": "Lyon"})[0]
+                for i in range(start, start + 10)
+            ])
+
+        # Batches neither rescore the location nor mix two medians in it
+        rows = db.query(PropertyDealScore.property_id, PropertyDealScore.sale_price_m2).all()
+        assert len(rows) == 31
+        assert {median for _, median in rows} == {before}
+
+        assert deal_score_service.refresh(db, ["Lyon"]) == ["Lyon"]
+        assert deal_score_service.refresh(db, ["Lyon"]) == []
+        incremental = stored_scores(db)
+        deal_score_service.rebuild(db)
+        assert stored_scores(db) == incremental
+
+    def test_bulk_endpoint_refreshes_once(self, client, db, monkeypatch):
+        create(client, 250000, 50)
+        calls = []
+        refresh = deal_score_service.refresh
+
+        def counted_refresh(db, locations):
+            calls.append(set(locations))
+            return refresh(db, locations)
+
+        monkeypatch.setattr(deal_score_service, "refresh", counted_refresh)
+        body = "\n".join(
+            f'{{"title": "A", "price": {400000 + 1000 * i}, "area": 50, "location": "Lyon"}}' for i in range(30)
+        )
+
+        response = client.post("/api/properties/bulk", params={"batch_size": 10}, content=body,
+                               headers={"Content-Type": "application/x-ndjson"})
+
+        assert response.json()["batches"] == 3
+        assert calls == [{"Lyon"}]
+        incremental = stored_scores(db)
+        deal_score_service.rebuild(db)
+        assert stored_scores(db) == incremental
+
+    def test_delete_with_enforced_foreign_keys(self, client, db, foreign_keys):
+        first = create(client, 200000, 50)
+        second = create(client, 300000, 60)
+        client.patch(f"/api/properties/{first}", json={"price": 190000})
+
+        assert client.delete(f"/api/properties/{first}").status_code == 204
+        assert [row[0] for row in stored_scores(db)] == [second]
+
+    def test_ensure_built_for_existing_properties(self, db):
+        db.execute(insert(Property).values(title="Ancien", price=99000, area=33, location="Lyon"))
+        db.commit()
+        market_stats_service.rebuild(db)
+
+        assert deal_score_service.ensure_built(db)
+        assert not deal_score_service.ensure_built(db)
+        assert db.query(PropertyDealScore).count() == 1
+
+
+class TestEndpoint:
+    """Test GET /api/properties/top-deals"""
+
+    def test_best_margin_first(self, client):
+        # Same location median: the cheaper per m², the better the deal
+        cheap = create(client, 150000, 50)
+        mid = create(client, 250000, 50)
+        dear = create(client, 350000, 50)
+        create(client, 200000, None)
+
+        data = client.get("/api/properties/top-deals").json()
+
+        assert [deal["property"]["id"] for deal in data] == [cheap, mid, dear]
+        assert data[0]["property"]["title"] == "T2"
+        margins = [deal["gross_margin_percent"] for deal in data]
+        assert margins == sorted(margins, reverse=True)
+        assert data[0]["gross_margin_percent"] == round(
+            expected_margin(150000, 50, data[0]["sale_price_per_m2"]), 4
+        )
+
+    def test_location_limit_and_fields(self, client):
+        create(client, 150000, 50)
+        nice = [create(client, 300000, 50, "Nice"), create(client, 200000, 50, "Nice")]
+        create(client, 100000, 50, "Brest")
+
+        data = client.get("/api/properties/top-deals", params={"location": "Nice", "limit": 1, "fields": "id,price"}).json()
+
+        assert [deal["property"] for deal in data] == [{"id": nice[1], "price": 200000}]
+
+    def test_etag(self, client):
+        create(client, 150000, 50)
+        first = client.get("/api/properties/top-deals")
+
+        cached = client.get("/api/properties/top-deals", headers={"If-None-Match": first.headers["ETag"]})
+        assert cached.status_code == 304
+        create(client, 250000, 50)
+        assert client.get("/api/properties/top-deals", headers={"If-None-Match": first.headers["ETag"]}).status_code == 200
+
+    def test_invalid_input(self, client):
+        assert client.get("/api/properties/top-deals", params={"fields": "nope"}).status_code == 400
+        assert client.get("/api/properties/top-deals", params={"limit": 0}).status_code == 422
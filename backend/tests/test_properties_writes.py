@@ -0,0 +1,123 @@
+"""Tests for the RETURNING-based write paths (POST, PUT/PATCH, DELETE)"""
+import pytest
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql
+from conftest import client, db, engine
+from app.routes.properties import _previous_values, _update_returning_previous
+
+
+def property_statements(run):
+    """Run a request and return the statements it sent against ``properties``"""
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append(" ".join(statement.split()))
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        response = run()
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+    touching = [
+        s for s in statements
+        if any(marker in s for marker in ("FROM properties", "INTO properties", "UPDATE properties"))
+    ]
+    return response, touching
+
+
+@pytest.fixture
+def property_id(client):
+    response = client.post(
+        "/api/properties/",
+        json={"title": "T2", "price": 210000, "location": "Lyon", "latitude": 45.76, "longitude": 4.83}
+    )
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+class TestReturningWrites:
+    """Each write is one statement on properties, with no refresh"""
+
+    def test_create_is_one_insert(self, client):
+        response, statements = property_statements(
+            lambda: client.post("/api/properties/", json={"title": "T3", "price": 300000, "location": "Nice"})
+        )
+
+        assert response.status_code == 201
+        assert response.json()["created_at"] and response.json()["title"] == "T3"
+        assert len(statements) == 1 and "RETURNING" in statements[0]
+
+    def test_update_of_plain_fields_is_one_statement(self, client, property_id):
+        response, statements = property_statements(
+            lambda: client.put(f"/api/properties/{property_id}", json={"title": "T2 rénové", "description": "Refait"})
+        )
+
+        assert response.status_code == 200
+        assert response.json()["title"] == "T2 rénové" and response.json()["price"] == 210000
+        assert len(statements) == 1 and statements[0].startswith("UPDATE properties")
+
+    def test_update_of_keyed_fields_reads_the_previous_values(self, client, property_id):
+        response, statements = property_statements(
+            lambda: client.put(f"/api/properties/{property_id}", json={"price": 190000})
+        )
+
+        assert response.json()["price"] == 190000
+        assert len(statements) == 2
+        assert statements[0].startswith("SELECT") and "properties.title" not in statements[0]
+        facets = client.get("/api/properties/facets").json()
+        assert facets["price"] == [{"value": "100000-200000", "count": 1}]
+
+    def test_previous_values_are_read_for_update(self):
+        sql = str(_previous_values(1).compile(dialect=postgresql.dialect()))
+
+        assert sql.endswith("FOR UPDATE")
+
+    def test_postgresql_update_returns_the_previous_values(self):
+        # PostgreSQL only: SQLite evaluates the FROM subquery after the update
+        statement = _update_returning_previous(1, {"price": 190000})
+        sql = " ".join(str(statement.compile(dialect=postgresql.dialect())).split())
+
+        assert sql.startswith("UPDATE properties SET")
+        assert "FROM (SELECT" in sql and "FOR UPDATE) AS \"old\" WHERE properties.id = \"old\".id" in sql
+        assert 'RETURNING properties.title' in sql and '"old".price AS old_price' in sql
+
+    def test_update_moves_geo_cell_with_one_coordinate(self, client, property_id):
+        client.patch(f"/api/properties/{property_id}", json={"latitude": 48.85})
+
+        near = client.get("/api/properties/", params={"near": "48.85,4.83", "radius_km": 1}).json()
+        assert [item["id"] for item in near] == [property_id]
+
+    def test_patch_is_partial(self, client, property_id):
+        response = client.patch(f"/api/properties/{property_id}", json={"description": "Lumineux"})
+
+        assert response.status_code == 200
+        assert response.json()["description"] == "Lumineux"
+        assert response.json()["title"] == "T2"
+
+    def test_empty_update_writes_nothing(self, client, property_id):
+        before = client.get(f"/api/properties/{property_id}").json()
+
+        response, statements = property_statements(lambda: client.patch(f"/api/properties/{property_id}", json={}))
+
+        assert response.json() == before
+        assert len(statements) == 1 and statements[0].startswith("SELECT")
+
+    def test_delete_is_one_statement(self, client, property_id):
+        response, statements = property_statements(lambda: client.delete(f"/api/properties/{property_id}"))
+
+        assert response.status_code == 204
+        assert len(statements) == 1 and statements[0].startswith("DELETE FROM properties")
+        assert client.get("/api/properties/facets").json()["total"] == 0
+
+    @pytest.mark.parametrize("method, body", [
+        ("put", {"title": "X"}),
+        ("patch", {"price": 1}),
+        ("patch", {}),
+        ("delete", None),
+    ])
+    def test_missing_property(self, client, method, body):
+        kwargs = {"json": body} if body is not None else {}
+
+        response = getattr(client, method)("/api/properties/999999", **kwargs)
+
+        assert response.status_code == 404
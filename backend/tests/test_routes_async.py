@@ -0,0 +1,86 @@
+"""Tests for the async auth route variants (ASYNC_ROUTES=true)"""
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from conftest import SQLALCHEMY_DATABASE_URL, db
+from app import database
+from app.database import async_database_url, get_async_db, get_db
+from app.routes import auth, auth_async
+
+
+@pytest.fixture
+def async_client(db):
+    """App wired like main.py with ASYNC_ROUTES=true, on the test database"""
+    engine = create_async_engine(async_database_url(SQLALCHEMY_DATABASE_URL), poolclass=NullPool)
+    AsyncTestingSession = async_sessionmaker(engine, autoflush=False)
+
+    async def override_get_async_db():
+        async with AsyncTestingSession() as session:
+            yield session
+
+    def override_get_db():
+        yield db
+
+    app = FastAPI()
+    app.include_router(auth_async.router)
+    app.include_router(auth.router)
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    app.dependency_overrides[get_db] = override_get_db
+    with TestClient(app) as client:
+        yield client
+
+
+class TestAsyncDatabase:
+    """Test the async engine helpers"""
+
+    @pytest.mark.parametrize("url, expected", [
+        ("sqlite:///./immobilier.db", "sqlite+aiosqlite:///./immobilier.db"),
+        ("postgresql://u:p@db/immo", "postgresql+asyncpg://u:p@db/immo"),
+        ("postgresql+psycopg2://u:p@db/immo", "postgresql+asyncpg://u:p@db/immo"),
+    ])
+    def test_async_database_url(self, url, expected):
+        assert async_database_url(url) == expected
+
+    def test_engine_created_on_first_use(self, monkeypatch):
+        created = []
+        monkeypatch.setattr(database, "_async_session_factory", None)
+        monkeypatch.setattr(database, "create_async_engine", lambda url: created.append(url) or create_async_engine(url))
+
+        factory = database.get_async_sessionmaker()
+
+        assert database.get_async_sessionmaker() is factory
+        assert created == [async_database_url(database.settings.database_url)]
+
+
+class TestAsyncAuthRoutes:
+    """Register, login and /me through the async engine"""
+
+    USER = {"username": "asyncuser", "email": "async@example.com", "password": "Secret123!"}
+
+    def test_register_login_me(self, async_client):
+        assert async_client.post("/api/auth/register", json=self.USER).status_code == 201
+        assert async_client.post("/api/auth/register", json=self.USER).status_code == 400
+
+        login = async_client.post(
+            "/api/auth/login", json={"username": self.USER["username"], "password": self.USER["password"]}
+        )
+        assert login.status_code == 200
+        token = login.json()["access_token"]
+
+        me = async_client.get("/api/auth/me", headers={"Authorization": f"Bearer {token}"})
+        assert me.status_code == 200
+        assert me.json()["username"] == "asyncuser"
+
+    def test_rejections(self, async_client):
+        async_client.post("/api/auth/register", json=self.USER)
+
+        wrong = async_client.post("/api/auth/login", json={"username": "asyncuser", "password": "nope"})
+        missing = async_client.get("/api/auth/me")
+        invalid = async_client.get("/api/auth/me", headers={"Authorization": "Bearer not-a-token"})
+
+        assert wrong.status_code == 401
+        assert missing.status_code == 401
+        assert invalid.status_code == 401
@@ -0,0 +1,368 @@
+"""Tests for the profitability engine and /api/simulations/profitability"""
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+from conftest import client
+
+from app.routes import simulations
+from app.services import profitability
+
+SIMULATOR = Path(__file__).resolve().parents[2] / "frontend" / "src" / "pages" / "ProfitabilitySimulator.tsx"
+
+
+def camel(name: str) -> str:
+    head, *rest = name.split("_")
+    return head + "".join(part.title() for part in rest)
+
+
+def typescript_results(cases: list) -> list:
+    """
+    Run ``calculateProfitability`` from the frontend source under node on
+    ``cases`` (snake_case parameters, completed with the simulator
+    defaults as the page always passes a full set); results come back
+    snake_case with NaN/Infinity as None (``JSON.stringify`` turns them
+    into null).
+    """
+    source = SIMULATOR.read_text(encoding="utf-8")
+    start = source.index("const calculateProfitability")
+    body_start = source.index("{", source.index("=>", start))
+    depth = 0
+    for end in range(body_start, len(source)):
+        depth += {"{": 1, "}": -1}.get(source[end], 0)
+        if depth == 0:
+            break
+    # Only the signature carries type annotations
+    function = "(params) => " + source[body_start:end + 1]
+    script = (
+        f"const calculateProfitability = {function};\n"
+        "const cases = JSON.parse(require('fs').readFileSync(0, 'utf8'));\n"
+        "process.stdout.write(JSON.stringify(cases.map(calculateProfitability)));\n"
+    )
+    camel_cases = [
+        {camel(name): value for name, value in {**profitability.DEFAULTS, **case}.items()} for case in cases
+    ]
+    output = subprocess.run(
+        ["node", "-e", script], input=json.dumps(camel_cases), capture_output=True, text=True, check=True
+    ).stdout
+    by_camel = {camel(name): name for name in profitability.RESULTS}
+    return [{by_camel[key]: value for key, value in result.items()} for result in json.loads(output)]
+
+
+def random_cases(count: int, seed: int) -> list:
+    rng = random.Random(seed)
+    cases = []
+    for _ in range(count):
+        case = {
+            "list_price": rng.randrange(20_000, 2_000_000, 500),
+            "purchase_negotiation": round(rng.uniform(0, 0.2), 3),
+            "notary_fees": round(rng.uniform(0.02, 0.09), 3),
+            "buyer_agency_fees": round(rng.uniform(0, 0.1), 3),
+            "surface": rng.randrange(9, 400),
+            "renovation_cost_per_m2": rng.randrange(0, 2500, 10),
+            "contingency_margin": round(rng.uniform(0, 0.3), 2),
+            "holding_duration_months": rng.randrange(0, 36),
+            "monthly_interest": rng.randrange(0, 5000),
+            "monthly_condo_charges": rng.randrange(0, 800),
+            "monthly_property_tax": rng.randrange(0, 400),
+            "target_sale_price_per_m2": rng.randrange(1000, 20000, 50),
+            "seller_agency_fees": round(rng.uniform(0, 0.08), 3),
+            "sale_negotiation": round(rng.uniform(0, 0.1), 3),
+            "min_profit_margin_percent": rng.randrange(0, 40),
+        }
+        # Leave some parameters to their defaults
+        for name in rng.sample(list(case), rng.randrange(0, 4)):
+            del case[name]
+        cases.append(case)
+    return cases
+
+
+EDGE_CASES = [
+    {},
+    # Nothing to pay: 0 / 0 margin
+    {"list_price": 0, "surface": 0, "holding_duration_months": 0},
+    # Resale fees eat the whole price: infinite break-even
+    {"seller_agency_fees": 0.6, "sale_negotiation": 0.4},
+    # Loss-making deal
+    {"target_sale_price_per_m2": 1000},
+    # Exactly on target
+    {"list_price": 250000, "min_profit_margin_percent": 0},
+]
+
+
+@pytest.mark.skipif(shutil.which("node") is None or not SIMULATOR.exists(), reason="needs node and the frontend source")
+class TestTypeScriptParity:
+    """The NumPy port matches the frontend formulas bit for bit"""
+
+    def test_random_deals(self):
+        cases = random_cases(500, seed=22)
+
+        assert profitability.simulate_records(cases) == typescript_results(cases)
+
+    def test_edge_cases(self):
+        assert profitability.simulate_records(EDGE_CASES) == typescript_results(EDGE_CASES)
+
+
+class TestEngine:
+    """Test the vectorized engine"""
+
+    def test_simulator_defaults(self):
+        result = profitability.simulate_records([{}])[0]
+
+        assert result["net_acquisition_cost"] == pytest.approx(300000 * 0.95 * 1.08 * 1.05)
+        assert result["adjusted_works_cost"] == pytest.approx(55000)
+        assert result["total_holding_costs"] == 3900
+        assert result["net_sale_price"] == pytest.approx(450000 * 0.98 - 22500)
+        assert result["gross_margin_euro"] == pytest.approx(36410)
+        assert result["break_even_price"] == pytest.approx(382090 / 0.93)
+        assert result["target_met"] is False
+
+    def test_arrays_broadcast(self):
+        prices = np.array([200000, 250000, 300000])
+        results = profitability.simulate({"list_price": prices, "surface": np.array([[80], [100]])})
+
+        assert results["gross_margin_percent"].shape == (2, 3)
+        for i, surface in enumerate((80, 100)):
+            for j, price in enumerate(prices):
+                single = profitability.simulate_records([{"list_price": price, "surface": surface}])[0]
+                assert results["gross_margin_percent"][i, j] == single["gross_margin_percent"]
+
+    def test_unknown_parameter(self):
+        with pytest.raises(ValueError):
+            profitability.simulate({"listPrice": 1})
+
+
+class TestEndpoints:
+    """Test POST /api/simulations/profitability and /profitability/batch"""
+
+    def test_single(self, client):
+        response = client.post("/api/simulations/profitability", json={"list_price": 250000})
+
+        assert response.status_code == 200
+        assert response.json() == profitability.simulate_records([{"list_price": 250000}])[0]
+
+    def test_batch_in_request_order(self, client):
+        items = random_cases(50, seed=3) + EDGE_CASES
+
+        response = client.post("/api/simulations/profitability/batch", json={"items": items})
+
+        assert response.status_code == 200
+        assert response.json() == profitability.simulate_records(items)
+        assert response.json()[51]["gross_margin_percent"] is None
+
+    def test_invalid_input(self, client):
+        assert client.post("/api/simulations/profitability", json={"listPrice": 1}).status_code == 422
+        too_many = {"items": [{}] * 10001}
+        assert client.post("/api/simulations/profitability/batch", json=too_many).status_code == 400
+
+
+class TestSweep:
+    """Test the parameter grid and POST /api/simulations/profitability/sweep"""
+
+    AXES = {
+        "purchase_negotiation": np.linspace(0, 0.2, 5),
+        "renovation_cost_per_m2": np.linspace(200, 1500, 7),
+        "holding_duration_months": np.array([3.0, 6.0, 12.0]),
+        "target_sale_price_per_m2": np.linspace(2500, 7000, 11),
+    }
+
+    @pytest.mark.parametrize("chunk", [37, 1 << 17])
+    def test_grid_matches_single_deals(self, monkeypatch, chunk):
+        monkeypatch.setattr(profitability, "SWEEP_CHUNK_POINTS", chunk)
+
+        result = profitability.sweep({"list_price": 280000}, self.AXES)
+
+        assert result["gross_margin_percent"].shape == (5, 7, 3, 11)
+        for index in np.ndindex(5, 7, 3, 11):
+            deal = {"list_price": 280000, **{name: values[i] for (name, values), i in zip(self.AXES.items(), index)}}
+            single = profitability.simulate(deal)
+            assert result["gross_margin_percent"][index] == single["gross_margin_percent"]
+            assert result["gross_margin_euro"][index] == single["gross_margin_euro"]
+
+    def test_frontier_is_the_break_even_price(self):
+        result = profitability.sweep({"list_price": 280000}, self.AXES)
+
+        frontier = result["break_even"]["values"]
+        assert result["break_even"]["axis"] == "target_sale_price_per_m2" and frontier.shape == (5, 7, 3)
+        deal = {"list_price": 280000, "purchase_negotiation": 0.1, "renovation_cost_per_m2": 200 + 3 * 1300 / 6,
+                "holding_duration_months": 12}
+        # Margin is linear in the sale price: interpolation is exact
+        assert frontier[2, 3, 2] == pytest.approx(profitability.simulate(deal)["break_even_price"] / 100)
+
+    def test_frontier_without_crossing_is_nan(self):
+        axes = {"list_price": np.array([100000.0, 200000.0]), "target_sale_price_per_m2": np.array([9000.0, 10000.0])}
+
+        frontier = profitability.sweep({}, axes)["break_even"]["values"]
+
+        assert np.isnan(frontier).all()
+
+    def test_endpoint(self, client):
+        response = client.post("/api/simulations/profitability/sweep", json={
+            "base": {"list_price": 280000},
+            "axes": {
+                "holding_duration_months": {"values": [3, 6, 12]},
+                "target_sale_price_per_m2": {"start": 2500, "stop": 7000, "steps": 10},
+            },
+            "frontier_axis": "target_sale_price_per_m2",
+        })
+
+        assert response.status_code == 200
+        data = response.json()
+        assert [axis["name"] for axis in data["axes"]] == ["holding_duration_months", "target_sale_price_per_m2"]
+        assert data["axes"][1]["values"][-1] == 7000
+        assert len(data["gross_margin_percent"]) == 3 and len(data["gross_margin_percent"][0]) == 10
+        assert len(data["break_even"]["values"]) == 3
+        single = profitability.simulate_records([{"list_price": 280000, "holding_duration_months": 6,
+                                                  "target_sale_price_per_m2": 7000}])[0]
+        assert data["gross_margin_euro"][1][9] == round(single["gross_margin_euro"], 2)
+
+    def test_streamed_body_matches_the_arrays(self, client, monkeypatch):
+        monkeypatch.setattr(simulations, "SWEEP_RESPONSE_CHUNK", 16)
+        axes = {"surface": [0, 50], "holding_duration_months": [3, 12], "target_sale_price_per_m2": [0, 4000, 8000]}
+
+        data = client.post("/api/simulations/profitability/sweep", json={
+            "axes": {name: {"values": values} for name, values in axes.items()},
+        }).json()
+
+        result = profitability.sweep({}, {name: np.array(values, dtype=float) for name, values in axes.items()})
+        expected = np.round(result["gross_margin_euro"], 2)
+        assert np.array(data["gross_margin_euro"], dtype=float).shape == (2, 2, 3)
+        assert np.array_equal(np.array(data["gross_margin_euro"], dtype=float), expected, equal_nan=True)
+        # Zero surface: the resale price is 0 whatever its price per m², no frontier
+        assert data["break_even"]["values"][0] == [None, None]
+        assert None not in data["break_even"]["values"][1]
+
+    @pytest.mark.parametrize("body", [
+        {"axes": {}},
+        {"axes": {"listPrice": {"values": [1]}}},
+        {"axes": {"list_price": {"start": 1, "stop": 2}}},
+        {"axes": {"list_price": {"values": [1, 2], "steps": 3}}},
+        {"axes": {"list_price": {"values": [1, 2]}}, "frontier_axis": "surface"},
+        {"axes": {name: {"start": 0, "stop": 1, "steps": 100} for name in list(profitability.DEFAULTS)[:4]}},
+    ])
+    def test_invalid_grids(self, client, body):
+        assert client.post("/api/simulations/profitability/sweep", json=body).status_code == 400
+
+
+class TestMonteCarlo:
+    """Test the margin risk simulation and POST /api/simulations/profitability/monte-carlo"""
+
+    DISTRIBUTIONS = {
+        "renovation_cost_per_m2": {"distribution": "triangular", "low": 400, "mode": 500, "high": 900},
+        "holding_duration_months": {"distribution": "normal", "mean": 8, "std": 3, "low": 2},
+        "target_sale_price_per_m2": {"distribution": "uniform", "low": 4000, "high": 5200},
+    }
+
+    def run(self, **kwargs):
+        options = {"scenarios": 5000, "seed": 7, "percentiles": [5, 50, 95], **kwargs}
+        return profitability.monte_carlo({"list_price": 280000}, self.DISTRIBUTIONS, **options)
+
+    def test_same_seed_same_result(self):
+        assert self.run() == self.run()
+        assert self.run() != self.run(seed=8)
+
+    def test_pool_matches_serial(self, monkeypatch):
+        monkeypatch.setattr(profitability, "MONTE_CARLO_CHUNK", 1000)
+
+        assert self.run(workers=2) == self.run(workers=1)
+
+    def test_summary_matches_the_scenarios(self):
+        result = self.run(percentiles=[0, 100])
+
+        low, high = result["gross_margin_percent"]["percentiles"].values()
+        # Cheapest works, shortest holding, best price and the reverse
+        best = profitability.simulate({"list_price": 280000, "renovation_cost_per_m2": 400,
+                                       "holding_duration_months": 2, "target_sale_price_per_m2": 5200})
+        worst = profitability.simulate({"list_price": 280000, "renovation_cost_per_m2": 900,
+                                        "holding_duration_months": 20, "target_sale_price_per_m2": 4000})
+        assert worst["gross_margin_percent"] < low < high < best["gross_margin_percent"]
+        assert 0 < result["probability_of_loss"] < result["probability_below_target"] < 1
+
+    def test_degenerate_distribution_is_the_point_estimate(self):
+        distributions = {"surface": {"distribution": "normal", "mean": 100, "std": 0}}
+
+        result = profitability.monte_carlo({"list_price": 250000}, distributions, 100, 1, [5, 95])
+
+        single = profitability.simulate_records([{"list_price": 250000}])[0]
+        assert result["gross_margin_euro"]["percentiles"] == {"p5": pytest.approx(single["gross_margin_euro"]),
+                                                              "p95": pytest.approx(single["gross_margin_euro"])}
+        assert result["gross_margin_euro"]["std"] == pytest.approx(0, abs=1e-6)
+        assert result["probability_below_target"] == (0 if single["target_met"] else 1)
+
+    def test_sketch_percentiles_within_accuracy(self):
+        rng = np.random.default_rng(3)
+        values = np.concatenate([rng.normal(-2000, 5000, 20000), rng.uniform(0, 1e-3, 100), [0.0, np.nan, np.inf]])
+        sketch = profitability.MarginSketch(values[:9000]).merge(profitability.MarginSketch(values[9000:]))
+
+        finite = values[np.isfinite(values)]
+        assert sketch.count == len(finite)
+        assert sketch.mean == pytest.approx(finite.mean())
+        assert sketch.summary([50])["std"] == pytest.approx(finite.std())
+        for p in (0, 1, 25, 50, 75, 99, 100):
+            expected = np.percentile(finite, p, method="nearest")
+            assert sketch.percentile(p) == pytest.approx(expected, rel=profitability.MARGIN_ACCURACY, abs=1e-9)
+        assert len(sketch.bins) < len(finite) / 2
+
+    def test_broken_pool_falls_back_and_is_replaced(self, monkeypatch):
+        monkeypatch.setattr(profitability, "MONTE_CARLO_CHUNK", 1000)
+
+        class BrokenPool:
+            shut_down = False
+
+            def map(self, *args):
+                raise profitability.BrokenProcessPool("worker killed")
+
+            def shutdown(self, wait, cancel_futures):
+                self.shut_down = True
+
+        broken = BrokenPool()
+        monkeypatch.setattr(profitability, "_executor", broken)
+
+        assert self.run(workers=2) == self.run(workers=1)
+        assert broken.shut_down
+        assert profitability._executor is None
+
+    def test_importing_main_does_no_startup_work(self, tmp_path):
+        # Spawned pool workers re-import the entry module (python main.py)
+        database = tmp_path / "startup.db"
+
+        subprocess.run([sys.executable, "-c", "import main"], cwd=Path(__file__).resolve().parents[1], check=True,
+                       env={**os.environ, "DATABASE_URL": f"sqlite:///{database}"})
+
+        assert not database.exists()
+
+    def test_endpoint(self, client):
+        response = client.post("/api/simulations/profitability/monte-carlo", json={
+            "base": {"list_price": 280000},
+            "distributions": self.DISTRIBUTIONS,
+            "scenarios": 5000,
+            "percentiles": [5, 50, 95],
+        })
+
+        assert response.status_code == 200
+        data = response.json()
+        assert set(data["gross_margin_euro"]["percentiles"]) == {"p5", "p50", "p95"}
+        # The returned seed replays the run
+        replay = self.run(seed=data["seed"])
+        assert data["gross_margin_percent"] == replay["gross_margin_percent"]
+        assert data["probability_below_target"] == replay["probability_below_target"]
+
+    @pytest.mark.parametrize("body", [
+        {"distributions": {"listPrice": {"distribution": "uniform", "low": 1, "high": 2}}},
+        {"distributions": {"surface": {"distribution": "beta", "low": 1, "high": 2}}},
+        {"distributions": {"surface": {"distribution": "triangular", "low": 1, "high": 2}}},
+        {"distributions": {"surface": {"distribution": "triangular", "low": 1, "mode": 3, "high": 2}}},
+        {"distributions": {"surface": {"distribution": "uniform", "low": 2, "high": 1}}},
+        {"distributions": {"surface": {"distribution": "normal", "mean": 100, "std": -1}}},
+        {"distributions": {}, "scenarios": 0},
+        {"distributions": {}, "percentiles": [101]},
+        {"distributions": {}, "seed": -1},
+    ])
+    def test_invalid_requests(self, client, body):
+        assert client.post("/api/simulations/profitability/monte-carlo", json=body).status_code == 400
@@ -0,0 +1,127 @@
+"""Tests for the price per m² sketches and GET /api/stats/price-per-m2"""
+import random
+
+import pytest
+from sqlalchemy import insert
+from conftest import client, db
+
+from app.models import Property, PropertyPriceM2Bin
+from app.services import market_stats
+from app.services.bulk_import import insert_batch, validate_record
+from app.services.market_stats import market_stats_service
+
+
+def create(client, price, area, location="Lyon"):
+    response = client.post("/api/properties/", json={"title": "T2", "price": price, "area": area, "location": location})
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+def exact(values, fraction):
+    """Reference quantile with the sketch's rank convention"""
+    values = sorted(values)
+    return values[int(fraction * (len(values) - 1))]
+
+
+class TestSketch:
+    """Test the quantile sketch itself"""
+
+    def test_quantiles_within_relative_accuracy(self):
+        rng = random.Random(5)
+        values = [rng.lognormvariate(8.3, 0.4) for _ in range(5000)]
+        bins = {}
+        for value in values:
+            index = market_stats.price_m2_bin(value * 50, 50)
+            bins[index] = bins.get(index, 0) + 1
+
+        stats = market_stats.quantiles(sorted(bins.items()), market_stats.QUANTILES)
+
+        assert stats["count"] == 5000
+        for name, fraction in market_stats.QUANTILES.items():
+            assert stats[name] == pytest.approx(exact(values, fraction), rel=market_stats.RELATIVE_ACCURACY)
+
+    def test_properties_without_price_per_m2_are_skipped(self):
+        assert market_stats.price_m2_bin(200000, None) is None
+        assert market_stats.price_m2_bin(0, 50) is None
+
+
+class TestMaintenance:
+    """The sketches follow every write path"""
+
+    def test_create_update_delete(self, client, db):
+        first = create(client, 300000, 60)
+        second = create(client, 200000, 50)
+        client.patch(f"/api/properties/{second}", json={"price": 250000})
+        client.patch(f"/api/properties/{first}", json={"location": "Nice"})
+        client.delete(f"/api/properties/{first}")
+
+        assert [(row.location, row.count) for row in db.query(PropertyPriceM2Bin)] == [("Lyon", 1)]
+        lyon = client.get("/api/stats/price-per-m2", params={"location": "Lyon"}).json()["locations"][0]
+        assert lyon["median"] == pytest.approx(5000, rel=0.01)
+
+    def test_bulk_insert(self, db):
+        insert_batch(db, [
+            validate_record({"title": "A", "price": 100000, "area": 20, "location": "Lyon"})[0],
+            validate_record({"title": "B", "price": 100000, "area": 20, "location": "Lyon"})[0],
+            validate_record({"title": "C", "price": 100000, "location": "Lyon"})[0],
+        ])
+
+        assert db.query(PropertyPriceM2Bin.count).scalar() == 2
+
+    def test_rebuild_matches_incremental(self, client, db):
+        rng = random.Random(1)
+        for _ in range(30):
+            create(client, rng.randrange(100_000, 900_000, 1000), rng.randrange(20, 150), rng.choice(["Lyon", "Nice"]))
+        incremental = sorted(tuple(row) for row in db.query(
+            PropertyPriceM2Bin.location, PropertyPriceM2Bin.bin, PropertyPriceM2Bin.count
+        ))
+
+        market_stats_service.rebuild(db)
+
+        assert sorted(tuple(row) for row in db.query(
+            PropertyPriceM2Bin.location, PropertyPriceM2Bin.bin, PropertyPriceM2Bin.count
+        )) == incremental
+
+    def test_ensure_built_for_existing_properties(self, db):
+        db.execute(insert(Property).values(title="Ancien", price=99000, area=33, location="Lyon"))
+        db.commit()
+
+        assert market_stats_service.ensure_built(db)
+        assert not market_stats_service.ensure_built(db)
+        assert db.query(PropertyPriceM2Bin.count).scalar() == 1
+
+
+class TestEndpoint:
+    """Test GET /api/stats/price-per-m2"""
+
+    def test_per_location_in_request_order(self, client):
+        for price_m2, area in ((4000, 40), (5000, 50), (6000, 60)):
+            create(client, price_m2 * area, area)
+        create(client, 8000 * 50, 50, "Nice")
+        create(client, 12000 * 50, 50, "Nice")
+
+        data = client.get("/api/stats/price-per-m2", params={"location": ["Nice", "Lyon", "Brest"]}).json()
+
+        assert data["relative_accuracy"] == market_stats.RELATIVE_ACCURACY
+        assert data["overall"] is None
+        assert [(entry["location"], entry["count"]) for entry in data["locations"]] == [("Nice", 2), ("Lyon", 3)]
+        nice, lyon = data["locations"]
+        assert nice["p10"] == pytest.approx(8000, rel=0.01) and nice["p90"] == pytest.approx(8000, rel=0.01)
+        assert (lyon["p10"], lyon["median"], lyon["p90"]) == pytest.approx((4000, 5000, 5000), rel=0.01)
+
+    def test_all_locations_and_overall(self, client):
+        create(client, 300000, 60)
+        create(client, 400000, 50, "Nice")
+        create(client, 500000, 50, "Paris")
+
+        data = client.get("/api/stats/price-per-m2").json()
+
+        assert [entry["location"] for entry in data["locations"]] == ["Lyon", "Nice", "Paris"]
+        assert data["overall"]["count"] == 3
+        assert data["overall"]["median"] == pytest.approx(8000, rel=0.01)
+
+    def test_etag(self, client):
+        create(client, 300000, 60)
+        first = client.get("/api/stats/price-per-m2")
+
+        assert client.get("/api/stats/price-per-m2", headers={"If-None-Match": first.headers["ETag"]}).status_code == 304
@@ -0,0 +1,188 @@
+"""Tests for the valuation model and /api/valuation"""
+import math
+
+import numpy as np
+import pytest
+from sqlalchemy import insert
+from conftest import client, db
+
+from app.models import Property
+from app.services import http_cache
+from app.services.similar import similar_index
+from app.services.valuation import ValuationModel, design, valuation_model
+
+# Price per m² by city for a 60 m² flat, three rooms, one bathroom
+CITY_LEVEL = {"Paris": 10000, "Lyon": 5000, "Nice": 6000}
+
+
+@pytest.fixture(autouse=True)
+def empty_models():
+    """Both in-memory indexes are process-wide; start every test unloaded"""
+    valuation_model.clear()
+    similar_index.clear()
+    yield
+    valuation_model.clear()
+    similar_index.clear()
+
+
+def listing(city, area, rooms=3, bathrooms=1, noise=1.0):
+    """Listing priced exactly by a known hedonic model"""
+    price_m2 = CITY_LEVEL[city] * (area / 60) ** -0.2 * 1.03 ** (rooms - 3) * 1.05 ** (bathrooms - 1) * noise
+    return {"title": "Bien", "location": city, "area": area, "rooms": rooms, "bathrooms": bathrooms,
+            "price": round(price_m2 * area)}
+
+
+@pytest.fixture
+def catalog(db):
+    rng = np.random.default_rng(3)
+    rows = [
+        listing(city, int(rng.integers(20, 150)), int(rng.integers(1, 6)), int(rng.integers(1, 3)),
+                float(np.exp(rng.normal(0, 0.05))))
+        for city in CITY_LEVEL for _ in range(40)
+    ]
+    db.execute(insert(Property), rows)
+    db.commit()
+    return rows
+
+
+class TestModel:
+    """Test the fit on sufficient statistics"""
+
+    def test_recovers_the_hedonic_coefficients(self, db, catalog):
+        valuation_model.ensure_loaded(db)
+        fit = valuation_model.fit()
+
+        assert fit["beta"][0] == pytest.approx(-0.2, abs=0.03)
+        assert fit["beta"][1] == pytest.approx(math.log(1.03), abs=0.02)
+        assert fit["beta"][3] == pytest.approx(math.log(1.05), abs=0.03)
+        assert fit["rmse"] == pytest.approx(0.05, abs=0.015)
+        reference = design([60], [3], [1])
+        for city, level in CITY_LEVEL.items():
+            assert math.exp(valuation_model.predict(fit, reference, [city])[0]) == pytest.approx(level, rel=0.05)
+
+    def test_write_from_another_process_reloads(self, db, catalog):
+        valuation_model.ensure_loaded(db)
+
+        # Another worker: committed and versioned, but not published here
+        db.add(Property(**listing("Lyon", 60)))
+        http_cache.bump_version(db)
+        db.commit()
+        valuation_model.ensure_loaded(db)
+
+        assert len(valuation_model) == len(catalog) + 1
+
+    def test_writes_published_during_a_load_are_not_counted_twice(self, db, catalog, monkeypatch):
+        row = listing("Lyon", 60)
+        db.add(Property(**row))
+        version = http_cache.bump_version(db)
+        db.commit()
+        current_version = http_cache.current_version
+
+        def published_while_loading(session):
+            # The write's event reaches the model once the load has started
+            if valuation_model._loading:
+                valuation_model.apply_many([(None, row)], version)
+            return current_version(session)
+
+        monkeypatch.setattr(http_cache, "current_version", published_while_loading)
+        valuation_model.ensure_loaded(db)
+
+        assert len(valuation_model) == len(catalog) + 1
+        assert valuation_model.version == version
+
+    def test_incremental_updates_match_a_full_load(self):
+        rng = np.random.default_rng(11)
+        incremental = ValuationModel()
+        incremental.loaded = True
+        rows = {}
+        for property_id in range(1, 301):
+            city = list(CITY_LEVEL)[property_id % 3]
+            rows[property_id] = {"id": property_id, **listing(city, int(rng.integers(20, 150)), int(rng.integers(1, 6)),
+                                                              noise=float(np.exp(rng.normal(0, 0.1))))}
+            if property_id % 10 == 0:
+                rows[property_id]["bathrooms"] = None
+            incremental.apply(None, rows[property_id])
+        for property_id in range(1, 301, 4):
+            incremental.apply(rows.pop(property_id), None)
+        for property_id in range(2, 301, 8):
+            old = rows[property_id]
+            rows[property_id] = {**old, "price": old["price"] * 2, "location": "Nice"}
+            incremental.apply(old, rows[property_id])
+
+        full = ValuationModel()
+        full._load([(r["price"], r["area"], r["rooms"], r["bathrooms"], r["location"]) for r in rows.values()])
+
+        assert len(incremental) == len(rows)
+        expected, actual = full._solve(), incremental.fit()
+        assert np.allclose(actual["beta"], expected["beta"])
+        assert actual["rmse"] == pytest.approx(expected["rmse"])
+        x = design([45, 90], [2, 4], [1, None])
+        assert np.allclose(
+            incremental.predict(actual, x, ["Lyon", "Paris"]), full.predict(expected, x, ["Lyon", "Paris"])
+        )
+
+
+class TestEndpoints:
+    """Test POST /api/valuation, POST /api/valuation/batch and GET /api/valuation/{id}"""
+
+    def test_value_features(self, client, catalog):
+        response = client.post("/api/valuation/", json={"area": 60, "rooms": 3, "bathrooms": 1, "location": "Paris"})
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["price_per_m2"] == pytest.approx(10000, rel=0.08)
+        assert data["price_low"] <= data["estimated_price"] <= data["price_high"]
+        assert data["price_high"] < 1.3 * data["price_low"]
+        assert len(data["comparables"]) == 10
+
+    def test_value_listing_excludes_itself(self, client, catalog):
+        data = client.get("/api/valuation/1").json()
+
+        assert data["property_id"] == 1 and data["area"] == catalog[0]["area"]
+        assert 1 not in data["comparables"]
+        assert data["estimated_price"] == pytest.approx(catalog[0]["price"], rel=0.15)
+
+    def test_batch_in_request_order(self, client, catalog):
+        data = client.post("/api/valuation/batch", json={"items": [
+            {"area": 40, "location": "Lyon"},
+            {"property_id": 999},
+            {"area": 40, "location": "Paris"},
+        ]}).json()
+
+        assert data[1] is None
+        assert data[0]["location"] == "Lyon" and data[2]["location"] == "Paris"
+        assert data[2]["estimated_price"] > 1.5 * data[0]["estimated_price"]
+
+    def test_unknown_location_uses_the_overall_level(self, client, catalog):
+        data = client.post("/api/valuation/", json={"area": 60, "location": "Brest"}).json()
+
+        assert 5000 < data["price_per_m2"] < 10000
+
+    def test_writes_refit_the_model(self, client, catalog):
+        before = client.post("/api/valuation/", json={"area": 60, "location": "Lyon"}).json()
+        for _ in range(40):
+            client.post("/api/properties/", json=listing("Lyon", 60, noise=2.0))
+
+        after = client.post("/api/valuation/", json={"area": 60, "location": "Lyon"}).json()
+
+        assert after["estimated_price"] > 1.5 * before["estimated_price"]
+
+    def test_errors(self, client, db):
+        assert client.post("/api/valuation/", json={"location": "Lyon"}).status_code == 400
+        assert client.post("/api/valuation/", json={"area": 0}).status_code == 422
+        assert client.post("/api/valuation/", json={"area": 50}).status_code == 503
+        client.post("/api/properties/", json={"title": "Sans surface", "price": 100000, "location": "Lyon"})
+        assert client.get("/api/valuation/1").status_code == 400
+        assert client.post("/api/valuation/", json={"area": 50}).status_code == 503
+        client.post("/api/properties/", json=listing("Lyon", 50))
+        assert client.post("/api/valuation/", json={"area": 50}).status_code == 200
+        assert client.get("/api/valuation/999").status_code == 404
+
+    def test_fallback_interval_with_few_comparables(self, client, db):
+        client.post("/api/properties/", json=listing("Lyon", 50))
+        client.post("/api/properties/", json=listing("Lyon", 80, noise=1.1))
+
+        data = client.post("/api/valuation/", json={"area": 60, "location": "Lyon"}).json()
+
+        assert len(data["comparables"]) == 2
+        assert data["price_low"] <= data["estimated_price"] <= data["price_high"]